@@ -1,20 +1,39 @@
+import os
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QAction, QFileDialog
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QApplication, QMainWindow, QAction, QFileDialog, QOpenGLWidget
 from OpenGL.GL import *
 from OpenGL.GLUT import *
 from OpenGL.GLU import *
-import pygame
-import xml.etree.ElementTree as ET
+from simulador.cube_renderer import CubeRenderer, SOLID
+from simulador.scene_loader import BackgroundStream, SceneStream, write_attributes_xml
+from simulador.scene_store import SceneStore
+from simulador.picking import capture_camera
+from simulador.culling import FrustumCuller
+from simulador.voxels import VoxelGrid, VoxelRenderer
+from simulador.texture_loader import TextureLoader
+from simulador.menu import TaskRunner
+
+# Imagem de fundo (labirinto), ao lado deste ficheiro
+BACKGROUND_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "labirinto.jpg")
 
 # Classe principal para a interface do simulador 3D
 class Simulador3D(QMainWindow):
     def __init__(self):
         super().__init__()
 
-        self.initUI()
         self.opengl_window = OpenGLWindow(self)
         self.setCentralWidget(self.opengl_window)
 
+        # Leituras e gravações de XML correm em threads; os lotes lidos e os
+        # resultados das tarefas são entregues na thread do Qt por este timer,
+        # que só corre enquanto há trabalho pendente
+        self.tasks = TaskRunner()
+        self.loading = None  # (caminho, BackgroundStream) do XML em carregamento
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.pollTasks)
+        self.initUI()
+
     # Inicializa a interface gráfica com menu
     def initUI(self):
         self.setWindowTitle('Simulador 3D de Labirinto')
@@ -41,6 +60,12 @@ class Simulador3D(QMainWindow):
         newCube.triggered.connect(self.addCube)
         menubar.addAction(newCube)
 
+        # Modo voxel: os cubos encostados são desenhados sem as faces escondidas
+        # e com as faces iguais unidas em retângulos grandes
+        voxelMode = QAction('Modo Voxel', self, checkable=True)
+        voxelMode.triggered.connect(self.toggleVoxelMode)
+        menubar.addAction(voxelMode)
+
         self.show()
 
     # Função para abrir um arquivo XML
@@ -60,153 +85,179 @@ class Simulador3D(QMainWindow):
     # Função para adicionar um novo cubo
     def addCube(self):
         # Adiciona um cubo no centro da cena
-        self.opengl_window.cubes.append([0, 0, 0])  
-        self.opengl_window.renderScene()
+        self.opengl_window.addCubes([(0, 0, 0)])
 
-    # Função para carregar o cenário de um arquivo XML
+    # Liga ou desliga o modo voxel
+    def toggleVoxelMode(self, checked):
+        self.opengl_window.setVoxelMode(checked)
+
+    # Função para carregar o cenário de um arquivo XML (aceita também os XML
+    # dos outros simuladores). O ficheiro é lido numa thread e os cubos
+    # aparecem à medida que os lotes chegam, sem bloquear a janela.
     def loadScenario(self, filename):
-        tree = ET.parse(filename)
-        root = tree.getroot()
-        self.opengl_window.cubes = []
-        for cube in root.findall('cubo'):
-            x = float(cube.get('x'))
-            y = float(cube.get('y'))
-            z = float(cube.get('z'))
-            self.opengl_window.cubes.append([x, y, z])
-        self.opengl_window.renderScene()
-
-    # Função para salvar o cenário em um arquivo XML
+        if self.loading is not None:
+            self.loading[1].close()
+        self.opengl_window.clearCubes()
+        self.loading = (filename, BackgroundStream(SceneStream(filename)))
+        self.poll_timer.start(16)
+
+    # Função para salvar o cenário em um arquivo XML (as posições são copiadas
+    # aqui e o ficheiro é escrito numa thread, sem bloquear a janela)
     def saveScenario(self, filename):
-        root = ET.Element("cenario")
-        for cube in self.opengl_window.cubes:
-            cube_element = ET.SubElement(root, "cubo")
-            cube_element.set("x", str(cube[0]))
-            cube_element.set("y", str(cube[1]))
-            cube_element.set("z", str(cube[2]))
-
-        tree = ET.ElementTree(root)
-        tree.write(filename)
-
-
-# Classe para a janela OpenGL e renderização
-class OpenGLWindow(QMainWindow):
+        positions = self.opengl_window.scene.positions.copy()
+        self.tasks.submit(write_attributes_xml, filename, positions,
+                          on_done=lambda _: print("Cenário guardado: %s" % filename),
+                          on_error=lambda error: print("Erro ao guardar %s: %s" % (filename, error)))
+        self.poll_timer.start(16)
+
+    # Entrega os lotes já lidos e os resultados das tarefas na thread do Qt.
+    # Cada lote marca a cena como suja, mas o Qt junta-os num só redesenho.
+    def pollTasks(self):
+        self.tasks.poll()
+        if self.loading is not None:
+            filename, stream = self.loading
+            for _ in range(8):  # Poucos lotes de cada vez, para a janela continuar a responder
+                positions = stream.get()
+                if positions is None:
+                    break
+                self.opengl_window.addCubes(positions)
+            if stream.finished:
+                self.loading = None
+                if stream.error is not None:
+                    print("Erro ao abrir %s: %s" % (filename, stream.error))
+        if self.loading is None and not self.tasks.busy():
+            self.poll_timer.stop()
+
+    # Espera pelas gravações em curso antes de fechar
+    def closeEvent(self, event):
+        self.tasks.shutdown()
+        super().closeEvent(event)
+
+
+# Área OpenGL dentro da janela Qt. Só é redesenhada quando a cena, a câmera
+# ou o tamanho mudam: markDirty() regista o que mudou e pede um update() ao
+# Qt, que junta vários pedidos seguidos (por exemplo todos os lotes de um XML)
+# num único paintGL. Quando o Qt redesenha por outra razão (janela tapada e
+# destapada), os buffers dos cubos são reaproveitados sem serem recalculados.
+class OpenGLWindow(QOpenGLWidget):
     def __init__(self, parent=None):
         super(OpenGLWindow, self).__init__(parent)
-        pygame.init()
-        self.display = (800, 600)
-        self.cubes = []  # Lista de cubos no cenário
-        self.initOpenGL()
+        self.scene = SceneStore()  # Cubos no cenário
+        self.camera_offset = [0.0, 0.0, 0.0]  # Deslocamento da câmera com as setas
+        self.dirty = {"scene", "camera", "viewport"}  # O que mudou desde o último paintGL
+        self.repaints = 0
+        self.voxel_mode = False
+        self.renderer = None  # Criados em initializeGL, com o contexto OpenGL ativo
+        self.voxel_renderer = None
+        self.textures = None
+        self.culler = FrustumCuller()  # Só os cubos dentro do campo de visão são desenhados
+        # Os mesmos cubos numa grelha (aresta 2, como os do renderer), com o topo (+y) mais claro
+        self.voxels = VoxelGrid(cell=2.0, shades=(0.8, 0.8, 0.65, 0.65, 1.0, 0.5))
+        self.setFocusPolicy(Qt.StrongFocus)  # Para receber as setas do teclado
+
+    # Marca partes da cena como alteradas e pede um redesenho
+    def markDirty(self, *what):
+        self.dirty.update(what)
+        self.update()
+
+    # Adiciona cubos ao cenário e à grelha de voxels
+    def addCubes(self, positions):
+        self.scene.add_many(positions)
+        self.voxels.add(positions)
+        self.markDirty("scene")
+
+    # Apaga todos os cubos
+    def clearCubes(self):
+        self.scene.clear()
+        self.voxels.clear()
+        self.markDirty("scene")
+
+    # Liga ou desliga o modo voxel
+    def setVoxelMode(self, enabled):
+        self.voxel_mode = enabled
+        self.markDirty("scene")
+
+    # Inicializa os parâmetros OpenGL (chamado pelo Qt com o contexto ativo)
+    def initializeGL(self):
+        glEnable(GL_DEPTH_TEST)
+        self.renderer = CubeRenderer(SOLID)  # Cubos coloridos desenhados em lote
+        self.voxel_renderer = VoxelRenderer(self.voxels)  # Só os blocos alterados são refeitos
+        self.textures = TextureLoader()  # Descodificadas numa thread e enviadas aos poucos
         self.loadBackground()  # Carrega a textura de fundo (labirinto)
 
-    # Inicializa a janela OpenGL e parâmetros
-    def initOpenGL(self):
-        pygame.display.set_mode(self.display, pygame.DOUBLEBUF | pygame.OPENGL)
-        glEnable(GL_DEPTH_TEST)
+    # Ajusta a perspectiva ao novo tamanho da área OpenGL
+    def resizeGL(self, width, height):
         glMatrixMode(GL_PROJECTION)
-        gluPerspective(45, (self.display[0] / self.display[1]), 0.1, 50.0)
+        glLoadIdentity()
+        gluPerspective(45, width / max(height, 1), 0.1, 50.0)
         glMatrixMode(GL_MODELVIEW)
-        glTranslatef(0.0, 0.0, -5)
+        self.dirty.add("viewport")
 
-    # Carrega a imagem de fundo (labirinto)
+    # Pede a imagem de fundo (labirinto); fica ativa em paintGL quando chegar
     def loadBackground(self):
-        textureSurface = pygame.image.load("C:\\Users\\jose\\Documents\\GitHub\\3D-simulator\\labirinto.jpg")
-        textureData = pygame.image.tostring(textureSurface, "RGB", True)
-
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, textureSurface.get_width(), textureSurface.get_height(), 0, GL_RGB, GL_UNSIGNED_BYTE, textureData)
-        glEnable(GL_TEXTURE_2D)
-
-    # Função para desenhar um cubo na posição especificada
-    def drawCube(self, position):
-        glPushMatrix()
-        glTranslatef(position[0], position[1], position[2])
-
-        glBegin(GL_QUADS)
-
-        # Frente
-        glColor3f(1.0, 0.0, 0.0)
-        glVertex3f(-1.0, -1.0,  1.0)
-        glVertex3f( 1.0, -1.0,  1.0)
-        glVertex3f( 1.0,  1.0,  1.0)
-        glVertex3f(-1.0,  1.0,  1.0)
-
-        # Trás
-        glColor3f(0.0, 1.0, 0.0)
-        glVertex3f(-1.0, -1.0, -1.0)
-        glVertex3f(-1.0,  1.0, -1.0)
-        glVertex3f( 1.0,  1.0, -1.0)
-        glVertex3f( 1.0, -1.0, -1.0)
-
-        # Esquerda
-        glColor3f(0.0, 0.0, 1.0)
-        glVertex3f(-1.0, -1.0, -1.0)
-        glVertex3f(-1.0, -1.0,  1.0)
-        glVertex3f(-1.0,  1.0,  1.0)
-        glVertex3f(-1.0,  1.0, -1.0)
-
-        # Direita
-        glColor3f(1.0, 1.0, 0.0)
-        glVertex3f( 1.0, -1.0, -1.0)
-        glVertex3f( 1.0,  1.0, -1.0)
-        glVertex3f( 1.0,  1.0,  1.0)
-        glVertex3f( 1.0, -1.0,  1.0)
-
-        # Cima
-        glColor3f(1.0, 0.0, 1.0)
-        glVertex3f(-1.0,  1.0, -1.0)
-        glVertex3f(-1.0,  1.0,  1.0)
-        glVertex3f( 1.0,  1.0,  1.0)
-        glVertex3f( 1.0,  1.0, -1.0)
-
-        # Baixo
-        glColor3f(0.0, 1.0, 1.0)
-        glVertex3f(-1.0, -1.0, -1.0)
-        glVertex3f( 1.0, -1.0, -1.0)
-        glVertex3f( 1.0, -1.0,  1.0)
-        glVertex3f(-1.0, -1.0,  1.0)
-
-        glEnd()
-        glPopMatrix()
-
-    # Função para renderizar todos os cubos na cena
-    def renderScene(self):
+        self.textures.request(BACKGROUND_IMAGE)
+
+    # Desenha a cena (chamado pelo Qt depois de update() ou quando a janela é exposta)
+    def paintGL(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glLoadIdentity()
 
+        # Envia a parte da textura de fundo que cabe neste frame; enquanto
+        # houver texturas a caminho pede-se outro redesenho daqui a um frame
+        self.textures.update()
+        if self.textures.bind(BACKGROUND_IMAGE):
+            glEnable(GL_TEXTURE_2D)
+        if self.textures.busy():
+            QTimer.singleShot(16, self.update)
+
         # Ajusta a posição da câmera
         gluLookAt(0, 0, 10, 0, 0, 0, 0, 1, 0)
-
-        # Desenha cada cubo no cenário
-        for cube in self.cubes:
-            self.drawCube(cube)
-
-        pygame.display.flip()
+        glTranslatef(*self.camera_offset)
+
+        # Os buffers só são recalculados se a cena, a câmera ou o tamanho mudaram
+        rebuild = bool(self.dirty)
+        if rebuild:
+            self.culler.begin_frame(capture_camera())
+
+        if self.voxel_mode:
+            # Desenha os blocos de voxels visíveis (refazendo só os que mudaram)
+            self.voxel_renderer.update()
+            self.voxel_renderer.draw(self.culler)
+            stats = self.voxel_renderer.stats()
+            message = "%s, %d triângulos (%d sem voxels)" % (
+                self.culler.summary(), stats["triangles"], stats["naive_triangles"])
+        else:
+            # Desenha os cubos visíveis do cenário numa só chamada
+            if rebuild:
+                visible = self.culler.cull("cubos", self.scene.positions, self.scene.sizes)
+                self.renderer.update(self.scene.positions[visible], self.scene.sizes[visible])
+            self.renderer.draw()
+            message = self.culler.summary()
+
+        self.dirty.clear()
+        self.repaints += 1
+        # Contagens na barra de estado da janela principal
+        if self.parent() is not None:
+            self.parent().statusBar().showMessage("%s (%d redesenhos)" % (message, self.repaints))
 
     # Função para movimentar a câmera
-    def moveCamera(self, key):
-        if key == pygame.K_LEFT:
-            glTranslatef(-0.5, 0.0, 0.0)
-        elif key == pygame.K_RIGHT:
-            glTranslatef(0.5, 0.0, 0.0)
-        elif key == pygame.K_UP:
-            glTranslatef(0.0, 0.5, 0.0)
-        elif key == pygame.K_DOWN:
-            glTranslatef(0.0, -0.5, 0.0)
-
-    # Função principal do loop de eventos
-    def mainLoop(self):
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    quit()
-                if event.type == pygame.KEYDOWN:
-                    self.moveCamera(event.key)
-
-            self.renderScene()
-            pygame.time.wait(10)
-
-
-# Inicializa o aplicativo Qt
+    def keyPressEvent(self, event):
+        moves = {
+            Qt.Key_Left: (-0.5, 0.0),
+            Qt.Key_Right: (0.5, 0.0),
+            Qt.Key_Up: (0.0, 0.5),
+            Qt.Key_Down: (0.0, -0.5),
+        }
+        if event.key() in moves:
+            dx, dy = moves[event.key()]
+            self.camera_offset[0] += dx
+            self.camera_offset[1] += dy
+            self.markDirty("camera")
+        else:
+            super(OpenGLWindow, self).keyPressEvent(event)
+
+
+# Inicializa o aplicativo Qt (um único ciclo de eventos, sem pygame)
 app = QApplication(sys.argv)
 simulador = Simulador3D()
 sys.exit(app.exec_())
@@ -4,27 +4,43 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import sys
 import random
+import numpy as np
+from simulador.static_mesh import CachedMesh, build_plane
+from simulador.picking import IdBufferPicker, capture_camera, intersect_plane
+from simulador.scene_store import SceneStore
+from simulador.culling import FrustumCuller
+from simulador.frame_pacer import pacer_from_argv
 
 # Classe principal para o simulador 3D
 class Simulador3D:
     def __init__(self):
         pygame.init()
         self.display = (800, 600)
-        self.cubes = []  # Lista de cubos com posições
+        self.scene = SceneStore()  # Cubos com posições
+        self.picker = IdBufferPicker()  # Seleção dos cubos pelo pixel clicado
+        self.camera = None  # Matrizes da câmera do último frame (para converter cliques em raios)
+        self.culler = FrustumCuller()  # Só os cubos dentro do campo de visão são desenhados
+        self.caption = None
+        self.pacer = pacer_from_argv()  # --fps N, --vsync, --idle
         self.cube_size = 1  # Tamanho padrão do cubo
         self.mouse_buttons = pygame.mouse.get_pressed()
         self.initOpenGL()
 
         # Plano base do cenário
         self.plane_size = 20  # Tamanho do plano
+        self.plane = CachedMesh(build_plane)  # Malha do plano guardada na GPU
 
         self.mainLoop()
 
     # Inicializa OpenGL e define a perspectiva da câmera
     def initOpenGL(self):
-        pygame.display.set_mode(self.display, DOUBLEBUF | OPENGL)
+        self.pacer.set_mode(self.display, DOUBLEBUF | OPENGL)
         glEnable(GL_DEPTH_TEST)
+        # A perspectiva fica na matriz de projeção para não ser apagada pelo
+        # glLoadIdentity de cada frame (e para a seleção com o mouse a usar)
+        glMatrixMode(GL_PROJECTION)
         gluPerspective(45, (self.display[0] / self.display[1]), 0.1, 50.0)
+        glMatrixMode(GL_MODELVIEW)
         glTranslatef(0.0, 0.0, -25)  # Posiciona a câmera mais longe
 
     # Desenha um cubo na posição especificada
@@ -50,17 +66,9 @@ class Simulador3D:
             (-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1),    # Frente
         ]
 
-    # Renderiza o plano
+    # Renderiza o plano (só é reconstruído se o tamanho mudar)
     def drawPlane(self):
-        glPushMatrix()
-        glBegin(GL_QUADS)
-        glColor3f(0.5, 0.5, 0.5)
-        glVertex3f(-self.plane_size, -1, -self.plane_size)
-        glVertex3f(self.plane_size, -1, -self.plane_size)
-        glVertex3f(self.plane_size, -1, self.plane_size)
-        glVertex3f(-self.plane_size, -1, self.plane_size)
-        glEnd()
-        glPopMatrix()
+        self.plane.draw(self.plane_size, -1, (0.5, 0.5, 0.5))
 
     # Função para detectar cliques do mouse
     def checkMouse(self):
@@ -71,22 +79,23 @@ class Simulador3D:
             mouse_x, mouse_y = pygame.mouse.get_pos()
             self.removeCube(mouse_x, mouse_y)
 
-    # Adiciona um cubo na posição do mouse
+    # Adiciona um cubo no ponto do plano que está debaixo do mouse
     def addCube(self, mouse_x, mouse_y):
-        x = (mouse_x / self.display[0]) * self.plane_size * 2 - self.plane_size
-        z = (mouse_y / self.display[1]) * self.plane_size * 2 - self.plane_size
-        self.cubes.append((x, 0, z))  # Posição do cubo no plano
-
-    # Remove um cubo na posição do mouse
+        if self.camera is None:
+            return
+        origin, direction = self.camera.ray(mouse_x, mouse_y)
+        x, _, z = intersect_plane(origin, direction, axis=1, height=-1)[0]  # O plano está em y=-1
+        if abs(x) <= self.plane_size and abs(z) <= self.plane_size:
+            self.scene.add((x, 0, z))  # Posição do cubo no plano
+
+    # Remove o cubo que está debaixo do mouse
     def removeCube(self, mouse_x, mouse_y):
-        x = (mouse_x / self.display[0]) * self.plane_size * 2 - self.plane_size
-        z = (mouse_y / self.display[1]) * self.plane_size * 2 - self.plane_size
-
-        # Remove o cubo mais próximo da posição do mouse
-        for cube in self.cubes:
-            if abs(cube[0] - x) < 1 and abs(cube[2] - z) < 1:
-                self.cubes.remove(cube)
-                break
+        # drawCube desenha as faces deslocadas, por isso a caixa usada na
+        # seleção vai até cube_size + 1 em x e y e até cube_size em z
+        half = (self.cube_size + 1, self.cube_size + 1, self.cube_size)
+        slot = self.picker.pick(mouse_x, mouse_y, self.scene.positions, np.tile(half, (len(self.scene), 1)))
+        if slot is not None:
+            self.scene.remove(int(self.scene.handles[slot]))
 
     # Renderiza a cena 3D
     def renderScene(self):
@@ -95,12 +104,22 @@ class Simulador3D:
 
         # Ajuste da câmera
         gluLookAt(0, 5, 15, 0, 0, 0, 0, 1, 0)
+        self.camera = capture_camera()
 
-        # Renderiza o plano e os cubos
+        # Renderiza o plano e os cubos visíveis (a caixa de cada cubo é a mesma da seleção)
         self.drawPlane()
-        for cube in self.cubes:
+        self.culler.begin_frame(self.camera)
+        half = (self.cube_size + 1, self.cube_size + 1, self.cube_size)
+        visible = self.culler.cull("cubos", self.scene.positions, half)
+        for cube in self.scene.positions[visible]:
             self.drawCube(cube)
 
+        # Contagens do frame no título da janela (só muda quando as contagens mudam)
+        caption = self.culler.summary()
+        if caption != self.caption:
+            pygame.display.set_caption(caption)
+            self.caption = caption
+
         pygame.display.flip()
 
     # Movimenta o cenário com as setas
@@ -116,8 +135,9 @@ class Simulador3D:
 
     # Loop principal do simulador
     def mainLoop(self):
+        last_version = self.scene.version
         while True:
-            for event in pygame.event.get():
+            for event in self.pacer.events():
                 if event.type == QUIT:
                     pygame.quit()
                     sys.exit()
@@ -128,12 +148,17 @@ class Simulador3D:
 
             # Checa cliques do mouse
             self.checkMouse()
+            if self.scene.version != last_version:
+                self.pacer.changed()
+                last_version = self.scene.version
 
-            # Renderiza a cena 3D
-            self.renderScene()
+            # Renderiza a cena 3D (em modo idle só se alguma coisa mudou)
+            drawn = self.pacer.should_draw()
+            if drawn:
+                self.renderScene()
 
-            # Pequena pausa para evitar sobrecarregar a CPU
-            pygame.time.wait(10)
+            # Espera só o que falta para o próximo frame
+            self.pacer.tick(drawn)
 
 
 # Inicia o simulador
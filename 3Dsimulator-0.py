@@ -1,28 +1,19 @@
 import os
-from PIL import Image
 import pygame
 import pybullet as p
 from OpenGL.GL import *
 from OpenGL.GLU import *
+from simulador.texture_loader import TextureLoader
 
-# Função para carregar a textura
+# Texturas descodificadas numa thread (com mipmaps e cache em disco) e
+# enviadas para a GPU aos poucos
+textures = TextureLoader()
+
+# Função para carregar a textura (da pasta images ao lado deste ficheiro)
 def load_texture(image_file):
-    # Caminho da imagem fornecido por você
-    image_path = r'C:\Users\jose\Documents\GitHub\3D-simulator\images\labirinto-quadrado.jpg'
-    
-    # Carrega a imagem usando Pillow
-    texture_surface = Image.open(image_path)
-    texture_data = texture_surface.convert("RGBA").tobytes()
-    width, height = texture_surface.size
-
-    # Gera um ID de textura no OpenGL
-    texture_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture_id)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, texture_data)
-    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-
-    return texture_id
+    image_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images", image_file)
+    textures.request(image_path)
+    return image_path
 
 def main():
     # Inicializando o Pygame e configurando a janela
@@ -33,7 +24,7 @@ def main():
     glTranslatef(0.0, 0.0, -5)
 
     # Carregar a textura usando o novo caminho
-    texture_id = load_texture('labirinto-quadrado.jpg')
+    texture = load_texture('labirinto-quadrado.jpg')
 
     # Loop principal para rodar a janela
     running = True
@@ -44,7 +35,9 @@ def main():
         
         # Limpa a tela e redesenha o objeto com a textura
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glBindTexture(GL_TEXTURE_2D, texture_id)
+        textures.update()
+        if not textures.bind(texture):
+            glBindTexture(GL_TEXTURE_2D, 0)
 
         glBegin(GL_QUADS)
         # Desenhar um cubo simples com a textura
@@ -57,6 +50,7 @@ def main():
         pygame.display.flip()
         pygame.time.wait(10)
 
+    textures.delete()
     pygame.quit()
 
 if __name__ == '__main__':
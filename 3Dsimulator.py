@@ -4,56 +4,43 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import pybullet as p
 import time
-import pybullet_data
-import tkinter as tk
-from tkinter import filedialog
-import xml.etree.ElementTree as ET
-from PIL import Image
-
-# Lista de objetos na cena
-objects = []
-
-# Função para desenhar um cubo em OpenGL
-def draw_cube():
-    vertices = [
-        (1, -1, -1),
-        (1, 1, -1),
-        (-1, 1, -1),
-        (-1, -1, -1),
-        (1, -1, 1),
-        (1, 1, 1),
-        (-1, -1, 1),
-        (-1, 1, 1),
-    ]
-    edges = [
-        (0, 1), (1, 2), (2, 3), (3, 0),  # Base inferior
-        (4, 5), (5, 6), (6, 7), (7, 4),  # Base superior
-        (0, 4), (1, 5), (2, 6), (3, 7)   # Conexões entre base inferior e superior
-    ]
-    
-    glBegin(GL_LINES)
-    for edge in edges:
-        for vertex in edge:
-            glVertex3fv(vertices[vertex])
-    glEnd()
-
-# Função para carregar texturas de imagem
+import numpy as np
+from simulador.cube_renderer import CubeRenderer
+from simulador.physics_scheduler import PhysicsScheduler
+from simulador.scene_loader import BackgroundStream, SceneStream, write_scene_xml
+from simulador.scene_store import SceneStore
+from simulador.journal import SceneJournal
+from simulador.profiler import FrameProfiler, profile_csv_from_argv
+from simulador.trajectory import start_recording, stop_recording
+from simulador.frame_pacer import pacer_from_argv
+from simulador.menu import FilePicker, PopupMenu, TaskRunner
+from simulador.texture_loader import TextureLoader
+from simulador.world import GROUND_ORIENTATION, create_world
+
+# Objetos na cena (arrays NumPy com posições, orientações, cores, ...)
+scene = SceneStore()
+
+# Gravação automática da cena num registo de alterações (recuperada ao abrir
+# se a sessão anterior não terminou bem)
+journal = SceneJournal(scene, "scene-autosave")
+
+# Ritmo dos frames (--fps N, --vsync; --idle deixa de desenhar com a cena parada)
+pacer = pacer_from_argv()
+
+# Texturas descodificadas (com mipmaps) numa thread e enviadas para a GPU aos
+# poucos, sem parar o desenho; ficam em cache no disco para os arranques seguintes
+textures = TextureLoader()
+
+# Função para carregar texturas de imagem (a textura aparece quando estiver pronta)
 def load_texture(image_file):
-    texture_surface = Image.open(image_file)
-    texture_data = texture_surface.tobytes()
-    
     glEnable(GL_TEXTURE_2D)
-    texture_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture_id)
-    
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, texture_surface.width, texture_surface.height, 0, GL_RGB, GL_UNSIGNED_BYTE, texture_data)
-    return texture_id
-
-# Função para desenhar cubo texturizado
-def draw_textured_cube(texture_id):
-    glBindTexture(GL_TEXTURE_2D, texture_id)
+    textures.request(image_file)
+    return image_file
+
+# Função para desenhar cubo texturizado (sem textura enquanto ela não chega)
+def draw_textured_cube(image_file):
+    if not textures.bind(image_file):
+        glBindTexture(GL_TEXTURE_2D, 0)
     vertices = [
         (1, -1, -1),
         (1, 1, -1),
@@ -85,125 +72,182 @@ def draw_textured_cube(texture_id):
 def init_pygame_window():
     pygame.init()
     display = (800, 600)
-    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
+    pacer.set_mode(display, DOUBLEBUF | OPENGL)
     gluPerspective(45, (display[0] / display[1]), 0.1, 50.0)
     glTranslatef(0.0, 0.0, -10)
 
-# Inicializar PyBullet (física)
+# Inicializar PyBullet (física), com o y para cima como o desenho
 def init_pybullet():
     p.connect(p.GUI)  # Conectar com a GUI do PyBullet
-    p.setAdditionalSearchPath(pybullet_data.getDataPath())  # Caminho para dados
-    p.setGravity(0, 0, -9.8)  # Definir gravidade
+    create_world()  # Gravidade em -y e chão plano em y = 0
     
-    # Criar um chão plano
-    plane_id = p.loadURDF("plane.urdf")
-    
-    # Criar um cubo na posição inicial
-    cube_start_pos = [0, 0, 5]  # Posição inicial (x, y, z)
-    cube_start_orientation = p.getQuaternionFromEuler([0, 0, 0])
-    box_id = p.loadURDF("r2d2.urdf", cube_start_pos, cube_start_orientation)
+    # Criar o robô na posição inicial; o r2d2.urdf tem o z para cima, por isso
+    # leva a mesma rotação do chão para ficar de pé
+    cube_start_pos = [0, 5, 0]  # Posição inicial (x, y, z)
+    box_id = p.loadURDF("r2d2.urdf", cube_start_pos, GROUND_ORIENTATION)
     
     return box_id
 
-# Função para desenhar a cena e atualizar física
-def update_simulation(box_id):
-    p.stepSimulation()  # Passo da simulação física
-    
-    # Obter a posição e orientação do cubo
-    cube_pos, cube_orientation = p.getBasePositionAndOrientation(box_id)
+# Função para desenhar a cena com o estado mais recente da física
+# (a física corre a passo fixo na sua própria thread, ver PhysicsScheduler)
+def update_simulation(physics, renderer):
+    # Obter a posição e orientação do cubo no último snapshot publicado
+    snapshot = physics.latest()
+    cube_pos = snapshot.positions[0] if snapshot.body_ids else (0, 5, 0)
     
-    # Renderizar o cubo com OpenGL
-    glPushMatrix()
-    glTranslatef(cube_pos[0], cube_pos[1], cube_pos[2])
-    draw_cube()
-    glPopMatrix()
+    # Renderizar o cubo e os objetos da cena com OpenGL numa só chamada
+    renderer.update(np.vstack([cube_pos, scene.positions]))
+    renderer.draw()
 
-# Função para salvar a cena em XML
+# Função para salvar a cena em XML (as posições são copiadas aqui e o
+# ficheiro é escrito numa thread)
 def save_scene_to_xml(filename):
-    root = ET.Element("Scene")
-    
-    for obj in objects:
-        cube = ET.SubElement(root, "Cube")
-        position = ET.SubElement(cube, "Position")
-        position.set("x", str(obj['pos'][0]))
-        position.set("y", str(obj['pos'][1]))
-        position.set("z", str(obj['pos'][2]))
-
-    tree = ET.ElementTree(root)
-    tree.write(filename)
+    tasks.submit(write_scene_xml, filename, scene.positions.tolist(),
+                 on_done=lambda _: print("Cena guardada: %s" % filename))
 
 # Função para carregar cena de um XML
+# (lido numa thread; aceita também os XML dos outros simuladores). Os cubos
+# aparecem aos poucos, um lote por frame, enquanto o ficheiro é lido.
 def load_scene(filename):
-    tree = ET.parse(filename)
-    root = tree.getroot()
-    
-    for cube in root.findall('Cube'):
-        position = cube.find('Position')
-        x = float(position.get('x'))
-        y = float(position.get('y'))
-        z = float(position.get('z'))
-        add_cube_at_position((x, y, z))
+    loading.append((filename, BackgroundStream(SceneStream(filename))))
+
+# Adicionar à cena o próximo lote dos XML em carregamento (se já foi lido)
+def load_next_batch():
+    filename, stream = loading[0]
+    positions = stream.get()
+    if positions is not None:
+        scene.add_many(positions)
+    elif stream.finished:
+        loading.pop(0)
+        if stream.error is not None:
+            print("Erro ao abrir %s: %s" % (filename, stream.error))
 
 # Função para adicionar um cubo em uma posição
 def add_cube_at_position(position):
-    objects.append({'pos': position})
+    scene.add(position)
     # Adicionar cubo em PyBullet aqui
 
-# Criação do Menu usando Tkinter
-def create_menu():
-    root = tk.Tk()
-    root.title("Menu")
-    
-    menubar = tk.Menu(root)
-    
-    # Menu Arquivo
-    file_menu = tk.Menu(menubar, tearoff=0)
-    file_menu.add_command(label="Novo Objeto (Cubo)", command=lambda: add_cube_at_position((0, 0, 5)))
-    file_menu.add_command(label="Abrir XML", command=open_xml)
-    file_menu.add_command(label="Salvar", command=lambda: save_scene_to_xml("scene.xml"))
-    file_menu.add_command(label="Salvar Como XML", command=save_as_xml)
-    menubar.add_cascade(label="Arquivo", menu=file_menu)
+# Menu (botão direito) e seletor de ficheiros desenhados dentro da janela,
+# sem parar a física nem o desenho
+menu = PopupMenu()
+file_picker = FilePicker()
+
+# Leituras e escritas de XML correm numa thread; os resultados são
+# entregues no ciclo principal em tasks.poll()
+tasks = TaskRunner()
 
-    root.config(menu=menubar)
-    root.mainloop()
+# XML a carregar aos poucos: (caminho, BackgroundStream), um lote por frame
+loading = []
+
+def show_menu(position):
+    menu.show(position, [
+        ("Novo Objeto (Cubo)", lambda: add_cube_at_position((0, 0, 5))),
+        ("Abrir XML", open_xml),
+        ("Salvar", lambda: save_scene_to_xml("scene.xml")),
+        ("Salvar Como XML", save_as_xml),
+    ])
 
 # Função para abrir arquivo XML
 def open_xml():
-    filename = filedialog.askopenfilename(defaultextension=".xml", filetypes=[("XML files", "*.xml")])
-    if filename:
-        load_scene(filename)
+    file_picker.ask_open(load_scene, (".xml",), "Abrir XML")
 
 # Função para salvar como XML
 def save_as_xml():
-    filename = filedialog.asksaveasfilename(defaultextension=".xml", filetypes=[("XML files", "*.xml")])
-    if filename:
-        save_scene_to_xml(filename)
+    file_picker.ask_save(save_scene_to_xml, (".xml",), "Salvar Como XML", default_name="scene.xml")
 
 # Função principal para rodar o simulador
 def main():
     init_pygame_window()  # Inicializa a janela
     box_id = init_pybullet()  # Inicializa PyBullet
+    renderer = CubeRenderer(color=(1, 1, 1))  # Cubos em wireframe desenhados em lote
+    physics = PhysicsScheduler([box_id])  # Física a 240 Hz independente do render
+    physics.start()
+    if journal.exists():
+        print("Cena recuperada: %d alterações" % journal.recover())
+    journal.start()
 
     # Carregar textura para o cubo
-    texture_id = load_texture('labirinto.jpg')  # Suponha que o labirinto.jpg seja a imagem
-    
+    texture = load_texture('labirinto.jpg')  # Suponha que o labirinto.jpg seja a imagem
+
+    # Tempo de cada fase do frame (F3 mostra o resumo; --profile ficheiro.csv grava cada frame)
+    profiler = FrameProfiler(["events", "physics", "cubes", "texture", "flip"], csv_path=profile_csv_from_argv())
+    last_busy_time = 0.0
+    recorder = None  # Gravação da trajetória do cubo (F6 liga/desliga)
+    last_pose = None  # Pose do robô no último frame desenhado
+    last_version = scene.version
+
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                p.disconnect()
-                quit()
+        profiler.begin_frame()
+        with profiler.phase("events"):
+            for event in pacer.events():
+                if event.type == pygame.QUIT:
+                    if recorder is not None:
+                        stop_recording(physics, recorder)
+                    tasks.shutdown()
+                    textures.delete()
+                    journal.close(discard=True)
+                    profiler.close()
+                    physics.stop()
+                    pygame.quit()
+                    p.disconnect()
+                    quit()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F6:
+                    if recorder is None or recorder.closed:
+                        recorder = start_recording(physics)
+                        print("A gravar: %s" % recorder.path)
+                    else:
+                        stop_recording(physics, recorder)
+                if file_picker.handle_event(event) or menu.handle_event(event):
+                    continue
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+                    show_menu(event.pos)
+            if tasks.poll():
+                pacer.changed()
+            if loading:
+                load_next_batch()
+                pacer.changed()
+
+        # O robô ainda se mexe ou a cena mudou (por exemplo pelo menu)?
+        snapshot = physics.latest()
+        pose = np.concatenate([snapshot.positions.ravel(), snapshot.orientations.ravel()])
+        if last_pose is None or len(pose) != len(last_pose) or not np.allclose(pose, last_pose, rtol=0, atol=1e-4):
+            pacer.changed()
+        if scene.version != last_version:
+            pacer.changed()
+        last_pose, last_version = pose, scene.version
+        journal.autosave()
+
+        # Envia para a GPU a parte das texturas que cabe neste frame
+        if textures.update():
+            pacer.changed()
+
+        # Com a cena parada (modo idle) não se redesenha nada
+        if not pacer.should_draw():
+            pacer.tick(drawn=False)
+            continue
 
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)  # Limpar tela
 
         # Atualizar a simulação e renderizar
-        update_simulation(box_id)
-        draw_textured_cube(texture_id)
-
-        pygame.display.flip()
-        pygame.time.wait(10)
-
-# Executar o menu e simulador
+        with profiler.phase("cubes"):
+            update_simulation(physics, renderer)
+        with profiler.phase("texture"):
+            draw_textured_cube(texture)
+        menu.draw()
+        file_picker.draw()
+        profiler.draw_overlay()
+
+        # Tempo gasto pela thread da física desde o último frame
+        profiler.record("physics", physics.busy_time - last_busy_time)
+        last_busy_time = physics.busy_time
+
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        profiler.end_frame()
+        pacer.tick()  # Espera só o que falta para o próximo frame
+
+# Executar o simulador (o menu abre com o botão direito dentro da janela)
 if __name__ == "__main__":
-    create_menu()
     main()
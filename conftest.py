@@ -0,0 +1,2 @@
+# Com este ficheiro na raiz, o pytest (também sem "python -m") põe a raiz do
+# repositório no sys.path e os testes conseguem importar o pacote simulador.
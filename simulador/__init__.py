@@ -0,0 +1,2 @@
+# Pacote com os componentes partilhados pelos simuladores 3D
+# (renderização, física, cenários em XML, etc.)
@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import platform as host  # (o nome "platform" é tapado pelo OpenGL.GL)
+import sys
+import tempfile
+import time
+
+# Sem ecrã nem GPU: janela SDL fora do ecrã e OpenGL por software via EGL (Mesa)
+if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+    os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+    os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import numpy as np
+import pybullet as p
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+from simulador.cube_renderer import CubeRenderer
+from simulador.static_mesh import CachedMesh, build_checkerboard
+from simulador.spawner import CubeSpawner
+from simulador.pose_sync import PoseSync
+from simulador.scene_loader import SceneStream, WRITERS, DIALECT_SCENE, DIALECT_ATTRIBUTES, DIALECT_CHILDREN
+from simulador.scene_store import SceneStore
+from simulador.world import create_world
+
+# Tamanho da janela usada para medir o render (a mesma de basic3Dscenario-10.py)
+DISPLAY = (1280, 720)
+
+# Piora a partir da qual uma medida é considerada regressão (10%)
+THRESHOLD = 0.10
+
+
+# Junta as latências (em segundos) de uma medida e resume-as:
+# débito (unidades por segundo) e percentis em milissegundos
+def summarize(latencies, units, unit):
+    latencies = np.asarray(latencies, dtype=float)
+    total = float(latencies.sum())
+    p50, p95, p99 = np.percentile(latencies * 1000.0, (50, 95, 99)) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        "unit": unit,
+        "units": int(units),
+        "samples": int(len(latencies)),
+        "total_s": total,
+        "throughput": units / total if total > 0 else 0.0,  # unidades por segundo
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(latencies.max() * 1000.0) if len(latencies) else 0.0,
+    }
+
+
+# Posições de n cubos numa grelha no plano XZ, a y=1 (como os cliques do rato)
+def grid_positions(n, spacing=2.0):
+    side = int(np.ceil(np.sqrt(n)))
+    i = np.arange(n)
+    positions = np.zeros((n, 3))
+    positions[:, 0] = (i % side - side / 2) * spacing
+    positions[:, 1] = 1.0
+    positions[:, 2] = (i // side - side / 2) * spacing
+    return positions
+
+
+# Nome da medida, dialeto e escritor
+XML_WRITERS = [
+    ("xml_scene", DIALECT_SCENE, WRITERS[DIALECT_SCENE]),
+    ("xml_attributes", DIALECT_ATTRIBUTES, WRITERS[DIALECT_ATTRIBUTES]),
+    ("xml_children", DIALECT_CHILDREN, WRITERS[DIALECT_CHILDREN]),
+]
+
+
+# Criar n cubos como criar_cubo: um clique (uma chamada) de cada vez, depois
+# todos de uma vez como ao carregar um cenário, e por fim com um loadURDF por
+# cubo (o caminho dos simuladores que não usam o CubeSpawner), para comparar
+def bench_spawn(n):
+    results = {}
+    p.resetSimulation()
+    create_world()
+    spawner = CubeSpawner()
+    latencies = []
+    for position in grid_positions(n):
+        start = time.perf_counter()
+        spawner.spawn([position])
+        latencies.append(time.perf_counter() - start)
+    results["spawn_click"] = summarize(latencies, n, "cubos")
+
+    p.resetSimulation()
+    create_world()
+    spawner.reset()
+    start = time.perf_counter()
+    spawner.spawn(grid_positions(n))
+    results["spawn_batch"] = summarize([time.perf_counter() - start], n, "cubos")
+
+    p.resetSimulation()
+    create_world()
+    latencies = []
+    for position in grid_positions(n).tolist():
+        start = time.perf_counter()
+        p.loadURDF("cube.urdf", position)
+        latencies.append(time.perf_counter() - start)
+    results["spawn_urdf"] = summarize(latencies, n, "cubos")
+    return results
+
+
+# Avançar a simulação durante `seconds` segundos simulados e ler as poses de
+# todos os cubos depois de cada passo com a PoseSync (como PhysicsScheduler._publish)
+def bench_step_sync(n, seconds, timestep=1.0 / 240.0):
+    p.resetSimulation()
+    create_world()
+    p.setTimeStep(timestep)
+    body_ids = CubeSpawner().spawn(grid_positions(n))
+    poses = PoseSync()
+
+    steps = int(round(seconds / timestep))
+    step_latencies = []
+    sync_latencies = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        p.stepSimulation()
+        middle = time.perf_counter()
+        poses.sync(body_ids)
+        end = time.perf_counter()
+        step_latencies.append(middle - start)
+        sync_latencies.append(end - middle)
+    return {
+        "step": summarize(step_latencies, steps, "passos"),
+        "sync": summarize(sync_latencies, steps * n, "poses"),
+    }
+
+
+# Desenhar `frames` frames com o chão quadriculado e os cubos em lote (os
+# mesmos caminhos de draw_grid e do CubeRenderer). glFinish garante que o
+# tempo inclui o trabalho do OpenGL e não só o envio dos comandos.
+def bench_render(n, frames):
+    floor = CachedMesh(build_checkerboard)
+    renderer = CubeRenderer(color=(0, 0, 1))
+    positions = grid_positions(n)
+    orientations = np.zeros((n, 4))
+    orientations[:, 3] = 1.0
+    latencies = []
+    for frame in range(frames + 1):
+        start = time.perf_counter()
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glLoadIdentity()
+        gluPerspective(45, (DISPLAY[0] / DISPLAY[1]), 0.1, 50.0)
+        glTranslatef(0, 0, -20)
+        floor.draw(20, (1, 1, 1), (0, 1, 0))
+        positions[:, 1] = 1.0 + 0.01 * frame  # As poses mudam todos os frames
+        orientations[:, 2] = np.sin(0.005 * frame)  # Rodam todos os frames
+        orientations[:, 3] = np.cos(0.005 * frame)
+        renderer.update(positions, orientations=orientations)
+        renderer.draw()
+        glFinish()
+        pygame.display.flip()
+        if frame:  # O primeiro frame inclui a criação dos buffers
+            latencies.append(time.perf_counter() - start)
+    renderer.delete()
+    return {"render": summarize(latencies, frames, "frames")}
+
+
+# Gravar e voltar a ler o cenário com cada escritor de XML e no formato binário
+def bench_save_load(n, repeats):
+    with tempfile.TemporaryDirectory() as directory:
+        return _save_load(n, repeats, directory)
+
+
+def _save_load(n, repeats, directory):
+    scene = SceneStore()
+    scene.add_many(grid_positions(n))
+    results = {}
+    formats = [(name, dialect, writer, ".xml") for name, dialect, writer in XML_WRITERS]
+    formats.append(("sim3d", None, lambda path, positions: scene.save_binary(path), ".sim3d"))
+    for name, dialect, writer, extension in formats:
+        path = os.path.join(directory, "cenario" + extension)
+        save_latencies = []
+        load_latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            writer(path, scene.positions)
+            save_latencies.append(time.perf_counter() - start)
+
+            loaded = SceneStore()
+            start = time.perf_counter()
+            if extension == ".sim3d":
+                loaded.load_binary(path)
+            else:
+                stream = SceneStream(path)
+                for positions in stream:
+                    loaded.add_many(positions)
+            load_latencies.append(time.perf_counter() - start)
+            if dialect is not None and stream.dialect != dialect:
+                raise RuntimeError("%s: dialeto lido %s em vez de %s" % (name, stream.dialect, dialect))
+            if len(loaded) != n:
+                raise RuntimeError("%s: lidos %d cubos em vez de %d" % (name, len(loaded), n))
+        results[name + "_save"] = summarize(save_latencies, repeats * n, "cubos")
+        results[name + "_load"] = summarize(load_latencies, repeats * n, "cubos")
+    return results
+
+
+# Corre todas as medidas e devolve o dicionário gravado em JSON
+def run(cubes=1000, seconds=2.0, frames=200, repeats=3, only=None):
+    pygame.init()
+    pygame.display.set_mode(DISPLAY, DOUBLEBUF | OPENGL)
+    glEnable(GL_DEPTH_TEST)
+    p.connect(p.DIRECT)
+
+    benchmarks = {
+        "spawn": lambda: bench_spawn(cubes),
+        "step": lambda: bench_step_sync(cubes, seconds),
+        "render": lambda: bench_render(cubes, frames),
+        "xml": lambda: bench_save_load(cubes, repeats),
+    }
+    results = {}
+    try:
+        for name, bench in benchmarks.items():
+            if only and name not in only:
+                continue
+            results.update(bench())
+    finally:
+        renderer_name = glGetString(GL_RENDERER)
+        p.disconnect()
+        pygame.quit()
+
+    return {
+        "config": {"cubes": cubes, "seconds": seconds, "frames": frames, "repeats": repeats},
+        "machine": {
+            "python": host.python_version(),
+            "platform": host.platform(),
+            "gl_renderer": renderer_name.decode() if renderer_name else None,
+        },
+        "results": results,
+    }
+
+
+# Compara os resultados com uma baseline. Uma medida regride se o débito
+# baixar ou se o p50 subir mais do que `threshold` (fração). O p95/p99 não
+# entra na decisão porque com poucas amostras varia demasiado entre execuções.
+def compare(results, baseline, threshold=THRESHOLD):
+    rows = []
+    for name, current in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        changes = {}
+        if old["throughput"] > 0:
+            changes["throughput"] = old["throughput"] / max(current["throughput"], 1e-12) - 1.0
+        if old["p50_ms"] > 0:
+            changes["p50_ms"] = current["p50_ms"] / old["p50_ms"] - 1.0
+        worst = max(changes.values()) if changes else 0.0
+        rows.append((name, old, current, worst, worst > threshold))
+    return rows
+
+
+def print_results(results):
+    print("%-32s %12s %10s %10s %10s" % ("medida", "débito/s", "p50 ms", "p95 ms", "p99 ms"))
+    for name, r in results["results"].items():
+        print("%-32s %12.1f %10.3f %10.3f %10.3f" % (name, r["throughput"], r["p50_ms"], r["p95_ms"], r["p99_ms"]))
+
+
+def print_comparison(rows, threshold):
+    print("\n%-32s %12s %12s %8s" % ("medida", "p50 antes", "p50 agora", "piora"))
+    for name, old, current, worst, regressed in rows:
+        print("%-32s %12.3f %12.3f %+7.1f%% %s" % (
+            name, old["p50_ms"], current["p50_ms"], worst * 100.0, "REGRESSÃO" if regressed else ""))
+    regressions = sum(1 for row in rows if row[4])
+    print("\n%d regressões (limite %.0f%%)" % (regressions, threshold * 100.0))
+    return regressions
+
+
+# Uso: python -m simulador.benchmark --out resultados.json
+#      python -m simulador.benchmark --baseline baseline.json   (sai com código 1 se houver regressões)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do simulador sem ecrã nem GPU")
+    parser.add_argument("--cubes", type=int, default=1000, help="número de cubos")
+    parser.add_argument("--seconds", type=float, default=2.0, help="segundos simulados no passo da física")
+    parser.add_argument("--frames", type=int, default=200, help="frames desenhados")
+    parser.add_argument("--repeats", type=int, default=3, help="repetições de cada gravação/leitura")
+    parser.add_argument("--only", nargs="+", choices=["spawn", "step", "render", "xml"], help="medidas a correr")
+    parser.add_argument("--out", help="ficheiro JSON com os resultados")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="piora tolerada (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.cubes, args.seconds, args.frames, args.repeats, args.only)
+    print_results(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["config"] != results["config"]:
+            print("Aviso: a baseline foi gravada com outra configuração: %s" % baseline["config"])
+        if print_comparison(compare(results, baseline, args.threshold), args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import sys
+
+import numpy as np
+
+from simulador.scene_loader import SceneStream, WRITERS, DIALECT_ATTRIBUTES
+
+# Formato binário de cenários (.sim3d):
+#   cabeçalho de 64 bytes (assinatura, versão, número de cubos, limites)
+#   seguido de arrays contíguos, um por campo, pela ordem de FIELDS.
+# O ficheiro é aberto com memory-map, por isso abrir um cenário enorme é
+# imediato e só as páginas efetivamente usadas são lidas do disco.
+EXTENSION = ".sim3d"
+MAGIC = b"SIM3D\0\0\0"
+SCHEMA_VERSION = 1
+HEADER_SIZE = 64
+
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("count", "<u8"),
+    ("bounds_min", "<f4", (3,)),
+    ("bounds_max", "<f4", (3,)),
+])
+
+# Campos por cubo: nome, tipo, número de componentes e valor por omissão
+FIELDS = [
+    ("positions", np.dtype("<f4"), 3, (0.0, 0.0, 0.0)),
+    ("orientations", np.dtype("<f4"), 4, (0.0, 0.0, 0.0, 1.0)),  # Quaterniões (x, y, z, w)
+    ("sizes", np.dtype("<f4"), 3, (1.0, 1.0, 1.0)),  # Meia aresta por eixo (como em draw_cube)
+    ("colors", np.dtype("u1"), 4, (0, 0, 255, 255)),  # RGBA
+    ("textures", np.dtype("<i4"), 1, (-1,)),  # Índice da textura (-1 = sem textura)
+]
+
+
+# Grava um cenário no formato binário. Só as posições são obrigatórias.
+def save_binary_scene(path, positions, orientations=None, sizes=None, colors=None, textures=None):
+    positions = np.asarray(positions, dtype="<f4").reshape(-1, 3)
+    count = len(positions)
+    values = {"positions": positions, "orientations": orientations, "sizes": sizes,
+              "colors": colors, "textures": textures}
+
+    header = np.zeros(1, dtype=HEADER)
+    header["magic"] = MAGIC
+    header["version"] = SCHEMA_VERSION
+    header["header_size"] = HEADER_SIZE
+    header["count"] = count
+    if count:
+        header["bounds_min"] = positions.min(axis=0)
+        header["bounds_max"] = positions.max(axis=0)
+
+    with open(path, "wb") as f:
+        f.write(header.tobytes().ljust(HEADER_SIZE, b"\0"))
+        for name, dtype, components, default in FIELDS:
+            value = values[name]
+            if value is None:
+                array = np.empty((count, components), dtype=dtype)
+                array[:] = default
+            else:
+                array = np.asarray(value, dtype=dtype).reshape(count, components)
+            f.write(np.ascontiguousarray(array).data)
+
+
+# Cenário binário aberto com memory-map. Os campos (positions, orientations,
+# sizes, colors, textures) são arrays NumPy ligados diretamente ao ficheiro;
+# com mode="r+" as alterações são escritas no próprio ficheiro.
+class BinaryScene:
+    def __init__(self, path, mode="r"):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC.rstrip(b"\0"):
+            raise ValueError("Não é um cenário binário: %s" % path)
+        self.version = int(header["version"][0])
+        if self.version > SCHEMA_VERSION:
+            raise ValueError("Versão do cenário não suportada: %d" % self.version)
+
+        self.count = int(header["count"][0])
+        self.bounds = (header["bounds_min"][0].copy(), header["bounds_max"][0].copy())
+        offset = int(header["header_size"][0])
+        for name, dtype, components, default in FIELDS:
+            if self.count:
+                array = np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=(self.count, components))
+            else:
+                array = np.empty((0, components), dtype=dtype)
+            if components == 1:
+                array = array[:, 0]
+            setattr(self, name, array)
+            offset += self.count * components * dtype.itemsize
+
+    def __len__(self):
+        return self.count
+
+    # Devolve as posições em lotes (como SceneStream), para carregar aos poucos
+    def batches(self, batch_size=4096):
+        for start in range(0, self.count, batch_size):
+            yield np.array(self.positions[start:start + batch_size], dtype=np.float64)
+
+    # Devolve todos os campos em lotes (dicionários nome -> array copiado do
+    # ficheiro), para carregar aos poucos sem perder orientações, tamanhos,
+    # cores e texturas
+    def field_batches(self, batch_size=4096):
+        for start in range(0, self.count, batch_size):
+            yield {name: np.array(getattr(self, name)[start:start + batch_size]) for name, _, _, _ in FIELDS}
+
+    # Escreve no disco as alterações feitas com mode="r+"
+    def flush(self):
+        for name, _, _, _ in FIELDS:
+            array = getattr(self, name)
+            base = array if isinstance(array, np.memmap) else array.base
+            if isinstance(base, np.memmap):
+                base.flush()
+
+
+# Abre um cenário binário
+def open_binary_scene(path, mode="r"):
+    return BinaryScene(path, mode)
+
+
+# Converte um cenário XML (qualquer dialeto) para o formato binário
+def xml_to_binary(xml_path, binary_path):
+    batches = [batch.astype("<f4") for batch in SceneStream(xml_path)]
+    positions = np.concatenate(batches) if batches else np.empty((0, 3), dtype="<f4")
+    save_binary_scene(binary_path, positions)
+    return len(positions)
+
+
+# Converte um cenário binário para XML, no dialeto pedido (com os mesmos
+# escritores que os simuladores usam para gravar)
+def binary_to_xml(binary_path, xml_path, dialect=DIALECT_ATTRIBUTES):
+    scene = BinaryScene(binary_path)
+    WRITERS[dialect](xml_path, scene.positions)
+    return scene.count
+
+
+# Uso: python -m simulador.binary_scene entrada.xml saida.sim3d
+#      python -m simulador.binary_scene entrada.sim3d saida.xml
+if __name__ == "__main__":
+    source, target = sys.argv[1:3]
+    if source.endswith(EXTENSION):
+        count = binary_to_xml(source, target)
+    else:
+        count = xml_to_binary(source, target)
+    print("%d cubos convertidos: %s -> %s" % (count, source, target))
@@ -0,0 +1,294 @@
+import ctypes
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+from OpenGL.GL import *
+
+# Gravação em bruto (.frames): cabeçalho de 64 bytes seguido das imagens RGB
+# do framebuffer, todas do mesmo tamanho e tal como o OpenGL as lê (de baixo
+# para cima). Como em simulador/trajectory.py, o ficheiro é lido com
+# memory-map e qualquer imagem é acessível de imediato.
+EXTENSION = ".frames"
+MAGIC = b"SIMFRMS\0"
+SCHEMA_VERSION = 1
+HEADER_SIZE = 64
+
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("channels", "<u4"),
+])
+
+# Buffers de pixels (PBO) em anel: uma leitura só é copiada para a memória
+# PBO_COUNT - 1 frames depois de pedida, quando a GPU já a terminou
+PBO_COUNT = 3
+
+# Imagens da gravação à espera de serem gravadas; acima disto as novas são
+# descartadas (e contadas) em vez de fazerem esperar o desenho
+MAX_PENDING = 8
+
+# Compressão dos PNG da gravação (1 = rápida; as capturas usam a normal)
+RECORDING_PNG_LEVEL = 1
+
+
+# Grava uma imagem do framebuffer (altura x largura x 3, de baixo para cima) em PNG
+def write_png(path, pixels, compress_level=6):
+    Image.fromarray(pixels[::-1]).save(path, compress_level=compress_level)
+
+
+# Gravação em bruto aberta com memory-map; frame(i) devolve a imagem i já
+# virada para cima (altura x largura x 3)
+class RawFrames:
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC.rstrip(b"\0"):
+            raise ValueError("Não é uma gravação de imagens: %s" % path)
+        if int(header["version"][0]) > SCHEMA_VERSION:
+            raise ValueError("Versão da gravação não suportada: %d" % int(header["version"][0]))
+
+        self.width = int(header["width"][0])
+        self.height = int(header["height"][0])
+        shape = (self.height, self.width, int(header["channels"][0]))
+        offset = int(header["header_size"][0])
+        count = (os.path.getsize(path) - offset) // int(np.prod(shape))
+        if count:
+            self.frames = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(count,) + shape)
+        else:
+            self.frames = np.empty((0,) + shape, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, i):
+        return self.frames[i][::-1]
+
+
+# Capturas da janela OpenGL sem parar o desenho. capture(), chamado em cada
+# frame depois de desenhar a cena (e antes dos menus e do flip), pede à GPU
+# que copie o framebuffer para um PBO; a cópia para a memória só é feita
+# alguns frames depois, quando já terminou, e a codificação em PNG (ou a
+# escrita em bruto) corre numa thread.
+#
+# request() tira uma captura no próximo frame. start_recording() grava todos
+# os frames até stop_recording(): como PNG numerados numa pasta ou, com
+# raw=True, num único ficheiro .frames (ver RawFrames), muito mais rápido de
+# escrever. Se as threads não acompanharem, os frames a mais são descartados
+# e contados em `dropped`.
+#
+#     capture.request("captura.png")
+#     ...
+#     draw_scene()
+#     capture.capture()
+#     menu.draw()
+#     pygame.display.flip()
+class FrameCapture:
+    def __init__(self, workers=2, pbo_count=PBO_COUNT, max_pending=MAX_PENDING):
+        self.encoders = ThreadPoolExecutor(workers, thread_name_prefix="capturas")
+        self.raw_writer = None  # Uma só thread, para as imagens ficarem por ordem
+        self.pbo_count = pbo_count
+        self.max_pending = max_pending
+        self.pbos = None
+        self.size = None  # Tamanho (largura, altura) dos PBO
+        self.free = []  # PBO livres
+        self.in_flight = deque()  # (pbo, frame, largura, altura, screenshots, gravar?)
+        self.pending = set()  # Imagens a ser gravadas nas threads
+        self.requests = []  # Capturas pedidas para o próximo frame
+        self.frame = 0
+
+        self.recording = False
+        self.recording_path = None
+        self.raw_file = None
+        self.raw_size = None  # Tamanho das imagens no ficheiro em bruto
+        self.recorded = 0  # Imagens da gravação entregues às threads
+        self.captured = 0  # Frames lidos da GPU
+        self.written = 0  # Imagens gravadas
+        self.dropped = 0  # Frames da gravação descartados
+        self.errors = 0
+        self.readback_time = 0.0  # Tempo na thread principal (pedir e copiar), em segundos
+
+    # Tira uma captura no próximo frame
+    def request(self, path):
+        self.requests.append(path)
+
+    # Começa a gravar todos os frames: PNG numerados na pasta `path` ou, com
+    # raw=True, no ficheiro `path` (.frames)
+    def start_recording(self, path, raw=False):
+        if self.recording:
+            self.stop_recording()
+        self.recording = True
+        self.recording_path = path
+        self.recorded = 0
+        self.dropped = 0
+        self.raw_size = None
+        if raw:
+            self.raw_writer = ThreadPoolExecutor(1, thread_name_prefix="gravacao")
+            self.raw_file = open(path, "wb")
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    # Termina a gravação (espera pelas imagens em curso) e devolve as estatísticas
+    def stop_recording(self):
+        if not self.recording:
+            return self.stats()
+        self.flush()
+        self.recording = False
+        if self.raw_writer is not None:
+            self.raw_writer.shutdown(wait=True)
+            self.raw_writer = None
+            self.raw_file.close()
+            self.raw_file = None
+        return self.stats()
+
+    # Se ainda há capturas por terminar (para continuar a desenhar em modo idle)
+    def busy(self):
+        return bool(self.requests or self.in_flight or self.recording)
+
+    # Lê o framebuffer deste frame (se for preciso) e entrega as leituras já prontas
+    def capture(self):
+        self.frame += 1
+        if not (self.requests or self.recording or self.in_flight):
+            return
+        start = time.perf_counter()
+        self._collect_done()
+
+        if self.requests or self.recording:
+            viewport = glGetIntegerv(GL_VIEWPORT)
+            width, height = int(viewport[2]), int(viewport[3])
+            if self.size != (width, height):
+                self._resize(width, height)
+            if not self.free:
+                self._collect(*self.in_flight.popleft())  # Só acontece se o anel for pequeno demais
+
+            pbo = self.free.pop()
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glPixelStorei(GL_PACK_ALIGNMENT, 1)
+            glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+            self.in_flight.append((pbo, self.frame, width, height, self.requests, self.recording))
+            self.requests = []
+
+        # Leituras pedidas há PBO_COUNT - 1 frames já terminaram na GPU
+        while self.in_flight and self.in_flight[0][1] <= self.frame - (self.pbo_count - 1):
+            self._collect(*self.in_flight.popleft())
+        self.readback_time += time.perf_counter() - start
+
+    # Entrega todas as leituras em curso (sem esperar pelos frames seguintes)
+    def flush(self):
+        while self.in_flight:
+            self._collect(*self.in_flight.popleft())
+        for future in list(self.pending):
+            future.result()
+        self._collect_done()
+
+    def _resize(self, width, height):
+        self.flush()
+        if self.pbos is not None:
+            glDeleteBuffers(len(self.pbos), self.pbos)
+        self.pbos = list(np.atleast_1d(glGenBuffers(self.pbo_count)))
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, width * height * 3, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.free = list(self.pbos)
+        self.size = (width, height)
+
+    # Copia a leitura de um PBO para a memória e entrega-a às threads
+    def _collect(self, pbo, frame, width, height, screenshots, record):
+        record = record and self.recording
+        if record and len(self.pending) >= self.max_pending:
+            self.dropped += 1  # As threads não acompanham: não se faz esperar o desenho
+            record = False
+        if screenshots or record:
+            pixels = np.empty((height, width, 3), dtype=np.uint8)
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            pointer = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+            ctypes.memmove(pixels.ctypes.data, pointer, pixels.nbytes)
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+            self.captured += 1
+
+            for path in screenshots:
+                self._submit(self.encoders, write_png, path, pixels)
+            if record and self.raw_file is not None:
+                if self.raw_size is None:
+                    self.raw_size = (width, height)
+                    self.raw_file.write(self._raw_header(width, height))
+                if self.raw_size == (width, height):
+                    self.recorded += 1
+                    self._submit(self.raw_writer, self.raw_file.write, pixels.data)
+                else:
+                    # Um ficheiro em bruto só tem um tamanho de imagem
+                    self.dropped += 1
+            elif record:
+                self.recorded += 1
+                path = os.path.join(self.recording_path, "frame-%06d.png" % frame)
+                self._submit(self.encoders, write_png, path, pixels, RECORDING_PNG_LEVEL)
+        self.free.append(pbo)
+
+    def _submit(self, executor, function, *args):
+        self.pending.add(executor.submit(function, *args))
+
+    # Conta as imagens já gravadas
+    def _collect_done(self):
+        done = {future for future in self.pending if future.done()}
+        for future in done:
+            error = future.exception()
+            if error is None:
+                self.written += 1
+            else:
+                self.errors += 1
+                print("Erro ao gravar a captura: %s" % error)
+        self.pending -= done
+
+    @staticmethod
+    def _raw_header(width, height):
+        header = np.zeros(1, dtype=HEADER)
+        header["magic"] = MAGIC
+        header["version"] = SCHEMA_VERSION
+        header["header_size"] = HEADER_SIZE
+        header["width"] = width
+        header["height"] = height
+        header["channels"] = 3
+        return header.tobytes().ljust(HEADER_SIZE, b"\0")
+
+    def stats(self):
+        return {
+            "captured": self.captured,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "pending": len(self.pending),
+            "readback_ms": self.readback_time * 1000.0,
+        }
+
+    # Acaba de gravar tudo e liberta os PBO e as threads
+    def close(self):
+        self.stop_recording()
+        self.flush()
+        self.encoders.shutdown(wait=True)
+        if self.pbos is not None:
+            glDeleteBuffers(len(self.pbos), self.pbos)
+            self.pbos = None
+            self.size = None
+
+
+# Uso: python -m simulador.capture gravacao.frames pasta
+# Converte uma gravação em bruto em PNG numerados
+if __name__ == "__main__":
+    frames = RawFrames(sys.argv[1])
+    os.makedirs(sys.argv[2], exist_ok=True)
+    start = time.perf_counter()
+    for i in range(len(frames)):
+        Image.fromarray(frames.frame(i)).save(os.path.join(sys.argv[2], "frame-%06d.png" % i))
+    print("%d imagens %d x %d convertidas em %.1f s" % (len(frames), frames.width, frames.height,
+                                                      time.perf_counter() - start))
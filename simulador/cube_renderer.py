@@ -0,0 +1,180 @@
+import numpy as np
+from OpenGL.GL import *
+
+# Estilos de desenho suportados
+WIREFRAME = "wireframe"
+SOLID = "solid"
+
+# Vértices de um cubo centrado na origem (meia aresta = 1, como em draw_cube)
+CUBE_VERTICES = np.array([
+    (1, -1, -1), (1, 1, -1), (-1, 1, -1), (-1, -1, -1),
+    (1, -1, 1), (1, 1, 1), (-1, -1, 1), (-1, 1, 1),
+], dtype=np.float32)
+
+# Arestas do cubo (usadas no modo wireframe)
+CUBE_EDGES = [
+    (0, 1), (1, 2), (2, 3), (3, 0),
+    (4, 5), (5, 6), (6, 7), (7, 4),
+    (0, 4), (1, 5), (2, 6), (3, 7)
+]
+
+# Faces do cubo e respetivas cores (como em drawCube do 3Dsimulator-0-0.py)
+CUBE_FACES = [
+    (6, 4, 5, 7),  # Frente
+    (3, 2, 1, 0),  # Trás
+    (3, 6, 7, 2),  # Esquerda
+    (0, 1, 5, 4),  # Direita
+    (2, 7, 5, 1),  # Cima
+    (3, 0, 4, 6),  # Baixo
+]
+FACE_COLORS = np.array([
+    (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0),
+    (1.0, 1.0, 0.0), (1.0, 0.0, 1.0), (0.0, 1.0, 1.0),
+], dtype=np.float32)
+
+# Geometria base de um cubo já expandida por primitiva (24 vértices em ambos os estilos)
+LINE_VERTICES = CUBE_VERTICES[np.array(CUBE_EDGES).ravel()]
+QUAD_VERTICES = CUBE_VERTICES[np.array(CUBE_FACES).ravel()]
+QUAD_COLORS = np.repeat(FACE_COLORS, 4, axis=0)
+VERTICES_PER_CUBE = 24
+
+
+# Converte quaterniões (N x 4, ordem x, y, z, w do PyBullet) em matrizes de
+# rotação (N x 3 x 3) de uma só vez, para usar em CubeRenderer.update
+def quaternions_to_matrices(quaternions, out=None):
+    q = np.asarray(quaternions, dtype=np.float32).reshape(-1, 4)
+    x, y, z, w = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    if out is None:
+        out = np.empty((len(q), 3, 3), dtype=np.float32)
+    xx, yy, zz = x * x, y * y, z * z
+    xy, xz, yz = x * y, x * z, y * z
+    wx, wy, wz = w * x, w * y, w * z
+    out[:, 0, 0] = 1 - 2 * (yy + zz)
+    out[:, 0, 1] = 2 * (xy - wz)
+    out[:, 0, 2] = 2 * (xz + wy)
+    out[:, 1, 0] = 2 * (xy + wz)
+    out[:, 1, 1] = 1 - 2 * (xx + zz)
+    out[:, 1, 2] = 2 * (yz - wx)
+    out[:, 2, 0] = 2 * (xz - wy)
+    out[:, 2, 1] = 2 * (yz + wx)
+    out[:, 2, 2] = 1 - 2 * (xx + yy)
+    return out
+
+
+# Desenha muitos cubos de uma só vez a partir de vertex buffer objects.
+# Em vez de 24 chamadas glVertex3fv por cubo, os vértices de todos os cubos
+# são calculados com NumPy num buffer empacotado e enviados para a GPU uma vez
+# por frame, sendo desenhados com uma única chamada glDrawArrays.
+class CubeRenderer:
+    def __init__(self, style=WIREFRAME, color=(0.0, 0.0, 1.0), capacity=256):
+        if style not in (WIREFRAME, SOLID):
+            raise ValueError("Estilo de cubo desconhecido: %r" % (style,))
+
+        self.style = style
+        self.color = np.array(color, dtype=np.float32)
+        if style == WIREFRAME:
+            self.template = LINE_VERTICES
+            self.primitive = GL_LINES
+        else:
+            self.template = QUAD_VERTICES
+            self.primitive = GL_QUADS
+
+        self.count = 0  # Número de cubos atualmente no buffer
+        self.capacity = 0
+        self.vertex_vbo, self.color_vbo = glGenBuffers(2)
+        self.vertices = None
+        self.rotations = None
+        self.colors = None
+        self.colors_dirty = True
+        self.default_colors = False
+        self.reserve(capacity)
+
+    # Garante espaço para pelo menos n cubos (cresce para o dobro para amortizar)
+    def reserve(self, n):
+        if n <= self.capacity:
+            return False
+
+        capacity = max(n, self.capacity * 2, 1)
+        self.vertices = np.empty((capacity, VERTICES_PER_CUBE, 3), dtype=np.float32)
+        self.rotations = np.empty((capacity, 3, 3), dtype=np.float32)
+        self.colors = np.empty((capacity, VERTICES_PER_CUBE, 3), dtype=np.float32)
+        self.capacity = capacity
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, self.color_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.colors.nbytes, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.colors_dirty = True
+        return True
+
+    # Atualiza o buffer com as posições (N x 3) dos cubos.
+    # sizes: meia aresta por cubo (N) ou por eixo (N x 3)
+    # rotations: matrizes de rotação (N x 3 x 3)
+    # orientations: quaterniões (N x 4) do PyBullet, em vez de rotations; são
+    #               convertidos de uma vez para um buffer do próprio renderer
+    # colors: cor por cubo (N x 3); por omissão usa a cor/estilo do renderer
+    def update(self, positions, sizes=None, rotations=None, colors=None, orientations=None):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        n = len(positions)
+        self.reserve(n)
+        if n != self.count:
+            self.colors_dirty = True
+        self.count = n
+        if n == 0:
+            return
+
+        vertices = self.vertices[:n]
+        vertices[:] = self.template
+        if sizes is not None:
+            vertices *= np.asarray(sizes, dtype=np.float32).reshape(n, 1, -1)
+        if orientations is not None:
+            rotations = quaternions_to_matrices(orientations, out=self.rotations[:n])
+        if rotations is not None:
+            rotations = np.asarray(rotations, dtype=np.float32).reshape(n, 3, 3)
+            np.matmul(vertices, rotations.transpose(0, 2, 1), out=vertices)
+        vertices += positions[:, None, :]
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+
+        # As cores só são reenviadas quando mudam
+        upload_colors = True
+        if colors is not None:
+            self.colors[:n] = np.asarray(colors, dtype=np.float32).reshape(n, 1, 3)
+            self.default_colors = False
+        elif self.colors_dirty or not self.default_colors:
+            self.colors[:n] = self.color if self.style == WIREFRAME else QUAD_COLORS
+            self.default_colors = True
+        else:
+            upload_colors = False
+
+        if upload_colors:
+            glBindBuffer(GL_ARRAY_BUFFER, self.color_vbo)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, self.colors[:n].nbytes, self.colors[:n])
+        self.colors_dirty = False
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    # Desenha todos os cubos do buffer com uma única chamada
+    def draw(self):
+        if self.count == 0:
+            return
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_vbo)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, self.color_vbo)
+        glColorPointer(3, GL_FLOAT, 0, None)
+
+        glDrawArrays(self.primitive, 0, self.count * VERTICES_PER_CUBE)
+
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    # Liberta os buffers da GPU
+    def delete(self):
+        glDeleteBuffers(2, [self.vertex_vbo, self.color_vbo])
+        self.count = 0
+        self.capacity = 0
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+# Os 6 planos do frustum da câmera (esquerda, direita, baixo, cima, perto,
+# longe) no espaço do mundo, como linhas (a, b, c, d) com a normal para dentro.
+# Extraídos diretamente da matriz projeção x modelview.
+def frustum_planes(camera):
+    clip = camera.projection @ camera.modelview
+    planes = np.array([
+        clip[3] + clip[0], clip[3] - clip[0],
+        clip[3] + clip[1], clip[3] - clip[1],
+        clip[3] + clip[2], clip[3] - clip[2],
+    ])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+# Posição do olho da câmera no mundo
+def camera_eye(camera):
+    return np.linalg.inv(camera.modelview)[:3, 3]
+
+
+# Máscara das caixas (centros e meias arestas N x 3, ou meia aresta única)
+# que estão pelo menos em parte dentro do frustum e, se max_distance for dado,
+# a menos dessa distância do olho. Um único teste vetorizado para todas as caixas.
+def visible_boxes(planes, centers, half_extents, eye=None, max_distance=None):
+    centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+    half_extents = np.broadcast_to(np.asarray(half_extents, dtype=np.float64), centers.shape)
+
+    # Distância do centro a cada plano e "raio" da caixa na direção da normal
+    distances = centers @ planes[:, :3].T + planes[:, 3]
+    radii = half_extents @ np.abs(planes[:, :3]).T
+    visible = np.all(distances + radii >= 0, axis=1)
+
+    if max_distance is not None:
+        reach = max_distance + np.linalg.norm(half_extents, axis=1)
+        offset = centers - eye
+        visible &= np.einsum("ij,ij->i", offset, offset) <= reach * reach
+    return visible
+
+
+# Descarta o que está fora do campo de visão (e, opcionalmente, longe demais)
+# e conta quantos objetos de cada tipo foram desenhados e descartados no frame.
+#
+#     culler.begin_frame(capture_camera())
+#     visible = culler.cull("cubos", scene.positions, scene.sizes)
+#     renderer.update(scene.positions[visible])
+class FrustumCuller:
+    def __init__(self, max_distance=None, enabled=True):
+        self.max_distance = max_distance  # None = sem limite de distância
+        self.enabled = enabled
+        self.planes = None
+        self.eye = None
+        self.counts = {}  # nome -> (desenhados, descartados) no frame atual
+
+    # Prepara o frame com as matrizes da câmera (ver picking.capture_camera)
+    def begin_frame(self, camera):
+        self.planes = frustum_planes(camera)
+        self.eye = camera_eye(camera)
+        self.counts = {}
+
+    # Máscara dos objetos a desenhar
+    def cull(self, name, centers, half_extents):
+        if not self.enabled or self.planes is None:
+            visible = np.ones(len(centers), dtype=bool)
+        else:
+            visible = visible_boxes(self.planes, centers, half_extents, self.eye, self.max_distance)
+        drawn = int(np.count_nonzero(visible))
+        self.counts[name] = (drawn, len(visible) - drawn)
+        return visible
+
+    # Texto com as contagens do frame, por exemplo para o título da janela
+    def summary(self):
+        return ", ".join("%s: %d desenhados, %d descartados" % (name, drawn, culled)
+                         for name, (drawn, culled) in self.counts.items())
+
+    def toggle(self):
+        self.enabled = not self.enabled
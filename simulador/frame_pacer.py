@@ -0,0 +1,124 @@
+import sys
+import time
+
+import pygame
+
+# Frames por segundo por omissão
+TARGET_FPS = 60
+
+# Em modo idle: quanto tempo se continua a desenhar depois da última mudança
+# e de quanto em quanto tempo se acorda sem eventos para ver se a física mexeu
+IDLE_AFTER = 0.5
+IDLE_TIMEOUT = 0.25
+
+
+# Lê da linha de comandos as opções do ritmo dos frames:
+# script.py --fps 30 --vsync --idle (--fps 0 = sem limite; com --vsync o
+# limite por omissão é o do ecrã)
+def pacer_from_argv(argv=None):
+    argv = sys.argv if argv is None else argv
+    target_fps = None if "--vsync" in argv else TARGET_FPS
+    if "--fps" in argv:
+        i = argv.index("--fps")
+        target_fps = float(argv[i + 1]) if i + 1 < len(argv) else TARGET_FPS
+    return FramePacer(target_fps or None, vsync="--vsync" in argv, idle="--idle" in argv)
+
+
+# Controla o ritmo do ciclo principal em vez de um pygame.time.wait fixo.
+# tick() espera só o que falta para o próximo frame (descontando o tempo que o
+# frame já demorou) e mede o tempo real entre frames (delta, em segundos).
+# Com vsync (e target_fps=None) é o flip que espera pelo ecrã.
+#
+# Em modo idle, depois de IDLE_AFTER segundos sem nada mudar (sem eventos e com
+# a física parada), should_draw() devolve False e events() bloqueia até chegar
+# um evento, por isso um ecrã parado quase não gasta CPU. Quem muda a cena
+# por outra via (física, carregamentos) chama changed().
+#
+#     for event in pacer.events():
+#         ...
+#     if pacer.should_draw():
+#         ...
+#         pygame.display.flip()
+#     pacer.tick()
+class FramePacer:
+    def __init__(self, target_fps=TARGET_FPS, vsync=False, idle=False, idle_after=IDLE_AFTER,
+                 idle_timeout=IDLE_TIMEOUT):
+        self.target_fps = target_fps  # None = sem limite
+        self.vsync = vsync
+        self.idle = idle
+        self.idle_after = idle_after
+        self.idle_timeout = idle_timeout
+
+        now = time.perf_counter()
+        self.last = now
+        self.deadline = now  # Instante em que o próximo frame deve começar
+        self.last_change = now
+        self.delta = 0.0  # Segundos entre os dois últimos ticks
+        self.frames = 0
+        self.drawn = 0
+        self.idle_waits = 0  # Vezes que events() bloqueou à espera de um evento
+        self.sleep_time = 0.0  # Tempo total a dormir em tick() (segundos)
+
+    # Abre a janela com vsync se for pedido (e sem ele se o driver não deixar)
+    def set_mode(self, display, flags):
+        if self.vsync:
+            try:
+                return pygame.display.set_mode(display, flags, vsync=1)
+            except pygame.error:
+                self.vsync = False
+        return pygame.display.set_mode(display, flags)
+
+    # Marca que a cena mudou e tem de ser redesenhada
+    def changed(self):
+        self.last_change = time.perf_counter()
+
+    # Se vale a pena desenhar este frame
+    def should_draw(self):
+        return not self.idle or time.perf_counter() - self.last_change < self.idle_after
+
+    # Eventos pendentes. Em modo idle com a cena parada espera (até
+    # idle_timeout) pelo próximo evento em vez de devolver logo uma lista vazia.
+    def events(self):
+        if self.should_draw():
+            events = pygame.event.get()
+        else:
+            self.idle_waits += 1
+            event = pygame.event.wait(int(self.idle_timeout * 1000))
+            events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+        if events:
+            self.changed()
+        return events
+
+    # Fim do frame: dorme até ao próximo e devolve o delta
+    def tick(self, drawn=True):
+        frame_time = 1.0 / self.target_fps if self.target_fps else 0.0
+        now = time.perf_counter()
+        if frame_time and drawn:
+            self.deadline += frame_time
+            if self.deadline > now:
+                time.sleep(self.deadline - now)
+                self.sleep_time += self.deadline - now
+                now = time.perf_counter()
+            else:
+                self.deadline = now  # Atrasado: não tenta recuperar os frames perdidos
+        else:
+            self.deadline = now
+
+        self.delta = now - self.last
+        self.last = now
+        self.frames += 1
+        self.drawn += int(drawn)
+        return self.delta
+
+    # Frames por segundo medidos no último tick
+    def fps(self):
+        return 1.0 / self.delta if self.delta > 0 else 0.0
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "drawn": self.drawn,
+            "idle_waits": self.idle_waits,
+            "sleep_time": self.sleep_time,
+            "fps": self.fps(),
+        }
@@ -0,0 +1,317 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+from simulador.scene_store import SceneStore
+
+# Gravação automática do cenário em dois ficheiros:
+#   <base>.npz      cópia completa do SceneStore (get_state), com uma geração
+#   <base>.journal  registo só de acrescentar com as alterações feitas depois
+#                   dessa cópia: um registo de tamanho fixo por cubo
+#                   adicionado, removido ou mexido
+# Recuperar é abrir a cópia e repetir o registo por cima. Um registo de outra
+# geração (a cópia foi refeita mas o registo não chegou a ser limpo) é
+# ignorado, porque as suas alterações já estão na cópia.
+MAGIC = b"SIMJRNL\0"
+SCHEMA_VERSION = 1
+HEADER_SIZE = 64
+
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("generation", "<u8"),
+])
+
+# Operações do registo
+ADD = 1
+REMOVE = 2
+MOVE = 3
+CLEAR = 4
+
+RECORD = np.dtype([
+    ("op", "u1"),
+    ("handle", "<i8"),
+    ("positions", "<f8", (3,)),
+    ("orientations", "<f4", (4,)),
+    ("sizes", "<f4", (3,)),
+    ("colors", "u1", (4,)),
+    ("textures", "<i4"),
+])
+
+# Segundos entre escritas do registo e número de registos a partir do qual o
+# registo é dobrado numa cópia nova (compactação)
+AUTOSAVE_INTERVAL = 2.0
+COMPACT_RECORDS = 16384
+
+
+# Caminhos da cópia e do registo
+def journal_paths(base):
+    return base + ".npz", base + ".journal"
+
+
+# Lê a cópia completa: (geração, estado) ou (0, None) se não existir
+def read_snapshot(path):
+    if not os.path.exists(path):
+        return 0, None
+    with np.load(path) as data:
+        state = {
+            "count": int(data["count"]),
+            "next_handle": int(data["next_handle"]),
+            "slot_of": data["slot_of"],
+            "arrays": {key[len("arrays/"):]: data[key] for key in data.files if key.startswith("arrays/")},
+        }
+        return int(data["generation"]), state
+
+
+# Escreve a cópia completa. Primeiro num ficheiro temporário e só depois troca,
+# para que uma falha a meio deixe a cópia anterior intacta.
+def write_snapshot(path, state, generation):
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        np.savez(f, generation=generation, count=state["count"], next_handle=state["next_handle"],
+                 slot_of=state["slot_of"], **{"arrays/" + name: array for name, array in state["arrays"].items()})
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+# Lê os registos de uma geração (um registo incompleto no fim, de uma escrita
+# interrompida, é ignorado)
+def read_records(path, generation):
+    if not os.path.exists(path):
+        return np.empty(0, dtype=RECORD)
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) == 0 or header["magic"][0] != MAGIC.rstrip(b"\0"):
+        raise ValueError("Não é um registo de alterações: %s" % path)
+    if int(header["version"][0]) > SCHEMA_VERSION:
+        raise ValueError("Versão do registo não suportada: %d" % int(header["version"][0]))
+    if int(header["generation"][0]) != generation:
+        return np.empty(0, dtype=RECORD)
+    offset = int(header["header_size"][0])
+    count = (os.path.getsize(path) - offset) // RECORD.itemsize
+    return np.fromfile(path, dtype=RECORD, count=count, offset=offset)
+
+
+# Repete os registos num SceneStore. Os cubos adicionados recebem handles novos
+# do store; `mapping` traduz os handles do registo para esses.
+def replay(store, records):
+    mapping = {}
+    if len(records) == 0:
+        return mapping
+    # Registos seguidos com a mesma operação são aplicados de uma vez
+    runs = np.split(records, np.flatnonzero(np.diff(records["op"])) + 1)
+    for run in runs:
+        op = int(run["op"][0])
+        if op == ADD:
+            handles = store.add_many(run["positions"], orientations=run["orientations"], sizes=run["sizes"],
+                                     colors=run["colors"], textures=run["textures"])
+            mapping.update(zip(run["handle"].tolist(), handles.tolist()))
+        elif op == CLEAR:
+            store.clear()
+        else:
+            handles = [mapping.get(handle, handle) for handle in run["handle"].tolist()]
+            present = np.array([handle in store for handle in handles], dtype=bool)
+            handles = np.asarray(handles, dtype=np.int64)[present]
+            if op == REMOVE:
+                store.remove_many(handles)
+            elif len(handles):
+                slots = store.slots(handles)
+                store.positions[slots] = run["positions"][present]
+                store.orientations[slots] = run["orientations"][present]
+    return mapping
+
+
+# Recupera para `store` o cenário gravado em <base>.npz + <base>.journal e
+# devolve o número de registos repetidos. Os ids do PyBullet não são
+# recuperados (ficam a -1): quem usa física cria os corpos de novo.
+def recover(store, base):
+    snapshot_path, journal_path = journal_paths(base)
+    generation, state = read_snapshot(snapshot_path)
+    if state is not None:
+        state["arrays"]["physics_ids"][:] = -1
+        store.set_state(state)
+    records = read_records(journal_path, generation)
+    replay(store, records)
+    return len(records)
+
+
+# Grava automaticamente um SceneStore. Cada alteração (add, remove, move,
+# clear) fica em memória; autosave(), chamado em cada frame, entrega-as de
+# AUTOSAVE_INTERVAL em AUTOSAVE_INTERVAL segundos a uma thread que as acrescenta
+# ao registo, por isso o custo de cada gravação é proporcional às alterações e
+# não ao tamanho do cenário. Os "move" de um mesmo cubo juntam-se num só
+# registo com a pose mais recente.
+#
+# Quando o registo passa de `compact_records` registos (ou depois de um
+# set_state), a thread escreve uma cópia completa nova e recomeça o registo.
+#
+#     journal = SceneJournal(scene, "autosave")
+#     if journal.exists():
+#         journal.recover()
+#     journal.start()
+#     ...
+#     journal.autosave()  # em cada frame
+#     ...
+#     journal.close()
+class SceneJournal:
+    def __init__(self, store, base, interval=AUTOSAVE_INTERVAL, compact_records=COMPACT_RECORDS):
+        self.store = store
+        self.base = base
+        self.snapshot_path, self.journal_path = journal_paths(base)
+        self.interval = interval
+        self.compact_records = compact_records
+        # Gerações únicas entre sessões: um registo antigo nunca coincide com a cópia nova
+        self.generation = time.time_ns()
+        self.pending = []  # Registos (arrays RECORD) ainda por entregar
+        self.moved = set()  # Handles mexidos desde a última entrega
+        self.needs_snapshot = True  # A próxima entrega é uma cópia completa
+        self.journal_records = 0  # Registos no ficheiro desde a última cópia
+        self.last_save = time.perf_counter()
+        self.writes = 0
+        self.snapshots = 0
+        self.writer = None
+
+    # Se há um cenário gravado por recuperar (de uma sessão que não terminou bem)
+    def exists(self):
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.journal_path)
+
+    # Recupera o cenário gravado para o store (antes de start)
+    def recover(self):
+        return recover(self.store, self.base)
+
+    # Começa a registar as alterações do store
+    def start(self):
+        self.store.edit_listeners.append(self.on_edit)
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self._write, name="scene-journal", daemon=True)
+        self.writer.start()
+        self.save_snapshot()
+
+    def on_edit(self, kind, handles):
+        if kind == "reset":
+            self.needs_snapshot = True
+        elif kind == "move":
+            self.moved.update(np.asarray(handles).tolist())
+        elif kind == "clear":
+            self.moved.clear()
+            record = np.zeros(1, dtype=RECORD)
+            record["op"] = CLEAR
+            self.pending.append(record)
+        elif kind == "remove":
+            self.moved.difference_update(np.asarray(handles).tolist())
+            self.pending.append(self._records(REMOVE, handles))
+        else:
+            self.pending.append(self._records(ADD, handles))
+
+    # Registos de uma operação com os campos atuais de cada cubo
+    def _records(self, op, handles):
+        handles = np.asarray(handles, dtype=np.int64)
+        records = np.zeros(len(handles), dtype=RECORD)
+        records["op"] = op
+        records["handle"] = handles
+        if op != REMOVE and len(handles):
+            slots = self.store.slots(handles)
+            for name in ("positions", "orientations", "sizes", "colors", "textures"):
+                records[name] = self.store.arrays[name][slots]
+        return records
+
+    # Entrega as alterações à thread se já passou o intervalo (ou se force=True)
+    def autosave(self, force=False):
+        if self.writer is None:
+            return False
+        now = time.perf_counter()
+        if not force and now - self.last_save < self.interval:
+            return False
+        self.last_save = now
+
+        if self.moved:
+            moved = [handle for handle in self.moved if handle in self.store]
+            self.pending.append(self._records(MOVE, moved))
+            self.moved.clear()
+        records = np.concatenate(self.pending) if self.pending else np.empty(0, dtype=RECORD)
+        self.pending = []
+
+        if self.needs_snapshot or self.journal_records + len(records) > self.compact_records:
+            self.save_snapshot()
+        elif len(records):
+            self.journal_records += len(records)
+            self.writes += 1
+            self.queue.put(("records", records))
+        return True
+
+    # Cópia completa do store (copiada aqui, escrita na thread) e registo vazio
+    def save_snapshot(self):
+        self.generation += 1
+        self.pending = []
+        self.moved.clear()
+        self.needs_snapshot = False
+        self.journal_records = 0
+        self.snapshots += 1
+        self.queue.put(("snapshot", self.store.get_state(), self.generation))
+
+    def _write(self):
+        journal = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if item[0] == "snapshot":
+                _, state, generation = item
+                write_snapshot(self.snapshot_path, state, generation)
+                # Só depois de a cópia estar no disco é que o registo recomeça
+                if journal is not None:
+                    journal.close()
+                journal = open(self.journal_path, "wb")
+                header = np.zeros(1, dtype=HEADER)
+                header["magic"] = MAGIC
+                header["version"] = SCHEMA_VERSION
+                header["header_size"] = HEADER_SIZE
+                header["generation"] = generation
+                journal.write(header.tobytes().ljust(HEADER_SIZE, b"\0"))
+            else:
+                journal.write(item[1].tobytes())
+            journal.flush()
+            os.fsync(journal.fileno())
+        if journal is not None:
+            journal.close()
+
+    # Pára de registar. Com discard=True (saída normal) apaga os ficheiros, que
+    # só servem para recuperar de uma sessão interrompida; senão grava o que falta.
+    def close(self, discard=False):
+        if self.writer is None:
+            return
+        if self.on_edit in self.store.edit_listeners:
+            self.store.edit_listeners.remove(self.on_edit)
+        if not discard:
+            self.autosave(force=True)
+        self.queue.put(None)
+        self.writer.join()
+        self.writer = None
+        if discard:
+            for path in (self.snapshot_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def stats(self):
+        return {
+            "generation": self.generation,
+            "journal_records": self.journal_records,
+            "writes": self.writes,
+            "snapshots": self.snapshots,
+        }
+
+
+# Uso: python -m simulador.journal autosave
+# Mostra o que seria recuperado de autosave.npz + autosave.journal
+if __name__ == "__main__":
+    base = sys.argv[1]
+    store = SceneStore()
+    start = time.perf_counter()
+    replayed = recover(store, base)
+    print("%d cubos recuperados (%d alterações repetidas) em %.3f s" % (
+        len(store), replayed, time.perf_counter() - start))
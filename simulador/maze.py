@@ -0,0 +1,167 @@
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import pybullet as p
+from PIL import Image
+
+from simulador.cube_renderer import QUAD_VERTICES
+
+# Pasta onde os labirintos já compilados são guardados (um .npz por imagem e parâmetros)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simulador", "labirintos")
+
+# Versão do formato do cache (mudar quando a compilação mudar)
+CACHE_VERSION = 2
+
+# Número máximo de formas numa forma composta do PyBullet
+# (createCollisionShapeArray ignora as restantes)
+MAX_COMPOUND_CHILDREN = 16
+
+# Sombreado de cada face das paredes do labirinto, pela ordem das faces do
+# QUAD_VERTICES (+z, -z, -x, +x, +y, -y); as paredes têm o topo em +y
+WALL_SHADES = np.array([0.65, 0.65, 0.8, 0.8, 1.0, 0.5], dtype=np.float32)
+
+
+# Converte a imagem numa grelha de ocupação (True = parede). A imagem é
+# dividida em blocos de cell_pixels x cell_pixels e um bloco é parede se pelo
+# menos `fill` dos seus pixels forem escuros. Um pixel é escuro se todos os
+# canais estiverem abaixo de `threshold`, por isso as setas vermelhas e as
+# marcas de água claras do labirinto.jpg não contam como paredes.
+def image_to_grid(path, cell_pixels=4, threshold=128, fill=0.5):
+    pixels = np.asarray(Image.open(path).convert("RGB"))
+    dark = pixels.max(axis=2) < threshold
+
+    rows = dark.shape[0] // cell_pixels
+    cols = dark.shape[1] // cell_pixels
+    blocks = dark[:rows * cell_pixels, :cols * cell_pixels].reshape(rows, cell_pixels, cols, cell_pixels)
+    return blocks.mean(axis=(1, 3)) >= fill
+
+
+# Junta as células ocupadas em retângulos alinhados com os eixos.
+# Primeiro cada linha é reduzida a segmentos contínuos (run-length) e depois os
+# segmentos com o mesmo início e fim em linhas seguidas são unidos num só
+# retângulo. Devolve um array N x 4 com (linha0, coluna0, linha1, coluna1), com
+# os fins exclusivos. Tudo vetorizado com NumPy, sem ciclos por célula.
+def merge_rectangles(grid):
+    grid = np.asarray(grid, dtype=bool)
+    if not grid.any():
+        return np.empty((0, 4), dtype=np.int32)
+
+    # Segmentos de cada linha: as mudanças 0->1 e 1->0 da linha com um zero em cada ponta
+    padded = np.zeros((grid.shape[0], grid.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = grid
+    change = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(change == 1)
+    _, ends = np.nonzero(change == -1)  # Mesma ordem (linha a linha, da esquerda para a direita)
+
+    # Ordenar por (início, fim, linha): segmentos iguais em linhas seguidas ficam juntos
+    order = np.lexsort((start_rows, ends, starts))
+    rows, starts, ends = start_rows[order], starts[order], ends[order]
+    new = np.ones(len(rows), dtype=bool)
+    new[1:] = (starts[1:] != starts[:-1]) | (ends[1:] != ends[:-1]) | (rows[1:] != rows[:-1] + 1)
+
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(rows)) - 1
+    return np.stack([rows[first], starts[first], rows[last] + 1, ends[first]], axis=1).astype(np.int32)
+
+
+# Caixas no mundo (centros e meias arestas, N x 3) a partir dos retângulos da grelha.
+# O labirinto fica no chão (plano y = 0, ver simulador/world.py), centrado na
+# origem, com a parte de cima da imagem para -z (longe da câmera) e as paredes
+# a subir em +y; `size` é a largura total em unidades do mundo.
+def rectangles_to_boxes(rectangles, grid_shape, size=20.0, height=1.0):
+    rows, cols = grid_shape
+    cell = size / max(rows, cols)
+    rectangles = np.asarray(rectangles, dtype=np.float64).reshape(-1, 4)
+    row0, col0, row1, col1 = rectangles.T
+
+    centers = np.empty((len(rectangles), 3))
+    centers[:, 0] = ((col0 + col1) / 2 - cols / 2) * cell
+    centers[:, 1] = height / 2
+    centers[:, 2] = ((row0 + row1) / 2 - rows / 2) * cell
+    half_extents = np.empty((len(rectangles), 3))
+    half_extents[:, 0] = (col1 - col0) * cell / 2
+    half_extents[:, 1] = height / 2
+    half_extents[:, 2] = (row1 - row0) * cell / 2
+    return centers, half_extents
+
+
+# Chave do cache: o conteúdo da imagem e os parâmetros da compilação
+def cache_key(path, **params):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(repr((CACHE_VERSION, sorted(params.items()))).encode())
+    return digest.hexdigest()
+
+
+# Labirinto compilado: grelha de ocupação, retângulos e as caixas no mundo
+class Maze:
+    def __init__(self, grid, rectangles, centers, half_extents):
+        self.grid = grid
+        self.rectangles = rectangles
+        self.centers = centers
+        self.half_extents = half_extents
+        self.body_ids = []  # Corpos do PyBullet (ver create_bodies)
+
+    def __len__(self):
+        return len(self.centers)
+
+    # Cria os corpos estáticos das paredes, com uma caixa de colisão por
+    # retângulo. Uma forma composta do PyBullet só guarda as primeiras
+    # MAX_COMPOUND_CHILDREN caixas, por isso as caixas são repartidas por
+    # vários corpos. Devolve os ids dos corpos (também em body_ids).
+    def create_bodies(self, client=0):
+        self.body_ids = []
+        for start in range(0, len(self), MAX_COMPOUND_CHILDREN):
+            end = start + MAX_COMPOUND_CHILDREN
+            shape = p.createCollisionShapeArray(
+                [p.GEOM_BOX] * len(self.centers[start:end]),
+                halfExtents=self.half_extents[start:end].tolist(),
+                collisionFramePositions=self.centers[start:end].tolist(),
+                physicsClientId=client)
+            self.body_ids.append(p.createMultiBody(baseMass=0, baseCollisionShapeIndex=shape,
+                                                   physicsClientId=client))
+        return self.body_ids
+
+    # Vértices e cores de todas as caixas (GL_QUADS), para uma StaticMesh
+    def mesh(self, color=(0.3, 0.3, 0.3)):
+        template = QUAD_VERTICES.reshape(1, 24, 3)  # Cubo de meia aresta 1
+        vertices = template * self.half_extents[:, None, :] + self.centers[:, None, :]
+        shades = np.repeat(WALL_SHADES, 4)[None, :, None]
+        colors = np.broadcast_to(np.asarray(color, dtype=np.float32) * shades, vertices.shape)
+        return vertices.astype(np.float32), np.ascontiguousarray(colors, dtype=np.float32)
+
+
+# Compila uma imagem de labirinto em caixas, usando o cache em disco se a mesma
+# imagem já tiver sido compilada com os mesmos parâmetros
+def compile_maze(path, cell_pixels=4, threshold=128, fill=0.5, size=20.0, height=1.0, cache_dir=CACHE_DIR):
+    params = dict(cell_pixels=cell_pixels, threshold=threshold, fill=fill, size=size, height=height)
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, cache_key(path, **params) + ".npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                return Maze(data["grid"], data["rectangles"], data["centers"], data["half_extents"])
+
+    grid = image_to_grid(path, cell_pixels, threshold, fill)
+    rectangles = merge_rectangles(grid)
+    centers, half_extents = rectangles_to_boxes(rectangles, grid.shape, size, height)
+    maze = Maze(grid, rectangles, centers, half_extents)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = cache_path + ".tmp.npz"
+        np.savez_compressed(temporary, grid=grid, rectangles=rectangles, centers=centers, half_extents=half_extents)
+        os.replace(temporary, cache_path)  # Nunca deixa um cache meio escrito
+    return maze
+
+
+# Uso: python -m simulador.maze labirinto.jpg
+if __name__ == "__main__":
+    start = time.perf_counter()
+    maze = compile_maze(sys.argv[1], cache_dir=None)
+    print("%d células de parede -> %d caixas em %.3f s" % (maze.grid.sum(), len(maze), time.perf_counter() - start))
@@ -0,0 +1,372 @@
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+from OpenGL.GL import *
+
+# Cores dos menus (RGBA)
+BACKGROUND = (35, 35, 40, 235)
+HIGHLIGHT = (60, 100, 190, 255)
+TEXT = (255, 255, 255)
+DIM = (160, 160, 160)
+
+# Linhas visíveis de uma só vez no seletor de ficheiros
+PICKER_ROWS = 16
+
+
+# Desenha uma imagem RGBA (largura, altura, pixels de baixo para cima) com o
+# canto superior esquerdo em (x, y), em coordenadas do pygame (y para baixo)
+def draw_image(image, x, y):
+    width, height, pixels = image
+    viewport = glGetIntegerv(GL_VIEWPORT)
+    glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT)
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_TEXTURE_2D)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glWindowPos2i(int(x), int(viewport[3]) - int(y) - height)
+    glDrawPixels(width, height, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+    glPopAttrib()
+
+
+# Converte uma superfície do pygame na imagem que draw_image desenha
+def surface_image(surface):
+    return surface.get_width(), surface.get_height(), pygame.image.tostring(surface, "RGBA", True)
+
+
+# Corre as ações lentas (guardar, carregar, descodificar imagens) em threads
+# e entrega os resultados ao ciclo principal: poll(), chamado uma vez por
+# frame, executa as funções on_done/on_error na thread principal, onde se pode
+# mexer no OpenGL e no PyBullet.
+#
+#     tasks.submit(compile_maze, path, on_done=lambda maze: ...)
+#     ...
+#     tasks.poll()  # em cada frame
+class TaskRunner:
+    def __init__(self, workers=2):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="tarefa")
+        self.results = queue.Queue()
+        self.pending = 0
+
+    # Corre function(*args) numa thread
+    def submit(self, function, *args, on_done=None, on_error=None):
+        self.pending += 1
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(lambda done: self.results.put((done, on_done, on_error)))
+        return future
+
+    # Entrega os resultados já prontos (sem esperar) e devolve quantos foram entregues
+    def poll(self):
+        delivered = 0
+        while True:
+            try:
+                future, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                return delivered
+            self.pending -= 1
+            delivered += 1
+            error = future.exception()
+            if error is None:
+                if on_done is not None:
+                    on_done(future.result())
+            elif on_error is not None:
+                on_error(error)
+            else:
+                print("Erro numa tarefa: %s" % error)
+
+    # Se ainda há tarefas por terminar
+    def busy(self):
+        return self.pending > 0
+
+    # Espera pelas tarefas em curso e termina as threads
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        self.poll()
+
+
+# Menu desenhado dentro da janela OpenGL. Não bloqueia: o ciclo principal
+# passa-lhe os eventos (handle_event devolve True se o evento era do menu) e
+# chama draw() antes do flip, por isso a física e o desenho continuam.
+#
+#     menu.show(pygame.mouse.get_pos(), [("Criar cubo", criar), None, ("Sair", sair)])
+class PopupMenu:
+    def __init__(self, font_size=18):
+        self.font_size = font_size
+        self.font = None
+        self.items = []  # (texto, função) ou None para um separador
+        self.position = (0, 0)
+        self.visible = False
+        self.hover = None
+        self.image = None  # Imagem já desenhada (refeita quando o menu muda)
+        self.rows = []  # (y0, y1, índice) de cada item, relativo ao menu
+
+    # Abre o menu na posição dada (normalmente a do rato)
+    def show(self, position, items):
+        self.items = list(items)
+        self.position = position
+        self.visible = True
+        self.hover = None
+        self.image = None
+
+    def close(self):
+        self.visible = False
+        self.image = None
+
+    # Trata um evento; devolve True se o evento foi usado pelo menu
+    def handle_event(self, event):
+        if not self.visible:
+            return False
+        if event.type == pygame.MOUSEMOTION:
+            self._set_hover(self._item_at(event.pos))
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            index = self._item_at(event.pos)
+            self.close()  # Um clique fora do menu só o fecha
+            if index is not None:
+                self.items[index][1]()
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.close()
+            elif event.key in (pygame.K_UP, pygame.K_DOWN):
+                choices = [i for i, item in enumerate(self.items) if item is not None]
+                if choices:
+                    step = 1 if event.key == pygame.K_DOWN else -1
+                    current = choices.index(self.hover) if self.hover in choices else (-1 if step > 0 else 0)
+                    self._set_hover(choices[(current + step) % len(choices)])
+            elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER) and self.hover is not None:
+                index = self.hover
+                self.close()
+                self.items[index][1]()
+        elif event.type != pygame.MOUSEBUTTONUP:
+            return False
+        return True
+
+    # Desenha o menu (se estiver aberto)
+    def draw(self):
+        if not self.visible:
+            return
+        if self.image is None:
+            self.image = self._render()
+        x, y = self._clamped_position()
+        draw_image(self.image, x, y)
+
+    def _set_hover(self, index):
+        if index != self.hover:
+            self.hover = index
+            self.image = None
+
+    def _item_at(self, pos):
+        if self.image is None:
+            self.image = self._render()
+        x, y = self._clamped_position()
+        if not x <= pos[0] < x + self.image[0]:
+            return None
+        for y0, y1, index in self.rows:
+            if y + y0 <= pos[1] < y + y1:
+                return index
+        return None
+
+    # O menu fica sempre dentro da janela
+    def _clamped_position(self):
+        width, height = pygame.display.get_surface().get_size()
+        x = min(self.position[0], width - self.image[0])
+        y = min(self.position[1], height - self.image[1])
+        return max(x, 0), max(y, 0)
+
+    def _render(self):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont("sans", self.font_size)
+        line_height = self.font.get_linesize() + 6
+        labels = [item[0] for item in self.items if item is not None]
+        width = max([self.font.size(label)[0] for label in labels] + [60]) + 24
+
+        self.rows = []
+        separators = []
+        y = 4
+        for index, item in enumerate(self.items):
+            if item is None:
+                separators.append(y + 4)
+                y += 9
+            else:
+                self.rows.append((y, y + line_height, index))
+                y += line_height
+
+        surface = pygame.Surface((width, y + 4), pygame.SRCALPHA)
+        surface.fill(BACKGROUND)
+        for y0, y1, index in self.rows:
+            if index == self.hover:
+                surface.fill(HIGHLIGHT, (2, y0, width - 4, y1 - y0))
+            surface.blit(self.font.render(self.items[index][0], True, TEXT), (12, y0 + 3))
+        for y in separators:
+            surface.fill(DIM, (8, y, width - 16, 1))
+        return surface_image(surface)
+
+
+# Seletor de ficheiros desenhado dentro da janela, no lugar do
+# filedialog do tkinter. Para abrir mostra as pastas e os ficheiros com as
+# extensões pedidas; para guardar também se escreve o nome do ficheiro.
+# Enter confirma, Esc cancela, Backspace apaga (ou sobe uma pasta).
+class FilePicker:
+    def __init__(self, font_size=16, rows=PICKER_ROWS):
+        self.font_size = font_size
+        self.font = None
+        self.rows = rows
+        self.visible = False
+        self.image = None
+
+    # Escolher um ficheiro existente; callback(caminho) é chamado ao confirmar
+    def ask_open(self, callback, extensions=(), title="Abrir", directory=None):
+        self._show(callback, extensions, title, directory, saving=False, name="")
+
+    # Escolher onde guardar; o nome começa com default_name
+    def ask_save(self, callback, extensions=(), title="Guardar", directory=None, default_name=""):
+        self._show(callback, extensions, title, directory, saving=True, name=default_name)
+
+    def close(self):
+        self.visible = False
+        self.image = None
+
+    def _show(self, callback, extensions, title, directory, saving, name):
+        self.callback = callback
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.title = title
+        self.saving = saving
+        self.name = name
+        self.visible = True
+        self._change_directory(directory or os.getcwd())
+
+    def _change_directory(self, directory):
+        self.directory = os.path.abspath(directory)
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir():
+                        entries.append((0, entry.name.lower(), entry.name + os.sep))
+                    elif not self.extensions or entry.name.lower().endswith(self.extensions):
+                        entries.append((1, entry.name.lower(), entry.name))
+        except OSError:
+            pass
+        self.entries = [".." + os.sep] + [name for _, _, name in sorted(entries)]
+        self.selected = 0
+        self.scroll = 0
+        self.image = None
+
+    # Trata um evento; enquanto o seletor está aberto usa todos os eventos do rato e do teclado
+    def handle_event(self, event):
+        if not self.visible:
+            return False
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.close()
+            elif event.key in (pygame.K_UP, pygame.K_DOWN, pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                step = {pygame.K_UP: -1, pygame.K_DOWN: 1, pygame.K_PAGEUP: -self.rows,
+                        pygame.K_PAGEDOWN: self.rows}[event.key]
+                self._select(self.selected + step)
+            elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+                self._confirm()
+            elif event.key == pygame.K_BACKSPACE:
+                if self.saving and self.name:
+                    self.name = self.name[:-1]
+                else:
+                    self._change_directory(os.path.dirname(self.directory))
+            elif self.saving and event.unicode and event.unicode.isprintable():
+                self.name += event.unicode
+            self.image = None
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (4, 5):
+            self._scroll(-3 if event.button == 4 else 3)
+        elif event.type == pygame.MOUSEWHEEL:
+            self._scroll(-3 * event.y)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            index = self._entry_at(event.pos)
+            if index is not None:
+                if index == self.selected:
+                    self._confirm()  # Segundo clique na mesma linha
+                else:
+                    self._select(index)
+        elif event.type not in (pygame.MOUSEBUTTONUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION,
+                                pygame.TEXTINPUT, pygame.KEYUP):
+            return False
+        return True
+
+    def _select(self, index):
+        self.selected = min(max(index, 0), len(self.entries) - 1)
+        if self.selected < self.scroll:
+            self.scroll = self.selected
+        elif self.selected >= self.scroll + self.rows:
+            self.scroll = self.selected - self.rows + 1
+        if self.saving and not self.entries[self.selected].endswith(os.sep):
+            self.name = self.entries[self.selected]
+        self.image = None
+
+    def _scroll(self, rows):
+        self.scroll = min(max(self.scroll + rows, 0), max(len(self.entries) - self.rows, 0))
+        self.image = None
+
+    # Entra na pasta selecionada ou escolhe o ficheiro
+    def _confirm(self):
+        entry = self.entries[self.selected]
+        if entry.endswith(os.sep) and not (self.saving and self.selected == 0 and self.name):
+            self._change_directory(os.path.join(self.directory, entry))
+            return
+        name = self.name if self.saving else entry
+        if not name:
+            return
+        if self.saving and self.extensions and not name.lower().endswith(self.extensions):
+            name += self.extensions[0]
+        self.close()
+        self.callback(os.path.join(self.directory, name))
+
+    def _entry_at(self, pos):
+        if self.image is None:
+            return None
+        x, y = self._position()
+        row = (pos[1] - y - self.list_top) // self.line_height
+        if x <= pos[0] < x + self.image[0] and 0 <= row < self.rows:
+            index = self.scroll + int(row)
+            return index if index < len(self.entries) else None
+        return None
+
+    def _position(self):
+        width, height = pygame.display.get_surface().get_size()
+        return max((width - self.image[0]) // 2, 0), max((height - self.image[1]) // 2, 0)
+
+    # Desenha o seletor (se estiver aberto) no centro da janela
+    def draw(self):
+        if not self.visible:
+            return
+        if self.image is None:
+            self.image = self._render()
+        draw_image(self.image, *self._position())
+
+    def _render(self):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont("sans", self.font_size)
+        self.line_height = self.font.get_linesize() + 4
+        width = 520
+        header = [self.title, self.directory]
+        if self.saving:
+            header.append("Nome: " + self.name + "_")
+        self.list_top = 8 + len(header) * self.line_height + 6
+        height = self.list_top + self.rows * self.line_height + 8 + self.line_height
+
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill(BACKGROUND)
+        for i, text in enumerate(header):
+            color = TEXT if i != 1 else DIM
+            surface.blit(self.font.render(text[-60:], True, color), (10, 8 + i * self.line_height))
+        for row in range(self.rows):
+            index = self.scroll + row
+            if index >= len(self.entries):
+                break
+            y = self.list_top + row * self.line_height
+            if index == self.selected:
+                surface.fill(HIGHLIGHT, (4, y, width - 8, self.line_height))
+            surface.blit(self.font.render(self.entries[index], True, TEXT), (12, y + 2))
+        hint = "Enter confirma, Esc cancela, Backspace sobe uma pasta"
+        surface.blit(self.font.render(hint, True, DIM), (10, height - self.line_height - 4))
+        return surface_image(surface)
@@ -0,0 +1,161 @@
+import threading
+import time
+
+import numpy as np
+import pybullet as p
+
+from simulador.pose_sync import PoseSync
+
+# Poses de todos os corpos num dado passo da simulação
+class PoseSnapshot:
+    def __init__(self):
+        self.body_ids = []
+        self.positions = np.zeros((0, 3))
+        self.orientations = np.zeros((0, 4))  # Quaterniões (x, y, z, w)
+        self.step = 0  # Número de passos da simulação até este instante
+        self.sim_time = 0.0  # Tempo simulado em segundos
+
+    # Ajusta os arrays ao número de corpos (só realoca se o número mudar)
+    def resize(self, n):
+        if len(self.positions) != n:
+            self.positions = np.zeros((n, 3))
+            self.orientations = np.zeros((n, 4))
+
+
+# Corre o PyBullet a um passo fixo numa thread própria, independente do render.
+# O tempo real decorrido é acumulado e consumido em passos de `timestep`; se a
+# simulação se atrasar, faz vários passos seguidos para recuperar, até
+# `max_substeps` por iteração (o resto é descartado para não entrar em espiral).
+# Depois de cada iteração as poses dos corpos são publicadas em buffers
+# separados: o render lê sempre um snapshot completo sem esperar pela física.
+# Todas as outras chamadas ao PyBullet (criar/remover corpos, ...) devem ser
+# feitas dentro de `with scheduler.lock:`.
+class PhysicsScheduler:
+    def __init__(self, bodies, timestep=1.0 / 240.0, max_substeps=8, client=0):
+        self.bodies = bodies  # Lista (ou função que devolve a lista) de ids a publicar
+        self.timestep = timestep
+        self.max_substeps = max_substeps
+        self.client = client
+        self.lock = threading.RLock()
+
+        self.step = 0
+        self.accumulator = 0.0
+        self.dropped_steps = 0  # Passos descartados por excederem max_substeps
+        self.busy_time = 0.0  # Tempo total gasto a simular e a publicar poses (segundos)
+        # Funções chamadas depois de cada passo com as poses desse passo (um
+        # PoseSnapshot que só é válido durante a chamada), por exemplo para
+        # gravar. Um listener que devolva False terminou e é retirado da lista.
+        self.step_listeners = []
+        # Leitura das poses (os corpos parados não são lidos em todos os passos)
+        self.poses = PoseSync(client)
+
+        # Buffer de escrita (física), buffer pronto e buffer de leitura (render)
+        self.back = PoseSnapshot()
+        self.ready = PoseSnapshot()
+        self.front = PoseSnapshot()
+        self.fresh = False
+        self.swap_lock = threading.Lock()
+
+        self.running = False
+        self.thread = None
+        p.setTimeStep(timestep, physicsClientId=client)
+
+    # Inicia a thread da física
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="physics", daemon=True)
+        self.thread.start()
+
+    # Pára a thread da física e espera que termine
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # Avança a simulação pelo tempo real decorrido (em segundos).
+    # Pode ser chamado diretamente no ciclo principal em vez de usar a thread.
+    def advance(self, elapsed):
+        self.accumulator += elapsed
+        steps = int(self.accumulator / self.timestep)
+        if steps > self.max_substeps:
+            self.dropped_steps += steps - self.max_substeps
+            self.accumulator -= (steps - self.max_substeps) * self.timestep
+            steps = self.max_substeps
+        if steps == 0:
+            return 0
+
+        with self.lock:
+            start = time.perf_counter()
+            for _ in range(steps):
+                p.stepSimulation(physicsClientId=self.client)
+                self.step += 1
+                read = False
+                if self.step_listeners:
+                    self._read_poses()
+                    read = True
+                    self.step_listeners[:] = [listener for listener in self.step_listeners
+                                              if listener(self.back) is not False]
+            self.accumulator -= steps * self.timestep
+            if not read:
+                self._read_poses()  # Com listeners as poses do último passo já foram lidas
+            self._swap()
+            self.busy_time += time.perf_counter() - start
+        return steps
+
+    # Publica já as poses atuais (por exemplo depois de restaurar um estado),
+    # para o render não voltar a usar poses anteriores
+    def publish(self):
+        with self.lock:
+            self.poses.wake()
+            self._publish()
+
+    # Devolve o snapshot mais recente das poses (nunca bloqueia à espera da física)
+    def latest(self):
+        with self.swap_lock:
+            if self.fresh:
+                self.front, self.ready = self.ready, self.front
+                self.fresh = False
+        return self.front
+
+    # Ids dos corpos publicados
+    def body_ids(self):
+        return list(self.bodies() if callable(self.bodies) else self.bodies)
+
+    # Tempo simulado em segundos
+    def sim_time(self):
+        return self.step * self.timestep
+
+    def _run(self):
+        last = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            self.advance(now - last)
+            last = now
+            # Dorme até ao próximo passo
+            time.sleep(max(0.0, self.timestep - self.accumulator))
+
+    # Lê as poses e publica-as para o render
+    def _publish(self):
+        self._read_poses()
+        self._swap()
+
+    # Lê as poses de todos os corpos para o buffer de escrita
+    def _read_poses(self):
+        body_ids = self.body_ids()
+        self.poses.sync(body_ids)
+        snapshot = self.back
+        snapshot.resize(len(body_ids))
+        snapshot.positions[:] = self.poses.positions
+        snapshot.orientations[:] = self.poses.orientations
+        snapshot.body_ids = body_ids
+        snapshot.step = self.step
+        snapshot.sim_time = self.sim_time()
+
+    # Troca o buffer de escrita com o buffer pronto
+    def _swap(self):
+        with self.swap_lock:
+            self.back, self.ready = self.ready, self.back
+            self.fresh = True
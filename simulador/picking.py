@@ -0,0 +1,157 @@
+import numpy as np
+import pybullet as p
+from OpenGL.GL import *
+
+from simulador.cube_renderer import CubeRenderer, SOLID
+
+# Número máximo de raios por chamada a p.rayTestBatch (limite do PyBullet)
+MAX_RAYS_PER_BATCH = 16384
+
+
+# Câmera de um frame: as matrizes do OpenGL e o viewport, usadas para converter
+# pontos do ecrã (coordenadas do pygame, origem no canto superior esquerdo) em
+# raios no mundo. A matriz combinada é invertida uma única vez.
+class Camera:
+    def __init__(self, modelview, projection, viewport):
+        # O PyOpenGL devolve as matrizes por colunas, por isso são transpostas
+        self.modelview = np.asarray(modelview, dtype=float).reshape(4, 4).T
+        self.projection = np.asarray(projection, dtype=float).reshape(4, 4).T
+        self.viewport = np.asarray(viewport, dtype=float).reshape(4)
+        self.inverse = np.linalg.inv(self.projection @ self.modelview)
+
+    # Raios (origens e direções unitárias, N x 3) que passam pelos pontos do ecrã (N x 2)
+    def rays(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x, y, width, height = self.viewport
+        ndc = np.empty((len(points), 2, 4))
+        ndc[:, :, 0] = (2.0 * (points[:, 0:1] - x) / width) - 1.0
+        ndc[:, :, 1] = (2.0 * (height - points[:, 1:2] - y) / height) - 1.0  # y do pygame cresce para baixo
+        ndc[:, 0, 2] = -1.0  # Plano próximo
+        ndc[:, 1, 2] = 1.0  # Plano distante
+        ndc[:, :, 3] = 1.0
+
+        world = ndc @ self.inverse.T
+        world = world[:, :, :3] / world[:, :, 3:4]
+        origins = world[:, 0]
+        directions = world[:, 1] - origins
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        return origins, directions
+
+    # Raio que passa por um ponto do ecrã
+    def ray(self, mouse_x, mouse_y):
+        origins, directions = self.rays([(mouse_x, mouse_y)])
+        return origins[0], directions[0]
+
+
+# Lê as matrizes atuais do OpenGL (chamar depois de posicionar a câmera)
+def capture_camera():
+    return Camera(glGetDoublev(GL_MODELVIEW_MATRIX), glGetDoublev(GL_PROJECTION_MATRIX), glGetIntegerv(GL_VIEWPORT))
+
+
+# Pontos onde os raios cortam o plano coord[axis] == height (N x 3).
+# Os raios paralelos ao plano ou que apontam para longe dele ficam a NaN.
+def intersect_plane(origins, directions, axis=1, height=0.0):
+    origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=float).reshape(-1, 3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (height - origins[:, axis]) / directions[:, axis]
+    t[~(t >= 0)] = np.nan
+    return origins + directions * t[:, None]
+
+
+# Resultado de um raio que acertou num corpo
+class Hit:
+    def __init__(self, body_id, link, position, normal, distance):
+        self.body_id = body_id
+        self.link = link  # -1 = base do corpo
+        self.position = position  # Ponto da superfície atingido
+        self.normal = normal  # Normal da superfície nesse ponto
+        self.distance = distance  # Distância desde a origem do raio
+
+
+# Seleção de corpos do PyBullet com raios: o clique é convertido num raio pela
+# câmera e o PyBullet devolve o primeiro corpo atingido. O custo não depende do
+# número de cubos (o PyBullet usa a sua própria estrutura de aceleração).
+class RayPicker:
+    def __init__(self, max_distance=100.0, client=0):
+        self.max_distance = max_distance
+        self.client = client
+
+    # Corpo debaixo do ponto do ecrã, ou None
+    def pick(self, camera, mouse_x, mouse_y):
+        return self.pick_many(camera, [(mouse_x, mouse_y)])[0]
+
+    # Vários pontos do ecrã de uma vez (uma chamada a rayTestBatch por bloco)
+    def pick_many(self, camera, points):
+        origins, directions = camera.rays(points)
+        return self.cast(origins, directions)
+
+    # Raios arbitrários no mundo (origens e direções N x 3); devolve um Hit ou None por raio
+    def cast(self, origins, directions):
+        origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+        ends = origins + np.asarray(directions, dtype=float).reshape(-1, 3) * self.max_distance
+        hits = []
+        for start in range(0, len(origins), MAX_RAYS_PER_BATCH):
+            results = p.rayTestBatch(origins[start:start + MAX_RAYS_PER_BATCH].tolist(),
+                                     ends[start:start + MAX_RAYS_PER_BATCH].tolist(),
+                                     numThreads=0, physicsClientId=self.client)
+            for body_id, link, fraction, position, normal in results:
+                if body_id < 0:
+                    hits.append(None)
+                else:
+                    hits.append(Hit(body_id, link, np.array(position), np.array(normal),
+                                    fraction * self.max_distance))
+        return hits
+
+
+# Seleção por buffer de IDs para objetos que só existem no render (sem corpo no
+# PyBullet): os cubos são desenhados com uma cor única cada (o índice + 1 em
+# RGB de 24 bits) apenas no pixel clicado e a cor lida devolve o índice.
+# Deve ser chamado com as matrizes da câmera já aplicadas e antes de limpar a
+# tela para o frame seguinte (o desenho fica no buffer de trás).
+class IdBufferPicker:
+    def __init__(self):
+        self.renderer = None
+
+    # Índice do cubo debaixo do ponto do ecrã, ou None.
+    # sizes: meia aresta (um valor, por cubo ou por cubo e eixo), como no CubeRenderer
+    def pick(self, mouse_x, mouse_y, positions, sizes=None):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        if len(positions) == 0:
+            return None
+        if len(positions) >= 0xFFFFFF:
+            raise ValueError("Demasiados cubos para o buffer de IDs")
+        if self.renderer is None:
+            self.renderer = CubeRenderer(SOLID)
+
+        if sizes is not None and np.ndim(sizes) == 0:
+            sizes = np.full(len(positions), sizes, dtype=np.float32)  # Mesmo tamanho para todos
+
+        ids = np.arange(1, len(positions) + 1)
+        colors = np.stack([ids & 0xFF, (ids >> 8) & 0xFF, (ids >> 16) & 0xFF], axis=1) / 255.0
+        self.renderer.update(positions, sizes=sizes, colors=colors)
+
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        x = int(mouse_x)
+        y = int(viewport[3]) - 1 - int(mouse_y)
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_SCISSOR_BIT | GL_DEPTH_BUFFER_BIT)
+        for capability in (GL_LIGHTING, GL_TEXTURE_2D, GL_BLEND, GL_DITHER, GL_FOG, GL_MULTISAMPLE):
+            glDisable(capability)
+        glEnable(GL_DEPTH_TEST)
+        glEnable(GL_SCISSOR_TEST)
+        glScissor(x, y, 1, 1)  # Só o pixel clicado é desenhado
+        glClearColor(0, 0, 0, 0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        self.renderer.draw()
+        pixel = glReadPixels(x, y, 1, 1, GL_RGB, GL_UNSIGNED_BYTE)
+        glPopAttrib()
+
+        r, g, b = bytearray(pixel)[:3]
+        index = (r | (g << 8) | (b << 16)) - 1
+        return index if 0 <= index < len(positions) else None
+
+    # Liberta os buffers da GPU
+    def delete(self):
+        if self.renderer is not None:
+            self.renderer.delete()
+            self.renderer = None
@@ -0,0 +1,170 @@
+import functools
+import sys
+import time
+
+import numpy as np
+import pybullet as p
+
+# Número de leituras seguidas sem mexer a partir do qual um corpo conta como
+# parado (e deixa de ser lido em todos os frames)
+SLEEP_AFTER = 30
+
+# Um corpo parado volta a ser lido de WAKE_INTERVAL em WAKE_INTERVAL leituras
+# (cada leitura confirma uma fração diferente dos corpos parados), para se
+# notar quando outro corpo lhe toca
+WAKE_INTERVAL = 8
+
+# Diferença máxima (em metros e nas componentes do quaternião) para uma pose
+# contar como igual à anterior
+TOLERANCE = 1e-5
+
+
+# Lê as poses de muitos corpos do PyBullet para arrays NumPy pré-alocados.
+# O PyBullet não tem uma chamada que devolva as poses de vários corpos de uma
+# vez, por isso cada corpo custa uma chamada; o custo em Python fica limitado
+# a essa chamada (uma só list comprehension, sem atribuições linha a linha)
+# e os corpos parados não são lidos: quando a pose de um corpo não muda
+# durante `sleep_after` leituras, passa a ser lido só de `wake_interval` em
+# `wake_interval` leituras até voltar a mexer.
+#
+# positions (N x 3) e orientations (N x 4, quaterniões x, y, z, w) seguem a
+# ordem dos ids dados a sync(). Se a lista de corpos mudar, todos são lidos
+# de novo; depois de mexer em corpos à mão (resetBasePositionAndOrientation)
+# chama-se wake() para não se usarem poses antigas.
+#
+#     poses = PoseSync()
+#     poses.sync(cubos)
+#     renderer.update(poses.positions, orientations=poses.orientations)
+class PoseSync:
+    def __init__(self, client=0, sleep_after=SLEEP_AFTER, wake_interval=WAKE_INTERVAL, tolerance=TOLERANCE):
+        self.client = client
+        self.sleep_after = sleep_after
+        self.wake_interval = wake_interval
+        self.tolerance = tolerance
+        self.read_pose = functools.partial(p.getBasePositionAndOrientation, physicsClientId=client)
+
+        self.body_ids = []
+        self.ids = []  # Ids como lista de int, para ler sem conversões
+        self.count = 0
+        self.capacity = 0
+        self.poses = np.zeros((0, 7))  # Posição e quaternião de cada corpo numa só linha
+        self.still = np.zeros(0, dtype=np.int32)  # Leituras seguidas sem mexer
+        self.syncs = 0
+
+        self.read = 0  # Corpos lidos na última sync
+        self.moved = np.zeros(0, dtype=np.intp)  # Linhas dos corpos que mexeram na última sync
+        self.sync_time = 0.0  # Duração da última sync (segundos)
+        self.total_time = 0.0  # Tempo total gasto em sync (segundos)
+
+    @property
+    def positions(self):
+        return self.poses[:self.count, :3]
+
+    @property
+    def orientations(self):
+        return self.poses[:self.count, 3:]
+
+    # Garante espaço para pelo menos n corpos (cresce para o dobro para amortizar;
+    # as poses não são copiadas porque a lista de corpos mudou e é lida de novo)
+    def reserve(self, n):
+        if n <= self.capacity:
+            return False
+        capacity = max(n, self.capacity * 2, 1)
+        poses = np.zeros((capacity, 7))
+        poses[:, 6] = 1.0
+        self.poses = poses
+        self.still = np.zeros(capacity, dtype=np.int32)
+        self.capacity = capacity
+        return True
+
+    # Volta a ler todos os corpos na próxima sync
+    def wake(self):
+        self.still[:] = 0
+
+    # Lê as poses dos corpos `body_ids` e devolve quantos mexeram (as suas
+    # linhas ficam em `moved`)
+    def sync(self, body_ids):
+        start = time.perf_counter()
+        if body_ids != self.body_ids:
+            self.body_ids = list(body_ids)
+            self.ids = [int(body_id) for body_id in self.body_ids]
+            self.count = len(self.ids)
+            self.reserve(self.count)
+            self.wake()
+
+        n = self.count
+        self.syncs += 1
+        moved = 0
+        if n:
+            still = self.still[:n]
+            awake = still < self.sleep_after
+            awake[self.syncs % self.wake_interval::self.wake_interval] = True
+            if awake.all():
+                rows = slice(0, n)
+                ids = self.ids
+            else:
+                rows = np.flatnonzero(awake)
+                ids = [self.ids[i] for i in rows.tolist()]
+
+            read = self.read_pose
+            poses = np.array([position + orientation for position, orientation in map(read, ids)],
+                             dtype=np.float64).reshape(-1, 7)
+            changed = np.abs(poses - self.poses[rows]).max(axis=1) > self.tolerance
+            still[rows] = np.where(changed, 0, still[rows] + 1)
+            self.poses[rows] = poses
+            self.read = len(ids)
+            self.moved = np.flatnonzero(changed) if isinstance(rows, slice) else rows[changed]
+            moved = len(self.moved)
+        else:
+            self.read = 0
+            self.moved = np.zeros(0, dtype=np.intp)
+
+        self.sync_time = time.perf_counter() - start
+        self.total_time += self.sync_time
+        return moved
+
+    # Corpos que não foram lidos em todas as leituras (parados)
+    def asleep(self):
+        return int(np.count_nonzero(self.still[:self.count] >= self.sleep_after))
+
+    def stats(self):
+        return {
+            "bodies": self.count,
+            "read": self.read,
+            "asleep": self.asleep(),
+            "sync_ms": self.sync_time * 1000.0,
+        }
+
+
+# Uso: python -m simulador.pose_sync [cubos] [passos]
+# Deixa cair cubos no PyBullet (sem janela) e compara a leitura das poses
+# corpo a corpo com a PoseSync, à medida que os cubos vão parando
+if __name__ == "__main__":
+    from simulador.spawner import CubeSpawner
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+    p.connect(p.DIRECT)
+    p.setGravity(0, 0, -9.8)
+    p.createMultiBody(0, p.createCollisionShape(p.GEOM_PLANE))
+    side = int(np.ceil(np.sqrt(count)))
+    grid = np.stack(np.meshgrid(np.arange(side), np.arange(side), indexing="ij"), axis=-1).reshape(-1, 2)[:count]
+    positions = np.column_stack([grid * 1.5, np.full(count, 2.0)])
+    body_ids = CubeSpawner().spawn(positions)
+
+    poses = PoseSync()
+    naive = np.empty((count, 7))
+    for step in range(1, steps + 1):
+        p.stepSimulation()
+        if step % (steps // 6) == 0:
+            start = time.perf_counter()
+            for i, body_id in enumerate(body_ids):
+                position, orientation = p.getBasePositionAndOrientation(body_id)
+                naive[i, :3] = position
+                naive[i, 3:] = orientation
+            naive_ms = (time.perf_counter() - start) * 1000.0
+        poses.sync(body_ids)
+        if step % (steps // 6) == 0:
+            stats = poses.stats()
+            print("passo %5d: %d corpos, %d lidos, %d parados; PoseSync %.2f ms, corpo a corpo %.2f ms" % (
+                step, stats["bodies"], stats["read"], stats["asleep"], stats["sync_ms"], naive_ms))
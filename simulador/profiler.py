@@ -0,0 +1,150 @@
+import csv
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+
+# Lê da linha de comandos o ficheiro CSV do perfil: script.py --profile perfil.csv
+def profile_csv_from_argv(argv=None):
+    argv = sys.argv if argv is None else argv
+    if "--profile" in argv:
+        i = argv.index("--profile")
+        return argv[i + 1] if i + 1 < len(argv) else "perfil.csv"
+    return None
+
+
+# Mede quanto tempo cada fase do frame demora (eventos, física, desenho, flip, ...).
+# Guarda os últimos `window` frames de cada fase para calcular percentis
+# (p50, p95, p99), desenha-os num overlay por cima da cena (liga/desliga com
+# toggle()) e, se for dado um csv_path, grava uma linha por frame para se poder
+# comparar execuções antes e depois de uma alteração. Os `counters` são
+# números por frame (por exemplo objetos desenhados e descartados) mostrados e
+# gravados ao lado dos tempos.
+#
+#     profiler.begin_frame()
+#     with profiler.phase("eventos"):
+#         ...
+#     profiler.end_frame()
+class FrameProfiler:
+    def __init__(self, phases, window=300, csv_path=None, visible=False, refresh=30, counters=()):
+        self.phases = list(phases)  # Ordem das colunas no CSV e no overlay
+        self.counters = dict.fromkeys(counters, 0)
+        self.window = window
+        self.samples = {name: deque(maxlen=window) for name in self.phases + ["frame"]}
+        self.current = dict.fromkeys(self.phases, 0.0)
+        self.frame = 0
+        self.frame_start = None
+        self.visible = visible
+        self.refresh = refresh  # De quantos em quantos frames o texto do overlay é atualizado
+        self.overlay = None  # (largura, altura, pixels RGBA) do texto já desenhado
+        self.font = None
+
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path:
+            self.csv_file = open(csv_path, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame", "frame_ms"] + [name + "_ms" for name in self.phases] +
+                                     list(self.counters))
+
+    # Marca o início de um frame
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+        for name in self.current:
+            self.current[name] = 0.0
+
+    # Mede o tempo do bloco e soma-o à fase dada
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] += time.perf_counter() - start
+
+    # Soma à fase um tempo medido noutro sítio (por exemplo na thread da física)
+    def record(self, name, seconds):
+        self.current[name] += seconds
+
+    # Valor de um contador neste frame
+    def count(self, name, value):
+        self.counters[name] = value
+
+    # Marca o fim do frame: guarda as amostras e escreve a linha do CSV
+    def end_frame(self):
+        total = time.perf_counter() - self.frame_start
+        self.samples["frame"].append(total * 1000.0)
+        for name in self.phases:
+            self.samples[name].append(self.current[name] * 1000.0)
+
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(
+                [self.frame, "%.4f" % (total * 1000.0)] + ["%.4f" % (self.current[name] * 1000.0) for name in self.phases] +
+                list(self.counters.values()))
+        self.frame += 1
+        if self.frame % self.refresh == 0:
+            self.overlay = None  # O texto é redesenhado no próximo draw_overlay
+
+    # Percentis (p50, p95, p99) em milissegundos de uma fase
+    def percentiles(self, name):
+        samples = self.samples[name]
+        if not samples:
+            return 0.0, 0.0, 0.0
+        return tuple(np.percentile(np.fromiter(samples, dtype=float, count=len(samples)), (50, 95, 99)))
+
+    # Linhas de texto com o resumo de todas as fases
+    def summary(self):
+        lines = ["%-10s %7s %7s %7s" % ("ms", "p50", "p95", "p99")]
+        for name in ["frame"] + self.phases:
+            lines.append("%-10s %7.2f %7.2f %7.2f" % ((name,) + self.percentiles(name)))
+        for name, value in self.counters.items():
+            lines.append("%-18s %15s" % (name, value))
+        return lines
+
+    # Liga ou desliga o overlay
+    def toggle(self):
+        self.visible = not self.visible
+        self.overlay = None
+
+    # Desenha o resumo no canto superior esquerdo da janela OpenGL
+    def draw_overlay(self):
+        if not self.visible:
+            return
+        if self.overlay is None:
+            self.overlay = self._render_text(self.summary())
+
+        width, height, pixels = self.overlay
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glWindowPos2i(8, int(viewport[3]) - height - 8)
+        glDrawPixels(width, height, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+        glPopAttrib()
+
+    def _render_text(self, lines):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont("monospace", 14)
+        line_height = self.font.get_linesize()
+        width = max(self.font.size(line)[0] for line in lines) + 8
+        surface = pygame.Surface((width, line_height * len(lines) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 160))
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, True, (255, 255, 0)), (4, 4 + i * line_height))
+        # O OpenGL desenha de baixo para cima, por isso a imagem é virada
+        return surface.get_width(), surface.get_height(), pygame.image.tostring(surface, "RGBA", True)
+
+    # Fecha o ficheiro CSV
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
@@ -0,0 +1,195 @@
+import queue
+import threading
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# Dialetos de XML usados pelos vários simuladores do repositório
+DIALECT_SCENE = "Scene/Cube/Position"  # 3Dsimulator.py: <Cube><Position x= y= z=/></Cube>
+DIALECT_ATTRIBUTES = "cubo@x"  # 3Dsimulator-0-0.py, basic3Dscenario-10.py: <cubo x= y= z=/>
+DIALECT_CHILDREN = "cubo/pos_x"  # basic3Dscenario-8/9.py: <cubo><pos_x>..</pos_x>...</cubo>
+
+# Número de cubos por lote devolvido
+BATCH_SIZE = 4096
+
+# Lotes já lidos que podem ficar à espera do ciclo principal
+READY_BATCHES = 8
+
+
+# Lê a posição de um elemento de cubo já completo, detetando o dialeto.
+# Devolve (dialeto, (x, y, z)) ou (None, None) se o elemento não for um cubo.
+def parse_cube(elem):
+    if elem.tag == "Cube":
+        position = elem.find("Position")
+        if position is None:
+            return None, None
+        return DIALECT_SCENE, (float(position.get("x")), float(position.get("y")), float(position.get("z")))
+    if elem.tag == "cubo":
+        if "x" in elem.attrib:
+            return DIALECT_ATTRIBUTES, (float(elem.get("x")), float(elem.get("y")), float(elem.get("z")))
+        return DIALECT_CHILDREN, (float(elem.findtext("pos_x")), float(elem.findtext("pos_y")),
+                                  float(elem.findtext("pos_z")))
+    return None, None
+
+
+# Leitura incremental de um cenário em XML (qualquer um dos três dialetos).
+# O ficheiro é lido com iterparse e cada cubo é descartado da árvore logo que
+# é lido, por isso a memória não cresce com o tamanho do ficheiro. As posições
+# são devolvidas em lotes (arrays NumPy N x 3) à medida que vão sendo lidas,
+# o que permite mostrar os primeiros cubos antes de o ficheiro acabar.
+#
+#     for positions in SceneStream("cenario.xml"):
+#         criar_cubos(positions)
+class SceneStream:
+    def __init__(self, source, batch_size=BATCH_SIZE, dtype=np.float64):
+        self.source = source  # Caminho ou ficheiro aberto
+        self.batch_size = batch_size
+        self.dtype = dtype
+        self.dialect = None  # Conhecido depois de ler o primeiro cubo
+        self.count = 0  # Cubos lidos até agora
+
+    def __iter__(self):
+        batch = np.empty((self.batch_size, 3), dtype=self.dtype)
+        filled = 0
+        root = None
+        for event, elem in ET.iterparse(self.source, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag not in ("Cube", "cubo"):
+                continue
+
+            dialect, position = parse_cube(elem)
+            if position is not None:
+                if self.dialect is None:
+                    self.dialect = dialect
+                batch[filled] = position
+                filled += 1
+                self.count += 1
+            # Liberta os cubos já lidos
+            root.clear()
+
+            if filled == self.batch_size:
+                yield batch
+                batch = np.empty((self.batch_size, 3), dtype=self.dtype)
+                filled = 0
+
+        if filled:
+            yield batch[:filled]
+
+
+# Lê os lotes de um cenário (um SceneStream ou outro iterável de lotes) numa
+# thread e entrega-os por uma queue.Queue à medida que vão sendo lidos. O
+# ciclo principal tira um lote já pronto com get(), sem esperar, e pode ir
+# criando os cubos enquanto o resto do ficheiro ainda está a ser lido. A fila
+# guarda no máximo `ready` lotes: se o ciclo principal se atrasar, a leitura
+# espera e a memória não cresce com o tamanho do ficheiro.
+#
+#     stream = BackgroundStream(SceneStream("cenario.xml"))
+#     ...  # em cada frame
+#     positions = stream.get()
+#     if positions is not None:
+#         criar_cubos(positions)
+#     elif stream.finished:
+#         ...  # stream.error tem a exceção, se a leitura falhou
+#
+# close() desiste da leitura (por exemplo ao abrir outro ficheiro a meio).
+class BackgroundStream:
+    END = object()  # Marca o fim da leitura na fila
+
+    def __init__(self, batches, ready=READY_BATCHES):
+        self.batches = queue.Queue(ready)
+        self.error = None
+        self.finished = False  # Leitura terminada e todos os lotes já entregues
+        self.closed = False
+        self.thread = threading.Thread(target=self._read, args=(batches,), name="cenario", daemon=True)
+        self.thread.start()
+
+    def _read(self, batches):
+        try:
+            for batch in batches:
+                self.batches.put(batch)
+                if self.closed:
+                    break
+        except Exception as error:
+            self.error = error
+        finally:
+            self.batches.put(self.END)
+
+    # Próximo lote já lido, ou None se ainda não há nenhum pronto (ou se acabou)
+    def get(self):
+        if self.finished:
+            return None
+        try:
+            batch = self.batches.get_nowait()
+        except queue.Empty:
+            return None
+        if batch is self.END:
+            self.finished = True
+            return None
+        return batch
+
+    # Desiste dos lotes que faltam: esvazia a fila para a thread não ficar
+    # bloqueada e termina a leitura no lote seguinte
+    def close(self):
+        self.closed = True
+        self.finished = True
+        while True:
+            try:
+                self.batches.get_nowait()
+            except queue.Empty:
+                return
+
+
+# Lê todas as posições de um cenário para um único array N x 3
+def load_positions(source, dtype=np.float64):
+    batches = list(SceneStream(source, dtype=dtype))
+    if not batches:
+        return np.empty((0, 3), dtype=dtype)
+    return np.concatenate(batches)
+
+
+# Deteta o dialeto do ficheiro lendo apenas até ao primeiro cubo
+def detect_dialect(source):
+    stream = SceneStream(source, batch_size=1)
+    for _ in stream:
+        break
+    return stream.dialect
+
+
+# Escritores de XML de cada dialeto, usados pelos simuladores para gravar o
+# cenário (positions: array ou lista N x 3)
+def write_scene_xml(path, positions):  # DIALECT_SCENE
+    root = ET.Element("Scene")
+    for x, y, z in np.asarray(positions, dtype=float).reshape(-1, 3).tolist():
+        position = ET.SubElement(ET.SubElement(root, "Cube"), "Position")
+        position.set("x", str(x))
+        position.set("y", str(y))
+        position.set("z", str(z))
+    ET.ElementTree(root).write(path)
+
+
+def write_attributes_xml(path, positions):  # DIALECT_ATTRIBUTES
+    root = ET.Element("cenario")
+    for x, y, z in np.asarray(positions, dtype=float).reshape(-1, 3).tolist():
+        ET.SubElement(root, "cubo", x=str(x), y=str(y), z=str(z))
+    ET.ElementTree(root).write(path)
+
+
+def write_children_xml(path, positions):  # DIALECT_CHILDREN
+    root = ET.Element("cenario")
+    for x, y, z in np.asarray(positions, dtype=float).reshape(-1, 3).tolist():
+        cube_element = ET.SubElement(root, "cubo")
+        ET.SubElement(cube_element, "pos_x").text = str(x)
+        ET.SubElement(cube_element, "pos_y").text = str(y)
+        ET.SubElement(cube_element, "pos_z").text = str(z)
+    ET.ElementTree(root).write(path)
+
+
+# Escritor de cada dialeto
+WRITERS = {
+    DIALECT_SCENE: write_scene_xml,
+    DIALECT_ATTRIBUTES: write_attributes_xml,
+    DIALECT_CHILDREN: write_children_xml,
+}
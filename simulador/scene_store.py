@@ -0,0 +1,230 @@
+import numpy as np
+
+from simulador.binary_scene import FIELDS, BinaryScene, save_binary_scene
+
+# Os campos são os do formato binário, mas as posições ficam em float64 para
+# coincidirem exatamente com o PyBullet e com os valores escritos no XML.
+# Há ainda dois campos só em memória: o id do corpo no PyBullet (-1 = sem física)
+# e o handle estável de cada cubo.
+STORE_FIELDS = [("positions", np.dtype("<f8"), 3, (0.0, 0.0, 0.0))] + FIELDS[1:] + [
+    ("physics_ids", np.dtype("<i4"), 1, (-1,)),
+    ("handles", np.dtype("<i8"), 1, (-1,)),
+]
+
+
+# Estado do cenário guardado como estrutura de arrays (um array NumPy contíguo
+# por campo) em vez de uma lista de dicionários ou de tuplos por cubo.
+#
+# Cada cubo recebe um handle estável (um inteiro que nunca é reutilizado) e
+# ocupa uma linha (slot) em todos os arrays. Remover troca o último cubo para o
+# lugar do removido, por isso adicionar e remover são O(1) e os arrays ficam
+# sempre compactos. As propriedades positions, orientations, sizes, colors,
+# textures, physics_ids e handles são vistas sobre os primeiros `count` slots,
+# prontas a usar pelo renderer, pela física e pelos serializadores.
+#
+# Cada alteração é comunicada às funções em `edit_listeners`, chamadas como
+# listener(tipo, handles) depois da alteração, com tipo "add", "remove",
+# "move", "clear" ou "reset" (ver simulador/journal.py).
+class SceneStore:
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.next_handle = 0
+        self.capacity = 0
+        self.arrays = {}
+        self.slot_of = np.empty(0, dtype=np.int64)  # handle -> slot (-1 = removido)
+        self.version = 0  # Incrementado sempre que se adicionam ou removem cubos
+        self.edit_listeners = []
+        self.reserve(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, handle):
+        return 0 <= handle < self.next_handle and self.slot_of[handle] >= 0
+
+    # Garante espaço para n cubos (cresce para o dobro para amortizar)
+    def reserve(self, n):
+        if n <= self.capacity:
+            return
+        capacity = max(n, 2 * self.capacity)
+        for name, dtype, components, default in STORE_FIELDS:
+            shape = (capacity,) if components == 1 else (capacity, components)
+            array = np.empty(shape, dtype=dtype)
+            if name in self.arrays:
+                array[:self.count] = self.arrays[name][:self.count]
+            self.arrays[name] = array
+        self.capacity = capacity
+
+    def _reserve_handles(self, n):
+        if n > len(self.slot_of):
+            slot_of = np.full(max(n, 2 * len(self.slot_of)), -1, dtype=np.int64)
+            slot_of[:len(self.slot_of)] = self.slot_of
+            self.slot_of = slot_of
+
+    # Vistas sobre os cubos existentes
+    @property
+    def positions(self):
+        return self.arrays["positions"][:self.count]
+
+    @property
+    def orientations(self):
+        return self.arrays["orientations"][:self.count]
+
+    @property
+    def sizes(self):
+        return self.arrays["sizes"][:self.count]
+
+    @property
+    def colors(self):
+        return self.arrays["colors"][:self.count]
+
+    @property
+    def textures(self):
+        return self.arrays["textures"][:self.count]
+
+    @property
+    def physics_ids(self):
+        return self.arrays["physics_ids"][:self.count]
+
+    @property
+    def handles(self):
+        return self.arrays["handles"][:self.count]
+
+    # Adiciona um cubo e devolve o seu handle
+    def add(self, position, **fields):
+        fields = {name: [value] for name, value in fields.items() if value is not None}
+        return int(self.add_many([position], **fields)[0])
+
+    # Adiciona vários cubos de uma vez (posições N x 3) e devolve os handles.
+    # Os outros campos (orientations, sizes, colors, textures, physics_ids) são
+    # opcionais; os que faltam ficam com o valor por omissão e um escalar vale
+    # para todos os cubos (por exemplo sizes=0.5).
+    def add_many(self, positions, **fields):
+        unknown = (set(fields) - set(self.arrays)) | (set(fields) & {"positions", "handles"})
+        if unknown:
+            raise TypeError("Campos desconhecidos: %s" % ", ".join(sorted(unknown)))
+
+        positions = np.asarray(positions).reshape(-1, 3)
+        n = len(positions)
+        start, end = self.count, self.count + n
+        self.reserve(end)
+        handles = np.arange(self.next_handle, self.next_handle + n, dtype=np.int64)
+        self._reserve_handles(self.next_handle + n)
+
+        fields["positions"] = positions
+        fields["handles"] = handles
+        for name, dtype, components, default in STORE_FIELDS:
+            value = fields.get(name)
+            target = self.arrays[name][start:end]
+            if value is None:
+                target[:] = default if components > 1 else default[0]
+            elif np.ndim(value) == 0:
+                target[:] = value
+            else:
+                target[:] = np.asarray(value).reshape(target.shape)
+
+        self.slot_of[handles] = np.arange(start, end)
+        self.next_handle += n
+        self.count = end
+        self.version += 1
+        self._notify("add", handles)
+        return handles
+
+    # Slot (linha nos arrays) de um cubo
+    def slot(self, handle):
+        if handle not in self:
+            raise KeyError(handle)
+        return int(self.slot_of[handle])
+
+    # Slots de vários cubos de uma vez
+    def slots(self, handles):
+        slots = self.slot_of[np.asarray(handles, dtype=np.int64)]
+        if np.any(slots < 0):
+            raise KeyError("Handles removidos")
+        return slots
+
+    # Handle do cubo ligado a um corpo do PyBullet, ou None
+    def handle_of_physics_id(self, physics_id):
+        slots = np.flatnonzero(self.physics_ids == physics_id)
+        return int(self.handles[slots[0]]) if len(slots) else None
+
+    # Remove um cubo (o último cubo passa para o lugar dele)
+    def remove(self, handle):
+        slot = self.slot(handle)
+        last = self.count - 1
+        if slot != last:
+            for array in self.arrays.values():
+                array[slot] = array[last]
+            self.slot_of[self.arrays["handles"][slot]] = slot
+        self.slot_of[handle] = -1
+        self.count = last
+        self.version += 1
+        self._notify("remove", [handle])
+
+    # Remove vários cubos
+    def remove_many(self, handles):
+        for handle in handles:
+            self.remove(int(handle))
+
+    # Remove todos os cubos
+    def clear(self):
+        self.slot_of[self.handles] = -1
+        self.count = 0
+        self.version += 1
+        self._notify("clear", [])
+
+    # Copia as poses da física (N x 3 e N x 4, pela ordem dos slots) e devolve
+    # quantos cubos se mexeram mais do que atol. Só esses são comunicados como
+    # "move" aos edit_listeners.
+    def set_poses(self, positions, orientations, atol=1e-4):
+        moved = np.any(np.abs(self.positions - positions) > atol, axis=1)
+        moved |= np.any(np.abs(self.orientations - orientations) > atol, axis=1)
+        self.positions[:] = positions
+        self.orientations[:] = orientations
+        count = int(np.count_nonzero(moved))
+        if count:
+            self._notify("move", self.handles[moved])
+        return count
+
+    def _notify(self, kind, handles):
+        for listener in self.edit_listeners:
+            listener(kind, handles)
+
+    # Cópia de todo o estado do cenário (para snapshots)
+    def get_state(self):
+        return {
+            "count": self.count,
+            "next_handle": self.next_handle,
+            "arrays": {name: array[:self.count].copy() for name, array in self.arrays.items()},
+            "slot_of": self.slot_of[:self.next_handle].copy(),
+        }
+
+    # Volta ao estado guardado com get_state. Os handles criados depois disso
+    # deixam de existir, mas nunca voltam a ser dados a cubos novos.
+    def set_state(self, state):
+        count = state["count"]
+        self.reserve(count)
+        self._reserve_handles(len(state["slot_of"]))
+        for name, array in state["arrays"].items():
+            self.arrays[name][:count] = array
+        self.slot_of[:] = -1
+        self.slot_of[:len(state["slot_of"])] = state["slot_of"]
+        self.next_handle = max(self.next_handle, state["next_handle"])
+        self.count = count
+        self.version += 1
+        self._notify("reset", [])
+
+    # Grava o cenário no formato binário
+    def save_binary(self, path):
+        save_binary_scene(path, self.positions, self.orientations, self.sizes, self.colors, self.textures)
+
+    # Acrescenta os cubos de um cenário binário (caminho ou BinaryScene)
+    def load_binary(self, scene):
+        if not isinstance(scene, BinaryScene):
+            scene = BinaryScene(scene)
+        return self.add_many(scene.positions, orientations=scene.orientations, sizes=scene.sizes,
+                             colors=scene.colors, textures=scene.textures)
+
+    # Memória usada pelos arrays, em bytes
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values()) + self.slot_of.nbytes
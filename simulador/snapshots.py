@@ -0,0 +1,172 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pybullet as p
+
+# Memória aproximada de cada corpo num p.saveState (medida com p.saveBullet:
+# cerca de 770 bytes por cubo). O PyBullet não diz quanto ocupa cada estado.
+PHYSICS_BYTES_PER_BODY = 800
+
+# Limites por omissão do anel de snapshots
+MAX_SNAPSHOTS = 16
+BUDGET_BYTES = 256 * 1024 * 1024
+
+
+# Um estado guardado: o mundo do PyBullet (p.saveState) e o cenário do render
+class Snapshot:
+    def __init__(self, name, state_id, scene_state, velocities, body_count):
+        self.name = name
+        self.state_id = state_id  # Id do p.saveState (None se foi removido)
+        self.scene_state = scene_state  # SceneStore.get_state()
+        self.velocities = velocities  # Velocidades linear e angular de cada cubo (N x 6)
+        self.created = time.time()
+        self.restores = 0
+
+        arrays = scene_state["arrays"]
+        self.physics_ids = arrays["physics_ids"]
+        self.nbytes = (sum(array.nbytes for array in arrays.values()) + scene_state["slot_of"].nbytes +
+                       velocities.nbytes + body_count * PHYSICS_BYTES_PER_BODY)
+
+
+# Anel limitado de snapshots com nome. Guardar usa p.saveState e uma cópia do
+# SceneStore; restaurar usa p.restoreState, que demora milissegundos. Quando
+# passa de `capacity` snapshots ou de `budget_bytes`, os mais antigos são
+# esquecidos (e o estado libertado no PyBullet).
+#
+# O p.restoreState só funciona se o mundo tiver os mesmos corpos de quando o
+# estado foi guardado. Se entretanto foram criados ou apagados cubos, os cubos
+# a mais são removidos, os que faltam são recriados com o spawner e as poses e
+# velocidades são repostas uma a uma; o estado é depois guardado de novo para
+# que o restauro seguinte volte a ser rápido.
+#
+# As chamadas ao PyBullet devem ser feitas com a física parada
+# (dentro de `with scheduler.lock:`).
+class SnapshotRing:
+    def __init__(self, scene, spawner, capacity=MAX_SNAPSHOTS, budget_bytes=BUDGET_BYTES, client=0):
+        self.scene = scene
+        self.spawner = spawner
+        self.capacity = capacity
+        self.budget_bytes = budget_bytes
+        self.client = client
+        self.snapshots = OrderedDict()
+        self.used_bytes = 0
+        self.counter = 0
+        self.fast_restores = 0
+        self.slow_restores = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def __contains__(self, name):
+        return name in self.snapshots
+
+    # Nomes dos snapshots, do mais antigo para o mais recente
+    def names(self):
+        return list(self.snapshots)
+
+    # Guarda o estado atual com o nome dado (um nome repetido substitui o anterior)
+    def save(self, name=None):
+        if name is None:
+            self.counter += 1
+            name = "snapshot-%d" % self.counter
+        if name in self.snapshots:
+            self.remove(name)
+
+        physics_ids = self.scene.physics_ids.tolist()
+        velocities = np.zeros((len(physics_ids), 6))
+        for i, body_id in enumerate(physics_ids):
+            linear, angular = p.getBaseVelocity(body_id, physicsClientId=self.client)
+            velocities[i, :3] = linear
+            velocities[i, 3:] = angular
+
+        snapshot = Snapshot(name, p.saveState(physicsClientId=self.client), self.scene.get_state(),
+                            velocities, len(physics_ids))
+        self.snapshots[name] = snapshot
+        self.used_bytes += snapshot.nbytes
+        self._evict()
+        return snapshot
+
+    # Volta ao snapshot com o nome dado (por omissão o mais recente).
+    # Devolve True se o restauro foi feito diretamente com p.restoreState.
+    def restore(self, name=None):
+        if name is None:
+            if not self.snapshots:
+                raise KeyError("Não há snapshots")
+            name = next(reversed(self.snapshots))
+        snapshot = self.snapshots[name]
+        self.snapshots.move_to_end(name)  # O mais usado é o último a ser esquecido
+        snapshot.restores += 1
+
+        fast = False
+        if np.array_equal(self.scene.physics_ids, snapshot.physics_ids):
+            try:
+                p.restoreState(snapshot.state_id, physicsClientId=self.client)
+                fast = True
+            except p.error:
+                pass  # Há outros corpos diferentes (por exemplo um labirinto carregado depois)
+
+        if fast:
+            self.fast_restores += 1
+        else:
+            self._rebuild(snapshot)
+            self.slow_restores += 1
+        self.scene.set_state(snapshot.scene_state)
+        return fast
+
+    # Recria os cubos que faltam, apaga os que sobram e repõe poses e velocidades
+    def _rebuild(self, snapshot):
+        wanted = snapshot.physics_ids
+        current = self.scene.physics_ids
+        extra = np.setdiff1d(current, wanted)
+        self.spawner.remove(extra[extra >= 0])
+
+        arrays = snapshot.scene_state["arrays"]
+        missing = np.flatnonzero(~np.isin(wanted, current) & (wanted >= 0))
+        if len(missing):
+            wanted[missing] = self.spawner.spawn(arrays["positions"][missing])
+
+        positions = arrays["positions"].tolist()
+        orientations = arrays["orientations"].tolist()
+        velocities = snapshot.velocities.tolist()
+        for i, body_id in enumerate(wanted.tolist()):
+            if body_id < 0:
+                continue
+            p.resetBasePositionAndOrientation(body_id, positions[i], orientations[i], physicsClientId=self.client)
+            p.resetBaseVelocity(body_id, velocities[i][:3], velocities[i][3:], physicsClientId=self.client)
+
+        # Guardar de novo para o próximo restauro deste snapshot ser direto
+        p.removeState(snapshot.state_id, physicsClientId=self.client)
+        snapshot.state_id = p.saveState(physicsClientId=self.client)
+
+    # Esquece um snapshot
+    def remove(self, name):
+        snapshot = self.snapshots.pop(name)
+        self.used_bytes -= snapshot.nbytes
+        if snapshot.state_id is not None:
+            p.removeState(snapshot.state_id, physicsClientId=self.client)
+            snapshot.state_id = None
+
+    # Esquece todos os snapshots
+    def clear(self):
+        for name in list(self.snapshots):
+            self.remove(name)
+
+    # Estatísticas do anel
+    def stats(self):
+        return {
+            "snapshots": len(self.snapshots),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.budget_bytes,
+            "fast_restores": self.fast_restores,
+            "slow_restores": self.slow_restores,
+            "evictions": self.evictions,
+        }
+
+    # Esquece os snapshots mais antigos até caber nos limites (fica sempre o último)
+    def _evict(self):
+        while len(self.snapshots) > 1 and (len(self.snapshots) > self.capacity or
+                                           self.used_bytes > self.budget_bytes):
+            self.remove(next(iter(self.snapshots)))
+            self.evictions += 1
@@ -0,0 +1,277 @@
+import heapq
+import itertools
+
+import numpy as np
+
+
+# Por cima da grelha há grelhas cada vez mais grossas (cada célula junta
+# COARSE_FACTOR^dims células da grelha de baixo) que guardam só as células
+# ocupadas. nearest usa-as quando não há nada nos primeiros NEAREST_RINGS anéis.
+COARSE_FACTOR = 4
+COARSE_LEVELS = 6
+NEAREST_RINGS = 2
+
+
+# Índice espacial em grelha uniforme (spatial hash) para procurar cubos perto de um ponto.
+# Cada objeto fica registado na célula onde está o seu centro; as consultas só
+# olham para as células vizinhas em vez de percorrer todos os objetos.
+# `axes` escolhe as coordenadas indexadas: (0, 1, 2) para 3D ou, por exemplo,
+# (0, 2) para procurar apenas no plano do chão (x, z), como em remover_cubo.
+# As posições inseridas são sempre 3D; os pontos das consultas podem ser 3D
+# ou ter apenas as coordenadas indexadas.
+class SpatialHash:
+    def __init__(self, cell_size=2.0, axes=(0, 1, 2), capacity=1024):
+        self.cell_size = float(cell_size)
+        self.axes = list(axes)
+        self.dims = len(self.axes)
+        self.cells = {}  # célula -> conjunto de ids
+        # levels[0] é self.cells; levels[k] guarda célula -> células ocupadas de levels[k - 1]
+        self.levels = [self.cells] + [{} for _ in range(COARSE_LEVELS)]
+        self.slots = {}  # id -> índice nos arrays abaixo
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.positions = np.empty((capacity, self.dims))
+        self.cell_of = np.empty((capacity, self.dims), dtype=np.int64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, item_id):
+        return item_id in self.slots
+
+    # Garante espaço nos arrays para n objetos
+    def _reserve(self, n):
+        if n <= len(self.ids):
+            return
+        capacity = max(n, 2 * len(self.ids))
+        for name in ("ids", "positions", "cell_of"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    # Coordenadas indexadas de uma ou várias posições
+    def _project(self, positions):
+        positions = np.asarray(positions, dtype=float)
+        if positions.shape[-1] != self.dims:
+            positions = positions[..., self.axes]
+        return positions
+
+    def _cell(self, point):
+        return tuple(int(c) for c in np.floor(point / self.cell_size))
+
+    # Regista um objeto na célula dada; uma célula nova é registada nas grelhas de cima
+    def _link(self, item_id, cell):
+        members = self.cells.get(cell)
+        if members is None:
+            members = self.cells[cell] = set()
+            child = cell
+            for cells in self.levels[1:]:
+                parent = tuple(c // COARSE_FACTOR for c in child)
+                children = cells.get(parent)
+                if children is not None:
+                    children.add(child)
+                    break
+                cells[parent] = {child}
+                child = parent
+        members.add(item_id)
+
+    # Retira um objeto da célula dada; células vazias saem de todas as grelhas
+    def _unlink(self, item_id, cell):
+        members = self.cells[cell]
+        members.discard(item_id)
+        if members:
+            return
+        del self.cells[cell]
+        child = cell
+        for cells in self.levels[1:]:
+            parent = tuple(c // COARSE_FACTOR for c in child)
+            children = cells[parent]
+            children.discard(child)
+            if children:
+                return
+            del cells[parent]
+            child = parent
+
+    # Adiciona um objeto na posição dada
+    def insert(self, item_id, position):
+        self.insert_many([item_id], [position])
+
+    # Adiciona vários objetos de uma vez (ids N, posições N x 3)
+    def insert_many(self, item_ids, positions):
+        positions = self._project(positions).reshape(-1, self.dims)
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        self._reserve(self.count + len(positions))
+        for item_id, position, cell in zip(item_ids, positions, cells):
+            if item_id in self.slots:
+                self.remove(item_id)
+            slot = self.count
+            self.count += 1
+            self.slots[item_id] = slot
+            self.ids[slot] = item_id
+            self.positions[slot] = position
+            self.cell_of[slot] = cell
+            self._link(item_id, tuple(cell.tolist()))
+
+    # Remove um objeto (troca com o último para manter os arrays compactos)
+    def remove(self, item_id):
+        slot = self.slots.pop(item_id)
+        self._unlink(item_id, tuple(self.cell_of[slot].tolist()))
+
+        last = self.count - 1
+        if slot != last:
+            moved = int(self.ids[last])
+            self.ids[slot] = moved
+            self.positions[slot] = self.positions[last]
+            self.cell_of[slot] = self.cell_of[last]
+            self.slots[moved] = slot
+        self.count = last
+
+    # Atualiza a posição de um objeto
+    def update(self, item_id, position):
+        self.update_many([item_id], [position])
+
+    # Atualiza as posições de vários objetos (por exemplo depois de um passo da física).
+    # Ids que não estão no índice são ignorados. As novas células são calculadas de forma vetorizada e só os objetos que mudaram
+    # de célula são movidos na tabela.
+    def update_many(self, item_ids, positions):
+        positions = self._project(positions).reshape(-1, self.dims)
+        # Ignora objetos que já foram removidos do índice
+        known = [k for k, item_id in enumerate(item_ids) if item_id in self.slots]
+        if len(known) != len(positions):
+            positions = positions[known]
+            item_ids = [item_ids[k] for k in known]
+        if len(positions) == 0:
+            return
+        slots = np.fromiter((self.slots[i] for i in item_ids), dtype=np.int64, count=len(positions))
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        moved = np.any(cells != self.cell_of[slots], axis=1)
+
+        for slot, cell in zip(slots[moved], cells[moved]):
+            item_id = int(self.ids[slot])
+            self._unlink(item_id, tuple(self.cell_of[slot].tolist()))
+            self._link(item_id, tuple(cell.tolist()))
+
+        self.positions[slots] = positions
+        self.cell_of[slots] = cells
+
+    # Esvazia o índice
+    def clear(self):
+        for cells in self.levels:
+            cells.clear()
+        self.slots.clear()
+        self.count = 0
+
+    # Devolve os ids e as distâncias dos objetos nas células dadas
+    def _candidates(self, cells, point):
+        item_ids = [item_id for cell in cells for item_id in self.cells.get(cell, ())]
+        if not item_ids:
+            return [], np.empty(0)
+        slots = [self.slots[item_id] for item_id in item_ids]
+        distances = np.linalg.norm(self.positions[slots] - point, axis=1)
+        return item_ids, distances
+
+    # Células à distância (de Chebyshev) exata `ring` da célula `center`
+    def _ring(self, center, ring):
+        if ring == 0:
+            return [center]
+        offsets = range(-ring, ring + 1)
+        return [
+            tuple(c + o for c, o in zip(center, offset))
+            for offset in itertools.product(offsets, repeat=self.dims)
+            if max(abs(o) for o in offset) == ring
+        ]
+
+    # Devolve (id, distância) do objeto mais próximo do ponto, ou None se não houver
+    # nenhum a menos de max_distance
+    def nearest(self, point, max_distance=float("inf")):
+        if self.count == 0:
+            return None
+        point = self._project(point)
+        center = self._cell(point)
+
+        best_id, best_distance = None, max_distance
+        ring = 0
+        while True:
+            # O objeto mais próximo fora dos anéis já vistos está a pelo menos isto
+            if ring > 0 and (ring - 1) * self.cell_size >= best_distance:
+                break
+            # Nada por perto: em vez de alargar os anéis desce pelas grelhas grossas
+            if best_id is None and ring > NEAREST_RINGS:
+                return self._nearest_coarse(point, max_distance)
+            item_ids, distances = self._candidates(self._ring(center, ring), point)
+            if len(distances):
+                i = int(np.argmin(distances))
+                if distances[i] <= best_distance:
+                    best_id, best_distance = item_ids[i], float(distances[i])
+            ring += 1
+
+        if best_id is None:
+            return None
+        return best_id, best_distance
+
+    # Procura do mais próximo a partir da grelha mais grossa, abrindo sempre a
+    # célula mais perto do ponto primeiro e ignorando as que já estão mais longe
+    # do que o melhor objeto encontrado
+    def _nearest_coarse(self, point, max_distance):
+        top = len(self.levels) - 1
+        cells = list(self.levels[top])
+        heap = [(d, top, cell) for cell, d in zip(cells, self._cell_distances(cells, top, point))]
+        heapq.heapify(heap)
+
+        best_id, best_distance = None, max_distance
+        while heap:
+            distance, level, cell = heapq.heappop(heap)
+            if distance > best_distance:
+                break
+            if level == 0:
+                item_ids, distances = self._candidates([cell], point)
+                i = int(np.argmin(distances))
+                if distances[i] <= best_distance:
+                    best_id, best_distance = item_ids[i], float(distances[i])
+                continue
+            children = list(self.levels[level][cell])
+            for child, d in zip(children, self._cell_distances(children, level - 1, point)):
+                if d <= best_distance:
+                    heapq.heappush(heap, (d, level - 1, child))
+
+        if best_id is None:
+            return None
+        return best_id, best_distance
+
+    # Distância do ponto a cada uma das células dadas da grelha `level`
+    def _cell_distances(self, cells, level, point):
+        size = self.cell_size * COARSE_FACTOR ** level
+        lo = np.array(cells, dtype=float).reshape(-1, self.dims) * size
+        gap = np.maximum(np.maximum(lo - point, point - lo - size), 0.0)
+        return np.sqrt(np.einsum("ij,ij->i", gap, gap)).tolist()
+
+    # Ids de todos os objetos a menos de `radius` do ponto
+    def query_radius(self, point, radius):
+        point = self._project(point)
+        lo = np.floor((point - radius) / self.cell_size).astype(np.int64)
+        hi = np.floor((point + radius) / self.cell_size).astype(np.int64)
+        item_ids, distances = self._candidates(self._cells_between(lo, hi), point)
+        return [item_id for item_id, d in zip(item_ids, distances) if d <= radius]
+
+    # Ids de todos os objetos dentro da caixa [lo, hi]
+    def query_box(self, lo, hi):
+        lo = self._project(lo)
+        hi = self._project(hi)
+        cell_lo = np.floor(lo / self.cell_size).astype(np.int64)
+        cell_hi = np.floor(hi / self.cell_size).astype(np.int64)
+        item_ids = [item_id for cell in self._cells_between(cell_lo, cell_hi)
+                    for item_id in self.cells.get(cell, ())]
+        if not item_ids:
+            return []
+        positions = self.positions[[self.slots[item_id] for item_id in item_ids]]
+        inside = np.all((positions >= lo) & (positions <= hi), axis=1)
+        return [item_id for item_id, ok in zip(item_ids, inside) if ok]
+
+    # Células entre lo e hi (inclusive); para caixas grandes percorre só as ocupadas
+    def _cells_between(self, lo, hi):
+        volume = int(np.prod(hi - lo + 1))
+        if volume > len(self.cells):
+            return [cell for cell in self.cells
+                    if all(l <= c <= h for c, l, h in zip(cell, lo, hi))]
+        return list(itertools.product(*(range(l, h + 1) for l, h in zip(lo.tolist(), hi.tolist()))))
@@ -0,0 +1,83 @@
+import numpy as np
+import pybullet as p
+
+# Dimensões e massa do cube.urdf do pybullet_data (cubo de 1 m e 1 kg)
+CUBE_HALF_EXTENT = 0.5
+CUBE_MASS = 1.0
+
+# Número de corpos por chamada a createMultiBody. O custo de cada lote cresce
+# mais do que linearmente com o seu tamanho, por isso lotes médios são os mais rápidos.
+BATCH_SIZE = 256
+
+
+# Cria cubos no PyBullet em lote, partilhando uma única forma de colisão e uma
+# única forma visual entre todos os corpos (em vez de um loadURDF por cubo,
+# que volta a ler o URDF e cria uma forma nova de cada vez).
+class CubeSpawner:
+    def __init__(self, half_extent=CUBE_HALF_EXTENT, mass=CUBE_MASS, color=(0, 0, 1, 1),
+                 batch_size=BATCH_SIZE, client=0):
+        self.half_extents = [half_extent] * 3 if np.isscalar(half_extent) else list(half_extent)
+        self.mass = mass
+        self.color = list(color)
+        self.batch_size = batch_size
+        self.client = client
+        self.collision_shape = None
+        self.visual_shape = None
+        self.free_ids = 0  # Ids de corpos apagados com remove() que o PyBullet vai reutilizar
+
+    # Cria as formas partilhadas na primeira utilização
+    def shapes(self):
+        if self.collision_shape is None:
+            self.collision_shape = p.createCollisionShape(
+                p.GEOM_BOX, halfExtents=self.half_extents, physicsClientId=self.client)
+            self.visual_shape = p.createVisualShape(
+                p.GEOM_BOX, halfExtents=self.half_extents, rgbaColor=self.color, physicsClientId=self.client)
+        return self.collision_shape, self.visual_shape
+
+    # Cria um cubo em cada posição (N x 3) e devolve a lista de ids dos corpos
+    def spawn(self, positions, orientation=(0, 0, 0, 1)):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        collision_shape, visual_shape = self.shapes()
+
+        # Enquanto houver ids livres os cubos são criados um a um: o PyBullet
+        # reutiliza primeiro esses ids e os ids devolvidos por um lote ficariam errados
+        body_ids = []
+        single = min(self.free_ids, len(positions))
+        for position in positions[:single].tolist():
+            body_ids.append(p.createMultiBody(
+                baseMass=self.mass,
+                baseCollisionShapeIndex=collision_shape,
+                baseVisualShapeIndex=visual_shape,
+                basePosition=position,
+                baseOrientation=orientation,
+                physicsClientId=self.client))
+        self.free_ids -= single
+
+        for start in range(single, len(positions), self.batch_size):
+            batch = positions[start:start + self.batch_size].tolist()
+            ids = p.createMultiBody(
+                baseMass=self.mass,
+                baseCollisionShapeIndex=collision_shape,
+                baseVisualShapeIndex=visual_shape,
+                baseOrientation=orientation,
+                batchPositions=batch,
+                physicsClientId=self.client)
+            body_ids.extend(ids if isinstance(ids, (tuple, list)) else [ids])
+
+        # Nota: os corpos criados em lote não aparecem em p.getNumBodies() até um
+        # p.syncBodyInfo(), que custa mais do que a própria criação; por isso os
+        # ids devolvidos devem ser guardados por quem chama (como na lista cubos).
+        return body_ids
+
+    # Apaga corpos. Os cubos devem ser apagados por aqui (e não diretamente com
+    # p.removeBody) para o spawner saber que há ids que vão ser reutilizados.
+    def remove(self, body_ids):
+        for body_id in body_ids:
+            p.removeBody(int(body_id), physicsClientId=self.client)
+            self.free_ids += 1
+
+    # Esquece as formas (por exemplo depois de p.resetSimulation)
+    def reset(self):
+        self.collision_shape = None
+        self.visual_shape = None
+        self.free_ids = 0
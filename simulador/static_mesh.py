@@ -0,0 +1,145 @@
+import numpy as np
+from OpenGL.GL import *
+
+# Cores por omissão do chão quadriculado (como em draw_grid)
+WHITE = (1.0, 1.0, 1.0)
+GREEN = (0.0, 1.0, 0.0)
+
+# Vértices por primitiva (para dividir uma malha em blocos sem partir primitivas)
+PRIMITIVE_VERTICES = {GL_QUADS: 4, GL_TRIANGLES: 3, GL_LINES: 2, GL_POINTS: 1}
+
+# Cantos de um quadrado unitário no plano XZ, pela ordem de draw_grid
+QUAD_CORNERS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float32)
+
+
+# Malha estática guardada na GPU: enviada uma única vez e desenhada com uma chamada.
+# Se a malha estiver dividida em blocos (ver split_into_chunks), draw() pode
+# receber a máscara dos blocos visíveis e desenha só esses.
+class StaticMesh:
+    def __init__(self, vertices, colors, primitive=GL_QUADS, chunks=None):
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 3)
+        colors = np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 3)
+        if len(vertices) != len(colors):
+            raise ValueError("A malha precisa de uma cor por vértice")
+
+        self.primitive = primitive
+        self.count = len(vertices)
+        self.chunks = chunks  # (centros, meias arestas, primeiro vértice, número de vértices) de cada bloco
+        self.vertex_vbo, self.color_vbo = glGenBuffers(2)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, self.color_vbo)
+        glBufferData(GL_ARRAY_BUFFER, colors.nbytes, colors, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    # Desenha a malha inteira, ou só os blocos com visible[i] verdadeiro
+    def draw(self, visible=None):
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vertex_vbo)
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, self.color_vbo)
+        glColorPointer(3, GL_FLOAT, 0, None)
+
+        if visible is None or self.chunks is None:
+            glDrawArrays(self.primitive, 0, self.count)
+        elif visible.any():
+            _, _, firsts, counts = self.chunks
+            glMultiDrawArrays(self.primitive, firsts[visible], counts[visible], int(visible.sum()))
+
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    # Liberta os buffers da GPU
+    def delete(self):
+        glDeleteBuffers(2, [self.vertex_vbo, self.color_vbo])
+        self.count = 0
+
+
+# Malha guardada em cache: só é reconstruída quando os parâmetros mudam.
+# O builder recebe os mesmos argumentos de draw() e devolve (vértices, cores).
+# Com chunk_size a malha é dividida em blocos para poderem ser descartados
+# os que estão fora da câmera (ver simulador/culling.py).
+class CachedMesh:
+    def __init__(self, builder, primitive=GL_QUADS, chunk_size=None):
+        self.builder = builder
+        self.primitive = primitive
+        self.chunk_size = chunk_size
+        self.key = None
+        self.mesh = None
+
+    # A malha para estes parâmetros, reconstruída primeiro se mudaram
+    def get(self, *args):
+        if self.mesh is None or args != self.key:
+            self.invalidate()
+            vertices, colors = self.builder(*args)
+            chunks = None
+            if self.chunk_size:
+                vertices, colors, chunks = split_into_chunks(vertices, colors, self.chunk_size,
+                                                             PRIMITIVE_VERTICES[self.primitive])
+            self.mesh = StaticMesh(vertices, colors, self.primitive, chunks)
+            self.key = args
+        return self.mesh
+
+    # Desenha a malha, reconstruindo-a primeiro se os parâmetros mudaram
+    def draw(self, *args):
+        self.get(*args).draw()
+
+    # Descarta a malha atual (é reconstruída no próximo draw)
+    def invalidate(self):
+        if self.mesh is not None:
+            self.mesh.delete()
+        self.mesh = None
+        self.key = None
+
+
+# Reordena os vértices de uma malha para que as primitivas de cada bloco de
+# chunk_size x chunk_size unidades no plano XZ fiquem seguidas. Devolve os
+# vértices e as cores reordenados e, por bloco, a caixa envolvente (centros e
+# meias arestas N x 3), o primeiro vértice e o número de vértices.
+def split_into_chunks(vertices, colors, chunk_size, primitive_vertices=4):
+    vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, primitive_vertices, 3)
+    colors = np.asarray(colors, dtype=np.float32).reshape(-1, primitive_vertices, 3)
+    low = vertices.min(axis=1)
+    high = vertices.max(axis=1)
+
+    corner = low[:, [0, 2]].min(axis=0)  # Os blocos começam no canto da malha
+    cells = np.floor((low[:, [0, 2]] - corner) / chunk_size).astype(np.int64)
+    _, chunk_of = np.unique(cells, axis=0, return_inverse=True)
+    chunk_of = chunk_of.ravel()
+    order = np.argsort(chunk_of, kind="stable")
+    counts = np.bincount(chunk_of)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    low = np.minimum.reduceat(low[order], starts)
+    high = np.maximum.reduceat(high[order], starts)
+    chunks = ((low + high) / 2, (high - low) / 2,
+              (starts * primitive_vertices).astype(np.int32), (counts * primitive_vertices).astype(np.int32))
+    return vertices[order], colors[order], chunks
+
+
+# Constrói o chão quadriculado de draw_grid: quadrados de x, z em range(-size, size)
+def build_checkerboard(size=20, color_a=WHITE, color_b=GREEN, y=0.0):
+    cells = np.arange(-size, size, dtype=np.float32)
+    x, z = np.meshgrid(cells, cells, indexing="ij")
+
+    vertices = np.empty((len(cells), len(cells), 4, 3), dtype=np.float32)
+    vertices[..., 0] = x[..., None] + QUAD_CORNERS[:, 0]
+    vertices[..., 1] = y
+    vertices[..., 2] = z[..., None] + QUAD_CORNERS[:, 1]
+
+    even = ((x + z) % 2 == 0)[..., None]
+    colors = np.where(even, np.float32(color_a), np.float32(color_b))
+    colors = np.repeat(colors[:, :, None, :], 4, axis=2)
+    return vertices, colors
+
+
+# Constrói o plano cinzento de drawPlane (um quadrado de lado 2 * size à altura y)
+def build_plane(size=20, y=-1.0, color=(0.5, 0.5, 0.5)):
+    vertices = np.array([
+        (-size, y, -size), (size, y, -size),
+        (size, y, size), (-size, y, size),
+    ], dtype=np.float32)
+    colors = np.tile(np.float32(color), (4, 1))
+    return vertices, colors
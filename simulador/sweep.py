@@ -0,0 +1,183 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pybullet as p
+
+from simulador.binary_scene import EXTENSION, BinaryScene, xml_to_binary
+from simulador.spawner import CubeSpawner
+from simulador.world import create_world
+
+# Parâmetros de cada variante e valores por omissão
+DEFAULTS = {
+    "gravity": -9.8,  # Gravidade no eixo y, que aponta para cima (m/s²)
+    "drop_height": 0.0,  # Altura (y) somada a todos os cubos (m)
+    "spacing": 1.0,  # Escala das posições no plano do chão xz (afasta ou junta os cubos)
+    "jitter": 0.0,  # Ruído aleatório nas posições xz (desvio padrão, m)
+    "seed": 0,  # Semente do ruído
+    "seconds": 2.0,  # Tempo simulado (s)
+    "timestep": 1.0 / 240.0,
+}
+
+# Métricas gravadas por cada execução
+METRICS = ["mean_height", "max_displacement", "mean_displacement", "kinetic_energy", "max_speed",
+           "steps", "wall_time", "steps_per_second"]
+
+# Estado de cada processo do pool: o cliente DIRECT, o cenário e o spawner
+worker = {}
+
+
+# Abre o cliente DIRECT e o cenário com memory-map uma única vez por processo:
+# as páginas do ficheiro são partilhadas entre todos os processos pelo sistema
+def init_worker(scene_path):
+    client = p.connect(p.DIRECT)
+    worker["client"] = client
+    worker["scene"] = BinaryScene(scene_path)
+    worker["spawner"] = CubeSpawner(client=client)
+
+
+# Corre uma variante e devolve (índice, posições finais, orientações finais, métricas)
+def run_variant(job):
+    index, params = job
+    client = worker["client"]
+    scene = worker["scene"]
+    spawner = worker["spawner"]
+    start = time.perf_counter()
+
+    positions = np.array(scene.positions, dtype=np.float64)
+    positions[:, [0, 2]] *= params["spacing"]
+    if params["jitter"]:
+        rng = np.random.default_rng(int(params["seed"]))
+        positions[:, [0, 2]] += rng.normal(0.0, params["jitter"], (len(positions), 2))
+    positions[:, 1] += params["drop_height"]
+
+    p.resetSimulation(physicsClientId=client)
+    spawner.reset()
+    create_world(client, gravity=(0.0, params["gravity"], 0.0))
+    p.setTimeStep(params["timestep"], physicsClientId=client)
+    body_ids = spawner.spawn(positions)
+
+    steps = int(round(params["seconds"] / params["timestep"]))
+    for _ in range(steps):
+        p.stepSimulation(physicsClientId=client)
+
+    final_positions = np.empty((len(body_ids), 3))
+    final_orientations = np.empty((len(body_ids), 4))
+    speeds = np.empty(len(body_ids))
+    for i, body_id in enumerate(body_ids):
+        position, orientation = p.getBasePositionAndOrientation(body_id, physicsClientId=client)
+        linear, _ = p.getBaseVelocity(body_id, physicsClientId=client)
+        final_positions[i] = position
+        final_orientations[i] = orientation
+        speeds[i] = np.linalg.norm(linear)
+
+    wall_time = time.perf_counter() - start
+    displacement = np.linalg.norm(final_positions - positions, axis=1) if len(positions) else np.zeros(1)
+    metrics = {
+        "mean_height": float(final_positions[:, 1].mean()) if len(positions) else 0.0,
+        "max_displacement": float(displacement.max()),
+        "mean_displacement": float(displacement.mean()),
+        "kinetic_energy": float(0.5 * spawner.mass * (speeds ** 2).sum()),
+        "max_speed": float(speeds.max()) if len(speeds) else 0.0,
+        "steps": steps,
+        "wall_time": wall_time,
+        "steps_per_second": steps / wall_time,
+    }
+    return index, final_positions, final_orientations, metrics
+
+
+# Todas as combinações dos valores dados para cada parâmetro (produto cartesiano)
+def expand_variants(grid):
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError("Parâmetros desconhecidos: %s" % ", ".join(sorted(unknown)))
+    names = list(grid)
+    variants = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(DEFAULTS)
+        params.update(zip(names, values))
+        variants.append(params)
+    return variants
+
+
+# Corre todas as variantes num pool de processos (um cliente DIRECT por
+# processo) e grava os resultados num único ficheiro .npz por colunas:
+# uma coluna por parâmetro e por métrica (um valor por execução) e os estados
+# finais de todas as execuções em final_positions (execuções x cubos x 3) e
+# final_orientations (execuções x cubos x 4).
+def run_sweep(scene_path, grid, out_path, workers=None, progress=True):
+    workers = workers or os.cpu_count()
+    variants = expand_variants(grid)
+
+    # Os XML são convertidos uma vez para o formato binário, em vez de cada
+    # processo voltar a ler o XML
+    temporary = None
+    if not scene_path.endswith(EXTENSION):
+        temporary = tempfile.NamedTemporaryFile(suffix=EXTENSION, delete=False)
+        temporary.close()
+        xml_to_binary(scene_path, temporary.name)
+        scene_path = temporary.name
+
+    try:
+        count = len(BinaryScene(scene_path))
+        final_positions = np.empty((len(variants), count, 3))
+        final_orientations = np.empty((len(variants), count, 4))
+        metrics = {name: np.empty(len(variants)) for name in METRICS}
+
+        start = time.perf_counter()
+        jobs = list(enumerate(variants))
+        with multiprocessing.Pool(workers, initializer=init_worker, initargs=(scene_path,)) as pool:
+            for done, (index, positions, orientations, values) in enumerate(
+                    pool.imap_unordered(run_variant, jobs), 1):
+                final_positions[index] = positions
+                final_orientations[index] = orientations
+                for name in METRICS:
+                    metrics[name][index] = values[name]
+                if progress:
+                    print("\r%d/%d execuções" % (done, len(variants)), end="", flush=True)
+        elapsed = time.perf_counter() - start
+        if progress:
+            print()
+    finally:
+        if temporary is not None:
+            os.remove(temporary.name)
+
+    columns = {name: np.array([variant[name] for variant in variants], dtype=float) for name in DEFAULTS}
+    columns.update(metrics)
+    np.savez(out_path, final_positions=final_positions, final_orientations=final_orientations, **columns)
+    return {"runs": len(variants), "cubes": count, "workers": workers, "elapsed": elapsed,
+            "runs_per_second": len(variants) / elapsed}
+
+
+# Lê "nome=v1,v2,..." da linha de comandos
+def parse_param(text):
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError("Use nome=v1,v2,...: %s" % text)
+    return name, [float(value) for value in values.split(",")]
+
+
+# Uso: python -m simulador.sweep cenario.sim3d --param gravity=-9.8,-1.6 --param drop_height=0,1,2
+#          --out resultados.npz
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corre o mesmo cenário com vários parâmetros em paralelo")
+    parser.add_argument("scene", help="cenário (.sim3d ou XML)")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        help="parâmetro e valores, por exemplo gravity=-9.8,-1.6 (%s)" % ", ".join(DEFAULTS))
+    parser.add_argument("--workers", type=int, help="número de processos (por omissão um por núcleo)")
+    parser.add_argument("--out", default="resultados.npz", help="ficheiro de resultados")
+    args = parser.parse_args(argv)
+
+    summary = run_sweep(args.scene, dict(args.param), args.out, args.workers)
+    print("%(runs)d execuções de %(cubes)d cubos em %(elapsed).2f s com %(workers)d processos "
+          "(%(runs_per_second).2f execuções/s)" % summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import os
+import time
+from collections import OrderedDict
+
+import pygame
+from OpenGL.GL import *
+
+
+# Descodifica uma imagem com o pygame (como em apply_texture) e devolve (dados RGB, largura, altura)
+def load_image(image_path):
+    texture = pygame.image.load(image_path)
+    texture_data = pygame.image.tostring(texture, "RGB", 1)
+    width, height = texture.get_size()
+    return texture_data, width, height
+
+
+# Entrada da cache: uma textura já enviada para a GPU
+class TextureEntry:
+    def __init__(self, texture_id, mtime, nbytes, checked_at):
+        self.texture_id = texture_id
+        self.mtime = mtime
+        self.nbytes = nbytes
+        self.checked_at = checked_at
+
+
+# Cache de texturas: cada imagem é descodificada e enviada para a GPU uma única vez.
+# As entradas são identificadas pelo caminho e pela data de modificação do ficheiro
+# (se o ficheiro mudar, a textura é recarregada). Quando a memória estimada na GPU
+# ultrapassa o orçamento, as texturas usadas há mais tempo são libertadas (LRU).
+class TextureCache:
+    def __init__(self, budget_bytes=256 * 1024 * 1024, recheck_interval=1.0, loader=load_image):
+        self.budget_bytes = budget_bytes
+        self.recheck_interval = recheck_interval  # Segundos entre verificações da data do ficheiro
+        self.loader = loader
+        self.entries = OrderedDict()  # caminho -> TextureEntry, da menos para a mais recente
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Devolve o id da textura da imagem, carregando-a apenas se ainda não estiver em cache
+    def get(self, image_path):
+        now = time.monotonic()
+        entry = self.entries.get(image_path)
+        if entry is not None:
+            if now - entry.checked_at < self.recheck_interval:
+                return self._hit(image_path, entry)
+            mtime = os.stat(image_path).st_mtime_ns
+            if mtime == entry.mtime:
+                entry.checked_at = now
+                return self._hit(image_path, entry)
+            self._release(image_path)  # O ficheiro mudou: descarta a versão antiga
+        else:
+            mtime = os.stat(image_path).st_mtime_ns
+
+        self.misses += 1
+        texture_data, width, height = self.loader(image_path)
+        texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, texture_data)
+        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+
+        entry = TextureEntry(texture_id, mtime, width * height * 3, now)
+        self.entries[image_path] = entry
+        self.used_bytes += entry.nbytes
+        self._evict()
+        return texture_id
+
+    # Permite usar a cache como dicionário: cache[caminho]
+    def __getitem__(self, image_path):
+        return self.get(image_path)
+
+    def __contains__(self, image_path):
+        return image_path in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Liga a textura da imagem ao GL_TEXTURE_2D
+    def bind(self, image_path):
+        texture_id = self.get(image_path)
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        return texture_id
+
+    # Estatísticas da cache (acertos, falhas, memória usada, ...)
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "textures": len(self.entries),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.budget_bytes,
+        }
+
+    # Liberta todas as texturas da GPU
+    def clear(self):
+        for image_path in list(self.entries):
+            self._release(image_path)
+
+    def _hit(self, image_path, entry):
+        self.hits += 1
+        self.entries.move_to_end(image_path)
+        return entry.texture_id
+
+    # Liberta as texturas menos usadas até caber no orçamento (nunca a mais recente)
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and len(self.entries) > 1:
+            image_path = next(iter(self.entries))
+            self._release(image_path)
+            self.evictions += 1
+
+    def _release(self, image_path):
+        entry = self.entries.pop(image_path)
+        self.used_bytes -= entry.nbytes
+        glDeleteTextures([entry.texture_id])
@@ -0,0 +1,300 @@
+import ctypes
+import hashlib
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+from OpenGL.GL import *
+
+# Cache em disco das texturas já descodificadas (uma por imagem e tamanho)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simulador", "texturas")
+
+# Versão do formato do cache (mudar quando a descodificação mudar)
+CACHE_VERSION = 1
+
+# Maior lado de uma textura, em pixels
+MAX_SIZE = 2048
+
+# Bytes enviados para a GPU por frame, no máximo (o resto fica para os frames seguintes)
+UPLOAD_BUDGET = 4 * 1024 * 1024
+
+# Buffers de pixels (PBO) usados alternadamente nos envios
+PBO_COUNT = 2
+
+
+# Potência de 2 mais próxima de n (limitada a max_size)
+def power_of_two(n, max_size=MAX_SIZE):
+    lower = 1 << max(int(n).bit_length() - 1, 0)
+    size = lower * 2 if n - lower > lower * 2 - n else lower
+    return min(size, max_size)
+
+
+# Nível seguinte da cadeia de mipmaps: média de cada bloco de 2 x 2 pixels
+def downsample(level):
+    height, width = level.shape[:2]
+    fy, fx = (2 if height > 1 else 1), (2 if width > 1 else 1)
+    return level.reshape(height // fy, fy, width // fx, fx, -1).mean(axis=(1, 3))
+
+
+# Descodifica a imagem e devolve a cadeia de mipmaps, do maior para o 1 x 1:
+# arrays RGBA uint8 com lados potência de 2, de baixo para cima como o OpenGL
+def build_mipmaps(image_path, max_size=MAX_SIZE):
+    image = Image.open(image_path).convert("RGBA")
+    size = (power_of_two(image.width, max_size), power_of_two(image.height, max_size))
+    if image.size != size:
+        image = image.resize(size, Image.BICUBIC)
+    level = np.asarray(image.transpose(Image.FLIP_TOP_BOTTOM), dtype=np.float32)
+
+    levels = [level.astype(np.uint8)]
+    while level.shape[0] > 1 or level.shape[1] > 1:
+        level = downsample(level)
+        levels.append(np.rint(level).astype(np.uint8))
+    return levels
+
+
+# Nome da imagem no cache: caminho, data e tamanho do ficheiro e parâmetros
+def cache_key(image_path, max_size):
+    stat = os.stat(image_path)
+    key = (CACHE_VERSION, os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, max_size)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+# Mipmaps de uma imagem, lidos do cache em disco se já lá estiverem (sem
+# descodificar o JPEG). Devolve (níveis, True se veio do cache).
+def load_mipmaps(image_path, max_size=MAX_SIZE, cache_dir=CACHE_DIR):
+    cache_path = None
+    if cache_dir:
+        cache_path = os.path.join(cache_dir, cache_key(image_path, max_size) + ".npz")
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                return [data["level%d" % i] for i in range(len(data.files))], True
+
+    levels = build_mipmaps(image_path, max_size)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = cache_path + ".tmp.npz"
+        np.savez(temporary, **{"level%d" % i: level for i, level in enumerate(levels)})
+        os.replace(temporary, cache_path)  # Nunca deixa um cache meio escrito
+    return levels, False
+
+
+# Uma textura pedida ao TextureLoader. texture_id só é dado quando já há
+# pelo menos um nível na GPU; até lá (e enquanto os níveis maiores chegam) a
+# textura fica mais desfocada, mas pode ser usada.
+class Texture:
+    def __init__(self, path):
+        self.path = path
+        self.texture_id = None
+        self.levels = None  # Cadeia de mipmaps descodificada (até ser enviada)
+        self.width = 0
+        self.height = 0
+        self.base_level = None  # Nível mais detalhado já na GPU
+        self.level = None  # Nível a ser enviado
+        self.row = 0  # Próxima linha do nível a enviar
+        self.error = None
+
+    # Se já pode ser desenhada
+    def ready(self):
+        return self.base_level is not None
+
+    # Se todos os níveis já estão na GPU
+    def complete(self):
+        return self.base_level == 0
+
+
+# Carrega texturas sem parar o desenho. As imagens são descodificadas,
+# redimensionadas para potências de 2 e reduzidas em mipmaps numa thread
+# (ou lidas do cache em disco); update(), chamado em cada frame com o contexto
+# OpenGL ativo, envia no máximo `upload_budget` bytes por frame através de
+# buffers de pixels (PBO), começando pelos níveis mais pequenos, por isso a
+# textura aparece logo (desfocada) e ganha detalhe nos frames seguintes.
+#
+#     textures = TextureLoader()
+#     textures.request("labirinto.jpg")
+#     ...
+#     textures.update()  # em cada frame
+#     if textures.bind("labirinto.jpg"):
+#         ...
+class TextureLoader:
+    def __init__(self, workers=2, upload_budget=UPLOAD_BUDGET, max_size=MAX_SIZE, cache_dir=CACHE_DIR):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="texturas")
+        self.results = queue.Queue()  # (textura, future) das descodificações terminadas
+        self.pending = 0
+        self.upload_budget = upload_budget
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.textures = {}  # caminho -> Texture
+        self.uploads = []  # Texturas descodificadas à espera de envio
+        self.pbos = None
+        self.next_pbo = 0
+        self.cache_hits = 0
+        self.decoded = 0
+        self.uploaded_bytes = 0
+        self.upload_frames = 0  # Frames em que houve envios
+        self.decode_time = 0.0  # Soma dos tempos de descodificação (nas threads)
+
+    # Pede a textura de uma imagem (só a primeira vez é carregada)
+    def request(self, path):
+        texture = self.textures.get(path)
+        if texture is None:
+            texture = self.textures[path] = Texture(path)
+            self.pending += 1
+            future = self.executor.submit(self._load, path)
+            future.add_done_callback(lambda done: self.results.put((texture, done)))
+        return texture
+
+    def _load(self, path):
+        start = time.perf_counter()
+        levels, cached = load_mipmaps(path, self.max_size, self.cache_dir)
+        return levels, cached, time.perf_counter() - start
+
+    # Recebe as texturas já descodificadas (na thread principal)
+    def _collect(self):
+        while True:
+            try:
+                texture, future = self.results.get_nowait()
+            except queue.Empty:
+                return
+            self.pending -= 1
+            error = future.exception()
+            if error is None:
+                self._decoded(texture, *future.result())
+            else:
+                texture.error = error
+                print("Erro ao carregar a textura %s: %s" % (texture.path, error))
+
+    def _decoded(self, texture, levels, cached, elapsed):
+        texture.levels = levels
+        texture.height, texture.width = texture.levels[0].shape[:2]
+        texture.level = len(texture.levels) - 1
+        self.cache_hits += int(cached)
+        self.decoded += int(not cached)
+        self.decode_time += elapsed
+        self.uploads.append(texture)
+
+    # Id da textura (pedindo-a se for preciso), ou None se ainda não está pronta
+    def get(self, path):
+        texture = self.request(path)
+        return texture.texture_id if texture.ready() else None
+
+    # Liga a textura ao GL_TEXTURE_2D; devolve False se ainda não está pronta
+    def bind(self, path):
+        texture_id = self.get(path)
+        if texture_id is None:
+            return False
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        return True
+
+    # Recebe as texturas descodificadas e envia a parte que cabe neste frame.
+    # Devolve True se alguma textura mudou (para redesenhar).
+    def update(self):
+        self._collect()
+        if not self.uploads:
+            return False
+        if self.pbos is None:
+            self.pbos = list(np.atleast_1d(glGenBuffers(PBO_COUNT)))
+
+        budget = self.upload_budget
+        changed = False
+        while self.uploads and budget > 0:
+            texture = self.uploads[0]
+            sent = self._upload(texture, budget)
+            budget -= sent
+            changed = True
+            if texture.complete():
+                texture.levels = None  # Os dados já estão na GPU
+                self.uploads.pop(0)
+        self.upload_frames += 1
+        return changed
+
+    # Envia linhas do nível atual da textura (pelo menos uma) e devolve os bytes enviados
+    def _upload(self, texture, budget):
+        if texture.texture_id is None:
+            texture.texture_id = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, texture.texture_id)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(texture.levels) - 1)
+        glBindTexture(GL_TEXTURE_2D, texture.texture_id)
+
+        level = texture.levels[texture.level]
+        height, width = level.shape[:2]
+        if texture.row == 0:
+            # Reserva o nível (sem PBO ligado, para não ler dados dele)
+            glTexImage2D(GL_TEXTURE_2D, texture.level, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+
+        row_bytes = width * 4
+        rows = min(max(budget // row_bytes, 1), height - texture.row)
+        strip = np.ascontiguousarray(level[texture.row:texture.row + rows])
+
+        # Copia as linhas para um PBO (descartando o conteúdo anterior, para
+        # não esperar pela GPU) e a GPU lê-as de lá quando puder
+        pbo = self.pbos[self.next_pbo]
+        self.next_pbo = (self.next_pbo + 1) % len(self.pbos)
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+        glBufferData(GL_PIXEL_UNPACK_BUFFER, strip.nbytes, None, GL_STREAM_DRAW)
+        pointer = glMapBuffer(GL_PIXEL_UNPACK_BUFFER, GL_WRITE_ONLY)
+        ctypes.memmove(pointer, strip.ctypes.data, strip.nbytes)
+        glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        glTexSubImage2D(GL_TEXTURE_2D, texture.level, 0, texture.row, width, rows, GL_RGBA, GL_UNSIGNED_BYTE,
+                        ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+        texture.row += rows
+        if texture.row == height:
+            # Nível completo: passa a ser o mais detalhado usado no desenho
+            texture.base_level = texture.level
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_BASE_LEVEL, texture.level)
+            texture.level -= 1
+            texture.row = 0
+        self.uploaded_bytes += strip.nbytes
+        return strip.nbytes
+
+    # Se ainda há texturas a descodificar ou a enviar
+    def busy(self):
+        return self.pending > 0 or bool(self.uploads)
+
+    def stats(self):
+        return {
+            "textures": len(self.textures),
+            "ready": sum(texture.ready() for texture in self.textures.values()),
+            "decoded": self.decoded,
+            "cache_hits": self.cache_hits,
+            "decode_ms": self.decode_time * 1000.0,
+            "uploaded_bytes": self.uploaded_bytes,
+            "upload_frames": self.upload_frames,
+        }
+
+    # Liberta as texturas e os PBO da GPU e termina as threads
+    def delete(self):
+        self.executor.shutdown(wait=True)
+        ids = [texture.texture_id for texture in self.textures.values() if texture.texture_id is not None]
+        if ids:
+            glDeleteTextures(ids)
+        if self.pbos is not None:
+            glDeleteBuffers(len(self.pbos), self.pbos)
+        self.textures.clear()
+        self.uploads.clear()
+        self.pbos = None
+
+
+# Uso: python -m simulador.texture_loader labirinto.jpg
+# Compara o tempo de descodificar a imagem com o de a ler do cache em disco
+# (sem OpenGL).
+if __name__ == "__main__":
+    image_path = sys.argv[1]
+    start = time.perf_counter()
+    levels = build_mipmaps(image_path)
+    decode_time = time.perf_counter() - start
+    load_mipmaps(image_path)  # Garante que está no cache
+    start = time.perf_counter()
+    load_mipmaps(image_path)
+    cache_time = time.perf_counter() - start
+    print("%s: %d x %d, %d níveis, %.1f MB; descodificar %.3f s, cache %.3f s" % (
+        image_path, levels[0].shape[1], levels[0].shape[0], len(levels),
+        sum(level.nbytes for level in levels) / 1e6, decode_time, cache_time))
@@ -0,0 +1,312 @@
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+from simulador.cube_renderer import CubeRenderer, quaternions_to_matrices
+from simulador.frame_pacer import FramePacer
+
+# Formato das gravações (.traj):
+#   cabeçalho de 128 bytes (assinatura, versão, número de corpos, passo, ...)
+#   seguido de um registo de tamanho fixo por passo da física, com as posições
+#   e as orientações de todos os corpos. Como todos os registos têm o mesmo
+#   tamanho, o ficheiro é lido com memory-map e saltar para qualquer instante
+#   é imediato.
+#
+# Com quantize=True as posições são guardadas como uint16 dentro de `bounds`
+# e os quaterniões como int16 (14 bytes por corpo em vez de 28).
+EXTENSION = ".traj"
+MAGIC = b"SIMTRAJ\0"
+SCHEMA_VERSION = 1
+HEADER_SIZE = 128
+
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("body_count", "<u8"),
+    ("start_step", "<u8"),
+    ("timestep", "<f8"),
+    ("quantized", "<u4"),
+    ("bounds_min", "<f4", (3,)),
+    ("bounds_max", "<f4", (3,)),
+])
+
+# Limites por omissão das posições quantizadas (resolução de cerca de 3 mm)
+BOUNDS = ((-100.0, -100.0, -100.0), (100.0, 100.0, 100.0))
+
+# Passos por bloco entregue ao escritor e número de blocos preparados
+CHUNK_FRAMES = 256
+CHUNKS = 4
+
+
+# Tipo de cada registo (um passo) para n corpos
+def frame_dtype(body_count, quantized):
+    if quantized:
+        return np.dtype([("positions", "<u2", (body_count, 3)), ("orientations", "<i2", (body_count, 4))])
+    return np.dtype([("positions", "<f4", (body_count, 3)), ("orientations", "<f4", (body_count, 4))])
+
+
+# Grava as poses de um conjunto fixo de corpos a cada passo da física.
+# As poses são copiadas para blocos NumPy pré-alocados; quando um bloco fica
+# cheio é entregue a uma thread que o escreve no ficheiro, e a física continua
+# logo a gravar no bloco seguinte. Só bloqueia se o disco não acompanhar
+# (as vezes que isso acontece ficam em `stalls`).
+#
+#     recorder = TrajectoryRecorder("corrida.traj", len(body_ids), 1 / 240)
+#     scheduler.step_listeners.append(recorder.record_snapshot)
+#     ...
+#     recorder.close()
+class TrajectoryRecorder:
+    def __init__(self, path, body_count, timestep, start_step=0, quantize=False, bounds=BOUNDS,
+                 chunk_frames=CHUNK_FRAMES, chunks=CHUNKS):
+        self.path = path
+        self.body_count = body_count
+        self.quantized = quantize
+        self.bounds_min = np.asarray(bounds[0], dtype=np.float64)
+        self.bounds_max = np.asarray(bounds[1], dtype=np.float64)
+        self.scale = 65535.0 / (self.bounds_max - self.bounds_min)
+        self.dtype = frame_dtype(body_count, quantize)
+        self.frames = 0
+        self.stalls = 0
+        self.closed = False
+
+        header = np.zeros(1, dtype=HEADER)
+        header["magic"] = MAGIC
+        header["version"] = SCHEMA_VERSION
+        header["header_size"] = HEADER_SIZE
+        header["body_count"] = body_count
+        header["start_step"] = start_step
+        header["timestep"] = timestep
+        header["quantized"] = int(quantize)
+        header["bounds_min"] = self.bounds_min
+        header["bounds_max"] = self.bounds_max
+        self.file = open(path, "wb")
+        self.file.write(header.tobytes().ljust(HEADER_SIZE, b"\0"))
+
+        # Blocos livres e blocos cheios à espera do escritor
+        self.free = queue.Queue()
+        for _ in range(chunks):
+            self.free.put(np.empty(chunk_frames, dtype=self.dtype))
+        self.full = queue.Queue()
+        self.chunk = self.free.get()
+        self.filled = 0
+        self.writer = threading.Thread(target=self._write, name="trajectory-writer", daemon=True)
+        self.writer.start()
+
+    # Grava as poses de um passo (posições N x 3 e quaterniões N x 4)
+    def record(self, positions, orientations):
+        if self.closed:
+            return False
+        if len(positions) != self.body_count:
+            raise ValueError("A gravação tem %d corpos, não %d" % (self.body_count, len(positions)))
+
+        frame = self.chunk[self.filled]
+        if self.quantized:
+            quantized = (np.asarray(positions) - self.bounds_min) * self.scale
+            frame["positions"] = np.clip(np.rint(quantized), 0, 65535)
+            frame["orientations"] = np.rint(np.asarray(orientations) * 32767)
+        else:
+            frame["positions"] = positions
+            frame["orientations"] = orientations
+        self.filled += 1
+        self.frames += 1
+
+        if self.filled == len(self.chunk):
+            self._hand_over()
+        return True
+
+    # Para usar em PhysicsScheduler.step_listeners. A gravação termina sozinha
+    # se o número de corpos mudar (por exemplo ao criar ou apagar um cubo); o
+    # False devolvido depois de fechada faz o PhysicsScheduler retirá-la dos
+    # listeners, e deixa de ler as poses em todos os passos.
+    def record_snapshot(self, snapshot):
+        if len(snapshot.body_ids) != self.body_count:
+            self.close()
+            return False
+        return self.record(snapshot.positions, snapshot.orientations)
+
+    # Entrega o bloco atual ao escritor e passa para um bloco livre
+    def _hand_over(self):
+        self.full.put((self.chunk, self.filled))
+        try:
+            self.chunk = self.free.get_nowait()
+        except queue.Empty:
+            self.stalls += 1
+            self.chunk = self.free.get()
+        self.filled = 0
+
+    def _write(self):
+        while True:
+            item = self.full.get()
+            if item is None:
+                break
+            chunk, filled = item
+            self.file.write(chunk[:filled].tobytes())
+            self.free.put(chunk)
+
+    # Escreve o que falta e fecha o ficheiro
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.filled:
+            self.full.put((self.chunk, self.filled))
+        self.full.put(None)
+        self.writer.join()
+        self.file.close()
+
+
+# Começa a gravar todos os corpos de um PhysicsScheduler a cada passo
+def start_recording(scheduler, path=None, quantize=False):
+    if path is None:
+        path = time.strftime("gravacao-%Y%m%d-%H%M%S") + EXTENSION
+    with scheduler.lock:
+        recorder = TrajectoryRecorder(path, len(scheduler.body_ids()), scheduler.timestep,
+                                      start_step=scheduler.step, quantize=quantize)
+        scheduler.step_listeners.append(recorder.record_snapshot)
+    return recorder
+
+
+# Pára uma gravação iniciada com start_recording
+def stop_recording(scheduler, recorder):
+    with scheduler.lock:
+        if recorder.record_snapshot in scheduler.step_listeners:
+            scheduler.step_listeners.remove(recorder.record_snapshot)
+        recorder.close()
+
+
+# Gravação aberta com memory-map. frame(i) devolve as poses do passo i já
+# convertidas para float; os passos são lidos diretamente do ficheiro.
+class Trajectory:
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC.rstrip(b"\0"):
+            raise ValueError("Não é uma gravação: %s" % path)
+        if int(header["version"][0]) > SCHEMA_VERSION:
+            raise ValueError("Versão da gravação não suportada: %d" % int(header["version"][0]))
+
+        self.body_count = int(header["body_count"][0])
+        self.start_step = int(header["start_step"][0])
+        self.timestep = float(header["timestep"][0])
+        self.quantized = bool(header["quantized"][0])
+        self.bounds_min = header["bounds_min"][0].astype(np.float64)
+        self.bounds_max = header["bounds_max"][0].astype(np.float64)
+        self.dtype = frame_dtype(self.body_count, self.quantized)
+
+        # O número de passos vem do tamanho do ficheiro: uma gravação
+        # interrompida continua legível até ao último bloco escrito
+        offset = int(header["header_size"][0])
+        count = (os.path.getsize(path) - offset) // self.dtype.itemsize
+        if count:
+            self.frames = np.memmap(path, dtype=self.dtype, mode="r", offset=offset, shape=(count,))
+        else:
+            self.frames = np.empty(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.frames)
+
+    # Duração da gravação em segundos simulados
+    def duration(self):
+        return len(self) * self.timestep
+
+    # Posições (N x 3) e quaterniões (N x 4) do passo i
+    def frame(self, i):
+        record = self.frames[i]
+        if not self.quantized:
+            return record["positions"].astype(np.float64), record["orientations"].astype(np.float64)
+        positions = record["positions"] * ((self.bounds_max - self.bounds_min) / 65535.0) + self.bounds_min
+        orientations = record["orientations"] / 32767.0
+        return positions, orientations
+
+    # Passo correspondente a um instante (em segundos desde o início da gravação)
+    def frame_at(self, seconds):
+        return int(np.clip(seconds / self.timestep, 0, max(len(self) - 1, 0)))
+
+
+# Reprodução de uma gravação ao ritmo do relógio, a qualquer velocidade
+# (speed=4 reproduz quatro vezes mais depressa que o tempo real). Não precisa
+# do PyBullet: as poses vêm todas do ficheiro.
+class TrajectoryPlayer:
+    def __init__(self, trajectory, speed=1.0, loop=True):
+        self.trajectory = trajectory
+        self.speed = speed
+        self.loop = loop
+        self.time = 0.0  # Instante atual da gravação (segundos simulados)
+        self.paused = False
+
+    # Avança pelo tempo real decorrido e devolve as poses do passo atual
+    def advance(self, elapsed):
+        if not self.paused:
+            self.time += elapsed * self.speed
+        duration = self.trajectory.duration()
+        if self.loop and duration > 0:
+            self.time %= duration
+        else:
+            self.time = min(max(self.time, 0.0), duration)
+        return self.trajectory.frame(self.trajectory.frame_at(self.time))
+
+    # Salta para um instante (segundos)
+    def seek(self, seconds):
+        self.time = seconds
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+
+
+# Reproduz uma gravação numa janela (sem PyBullet).
+# Espaço pausa, setas esquerda/direita recuam/avançam 1 s, +/- mudam a velocidade.
+def replay(path, speed=1.0):
+    trajectory = Trajectory(path)
+    player = TrajectoryPlayer(trajectory, speed)
+    pygame.init()
+    display = (1280, 720)
+    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
+    pygame.display.set_caption("%s (%d corpos, %.1f s)" % (os.path.basename(path), trajectory.body_count,
+                                                           trajectory.duration()))
+    glEnable(GL_DEPTH_TEST)
+    renderer = CubeRenderer(color=(0, 0, 1))
+    half_extent = 0.5  # Cubos do spawner
+
+    pacer = FramePacer()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    player.toggle_pause()
+                elif event.key == pygame.K_LEFT:
+                    player.seek(player.time - 1.0)
+                elif event.key == pygame.K_RIGHT:
+                    player.seek(player.time + 1.0)
+                elif event.key in (pygame.K_PLUS, pygame.K_KP_PLUS, pygame.K_EQUALS):
+                    player.speed *= 2
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    player.speed /= 2
+
+        positions, orientations = player.advance(pacer.delta)
+
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        glLoadIdentity()
+        gluPerspective(45, (display[0] / display[1]), 0.1, 100.0)
+        glTranslatef(0, 0, -30)
+        renderer.update(positions, sizes=np.full(len(positions), half_extent),
+                        rotations=quaternions_to_matrices(orientations))
+        renderer.draw()
+        pygame.display.flip()
+        pacer.tick()
+
+
+# Uso: python -m simulador.trajectory gravacao.traj [velocidade]
+if __name__ == "__main__":
+    replay(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
@@ -0,0 +1,275 @@
+import sys
+import time
+
+import numpy as np
+
+from simulador.maze import compile_maze, merge_rectangles
+from simulador.static_mesh import StaticMesh
+
+# Sombreado de cada face de um voxel, pela ordem das faces do QUAD_VERTICES
+# (+z, -z, -x, +x, +y, -y), com +z para cima
+FACE_SHADES = np.array([1.0, 0.5, 0.8, 0.8, 0.65, 0.65], dtype=np.float32)
+
+# Direções das faces (eixo, sentido), pela ordem de FACE_SHADES:
+# +z, -z, -x, +x, +y, -y
+DIRECTIONS = [(2, 1), (2, -1), (0, -1), (0, 1), (1, 1), (1, -1)]
+
+# Lado de cada bloco (chunk) da grelha, em células
+CHUNK_SIZE = 16
+
+
+# Grelha esparsa de cubos alinhados (voxels), dividida em blocos de
+# chunk_size^3 células. Cada célula guarda o material do cubo (0 = vazia); um
+# material é uma cor RGBA e uma textura, e só faces do mesmo material são
+# unidas. Criar ou apagar cubos marca como sujos apenas o bloco afetado (e o
+# vizinho, se o cubo estiver na fronteira), para só esses serem refeitos.
+#
+# As posições são convertidas em células com `cell` (a aresta de um cubo) a
+# partir de `origin`, por isso cubos fora da grelha são encaixados na célula
+# mais próxima.
+class VoxelGrid:
+    def __init__(self, cell=2.0, origin=(0.0, 0.0, 0.0), chunk_size=CHUNK_SIZE, shades=FACE_SHADES):
+        self.cell = cell
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.chunk_size = chunk_size
+        self.shades = np.asarray(shades, dtype=np.float32)  # Sombreado de cada direção
+        self.chunks = {}  # (cx, cy, cz) -> array chunk_size^3 com o material de cada célula
+        self.materials = {}  # (r, g, b, a, textura) -> id do material
+        self.palette = [np.zeros(3, dtype=np.float32)]  # Cor (RGB 0-1) de cada material
+        self.dirty = set()  # Blocos a refazer
+        self.count = 0  # Número de cubos
+
+    def __len__(self):
+        return self.count
+
+    # Célula (i, j, k) de cada posição (N x 3)
+    def cells_of(self, positions):
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        return np.rint((positions - self.origin) / self.cell).astype(np.int64)
+
+    # Id de cada material (cores RGBA 0-255 N x 4 e texturas N), criando os novos
+    def material_ids(self, colors, textures):
+        keys = np.column_stack([colors, textures]).astype(np.int64)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        ids = np.empty(len(unique), dtype=np.int32)
+        for i, key in enumerate(map(tuple, unique.tolist())):
+            if key not in self.materials:
+                self.materials[key] = len(self.palette)
+                self.palette.append(np.array(key[:3], dtype=np.float32) / 255.0)
+            ids[i] = self.materials[key]
+        return ids[inverse.ravel()]
+
+    # Adiciona cubos nas posições dadas (N x 3). Por omissão são azuis e sem
+    # textura, como no SceneStore.
+    def add(self, positions, colors=None, textures=None):
+        cells = self.cells_of(positions)
+        if colors is None:
+            colors = np.tile((0, 0, 255, 255), (len(cells), 1))
+        if textures is None:
+            textures = np.full(len(cells), -1)
+        self._set(cells, self.material_ids(colors, textures))
+
+    # Apaga os cubos nas posições dadas (N x 3)
+    def remove(self, positions):
+        cells = self.cells_of(positions)
+        self._set(cells, np.zeros(len(cells), dtype=np.int32))
+
+    # Apaga todos os cubos
+    def clear(self):
+        self.dirty.update(self.chunks)
+        self.chunks.clear()
+        self.count = 0
+
+    def _set(self, cells, values):
+        if len(cells) == 0:
+            return
+        # Se a mesma célula aparecer várias vezes fica o último valor
+        _, last = np.unique(cells[::-1], axis=0, return_index=True)
+        keep = len(cells) - 1 - last
+        cells, values = cells[keep], values[keep]
+
+        size = self.chunk_size
+        keys = cells // size
+        local = cells - keys * size
+        unique, group = np.unique(keys, axis=0, return_inverse=True)
+        group = group.ravel()
+        for g, key in enumerate(map(tuple, unique.tolist())):
+            members = group == g
+            i, j, k = local[members].T
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                chunk = self.chunks[key] = np.zeros((size, size, size), dtype=np.int32)
+            self.count -= int(np.count_nonzero(chunk[i, j, k]))
+            chunk[i, j, k] = values[members]
+            self.count += int(np.count_nonzero(values[members]))
+            if not chunk.any():
+                del self.chunks[key]
+
+            # O bloco e os vizinhos cujas faces de fronteira podem ter mudado
+            self.dirty.add(key)
+            for axis, coordinates in enumerate((i, j, k)):
+                for side, border in ((-1, 0), (1, size - 1)):
+                    if (coordinates == border).any():
+                        neighbour = list(key)
+                        neighbour[axis] += side
+                        self.dirty.add(tuple(neighbour))
+
+    # Caixa envolvente de um bloco no mundo (centro e meia aresta)
+    def chunk_bounds(self, key):
+        size = self.chunk_size
+        center = self.origin + ((np.asarray(key) + 0.5) * size - 0.5) * self.cell
+        return center, np.full(3, size * self.cell / 2)
+
+    # Malha de um bloco (GL_QUADS): vértices e cores, Q x 4 x 3 cada.
+    # Só ficam as faces que dão para uma célula vazia (as faces entre dois cubos
+    # encostados desaparecem) e, em cada camada e direção, as faces do mesmo
+    # material são unidas em retângulos grandes com merge_rectangles.
+    def mesh_chunk(self, key):
+        size = self.chunk_size
+        padded = np.zeros((size + 2,) * 3, dtype=np.int32)
+        inner = (slice(1, -1),) * 3
+        if key in self.chunks:
+            padded[inner] = self.chunks[key]
+
+        # Fronteira com os 6 blocos vizinhos
+        for axis in range(3):
+            for side, source, target in ((-1, size - 1, 0), (1, 0, size + 1)):
+                neighbour = list(key)
+                neighbour[axis] += side
+                chunk = self.chunks.get(tuple(neighbour))
+                if chunk is not None:
+                    destination = list(inner)
+                    destination[axis] = target
+                    padded[tuple(destination)] = np.take(chunk, source, axis=axis)
+
+        solid = padded[inner]
+        offset = np.asarray(key) * size
+        all_vertices = []
+        all_colors = []
+        for direction, (axis, sign) in enumerate(DIRECTIONS):
+            shifted = list(inner)
+            shifted[axis] = slice(1 + sign, size + 1 + sign)
+            faces = np.where(padded[tuple(shifted)] == 0, solid, 0)
+            if not faces.any():
+                continue
+
+            # Camadas ao longo do eixo da face, com os outros dois eixos (u, v)
+            # pela ordem cíclica; uma linha vazia entre camadas impede que os
+            # retângulos passem de uma camada para a seguinte
+            u_axis, v_axis = (axis + 1) % 3, (axis + 2) % 3
+            layers = faces.transpose(axis, u_axis, v_axis)
+            stacked = np.zeros((size, size + 1, size), dtype=np.int32)
+            stacked[:, :size] = layers
+            stacked = stacked.reshape(size * (size + 1), size)
+
+            for material in np.unique(layers[layers > 0]).tolist():
+                rectangles = merge_rectangles(stacked == material)
+                layer = rectangles[:, 0] // (size + 1)
+                u0 = rectangles[:, 0] % (size + 1) - 0.5
+                u1 = u0 + (rectangles[:, 2] - rectangles[:, 0])
+                v0 = rectangles[:, 1] - 0.5
+                v1 = rectangles[:, 3] - 0.5
+
+                corners = [(u0, v0), (u1, v0), (u1, v1), (u0, v1)]
+                if sign < 0:
+                    corners.reverse()  # Sentido anti-horário visto de fora
+                quads = np.empty((len(rectangles), 4, 3))
+                quads[:, :, axis] = (layer + 0.5 * sign)[:, None]
+                for corner, (u, v) in enumerate(corners):
+                    quads[:, corner, u_axis] = u
+                    quads[:, corner, v_axis] = v
+                all_vertices.append(self.origin + (quads + offset) * self.cell)
+                color = self.palette[material] * self.shades[direction]
+                all_colors.append(np.broadcast_to(color, quads.shape))
+
+        if not all_vertices:
+            return np.empty((0, 4, 3), dtype=np.float32), np.empty((0, 4, 3), dtype=np.float32)
+        return (np.concatenate(all_vertices).astype(np.float32),
+                np.concatenate(all_colors).astype(np.float32))
+
+    # Número de triângulos sem nenhuma otimização (6 faces de 2 triângulos por cubo)
+    def naive_triangles(self):
+        return self.count * 12
+
+
+# Malhas dos blocos de uma VoxelGrid guardadas na GPU. update() refaz só os
+# blocos sujos; draw() desenha os blocos visíveis (com um FrustumCuller).
+#
+#     grid.add(positions)
+#     voxels.update()
+#     voxels.draw(culler)
+class VoxelRenderer:
+    def __init__(self, grid):
+        self.grid = grid
+        self.meshes = {}  # Bloco -> StaticMesh
+        self.quads = {}  # Bloco -> número de quadriláteros
+        self.remeshed = 0  # Blocos refeitos no último update
+        self.remesh_time = 0.0  # Tempo (s) do último update
+
+    # Refaz as malhas dos blocos sujos
+    def update(self):
+        start = time.perf_counter()
+        dirty = self.grid.dirty
+        self.grid.dirty = set()
+        for key in dirty:
+            mesh = self.meshes.pop(key, None)
+            if mesh is not None:
+                mesh.delete()
+            self.quads.pop(key, None)
+
+            vertices, colors = self.grid.mesh_chunk(key)
+            if len(vertices):
+                self.meshes[key] = StaticMesh(vertices, colors)
+                self.quads[key] = len(vertices)
+        self.remeshed = len(dirty)
+        self.remesh_time = time.perf_counter() - start
+
+    # Desenha os blocos (só os que estão dentro da câmera, se for dado um culler)
+    def draw(self, culler=None):
+        keys = list(self.meshes)
+        if culler is not None and keys:
+            bounds = [self.grid.chunk_bounds(key) for key in keys]
+            centers = np.array([center for center, _ in bounds])
+            half_extents = np.array([half for _, half in bounds])
+            visible = culler.cull("blocos", centers, half_extents)
+            keys = [key for key, show in zip(keys, visible.tolist()) if show]
+        for key in keys:
+            self.meshes[key].draw()
+
+    # Triângulos desenhados com e sem a remoção e união das faces
+    def stats(self):
+        triangles = 2 * sum(self.quads.values())
+        return {
+            "cubes": self.grid.count,
+            "chunks": len(self.meshes),
+            "triangles": triangles,
+            "naive_triangles": self.grid.naive_triangles(),
+            "remeshed": self.remeshed,
+            "remesh_ms": self.remesh_time * 1000.0,
+        }
+
+    # Liberta todas as malhas da GPU
+    def delete(self):
+        for mesh in self.meshes.values():
+            mesh.delete()
+        self.meshes.clear()
+        self.quads.clear()
+
+
+# Uso: python -m simulador.voxels labirinto.jpg [altura]
+# Constrói as paredes do labirinto com cubos de uma célula e compara os
+# triângulos com e sem a remoção e união das faces (sem OpenGL).
+if __name__ == "__main__":
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    maze = compile_maze(sys.argv[1], cache_dir=None)
+    rows, cols = np.nonzero(maze.grid)
+    grid = VoxelGrid(cell=1.0)
+    for level in range(height):
+        grid.add(np.column_stack([cols, -rows, np.full(len(rows), level)]))
+
+    start = time.perf_counter()
+    quads = sum(len(grid.mesh_chunk(key)[0]) for key in list(grid.chunks))
+    elapsed = time.perf_counter() - start
+    print("%d cubos em %d blocos: %d triângulos em vez de %d (%.1fx menos) em %.3f s" % (
+        grid.count, len(grid.chunks), 2 * quads, grid.naive_triangles(),
+        grid.naive_triangles() / max(2 * quads, 1), elapsed))
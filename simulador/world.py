@@ -0,0 +1,23 @@
+import math
+
+import pybullet as p
+import pybullet_data
+
+# O desenho (OpenGL) tem o y para cima, com o chão quadriculado em y = 0, e as
+# posições dos cenários (XML, cliques) já vêm nesse referencial. O PyBullet
+# tem o z para cima por omissão; os cenários que simulam põem o mundo do
+# PyBullet também com o y para cima, para as posições e orientações serem as
+# mesmas nos dois lados, sem conversões.
+GRAVITY = (0.0, -9.8, 0.0)
+
+# Rotação de -90 graus em torno de x, que leva o plane.urdf (normal +z) para o
+# plano y = 0 (normal +y)
+GROUND_ORIENTATION = (-math.sqrt(0.5), 0.0, 0.0, math.sqrt(0.5))
+
+
+# Prepara um mundo com o y para cima: gravidade em -y e o chão em y = 0.
+# Devolve o id do corpo do chão.
+def create_world(client=0, gravity=GRAVITY):
+    p.setAdditionalSearchPath(pybullet_data.getDataPath(), physicsClientId=client)
+    p.setGravity(*gravity, physicsClientId=client)
+    return p.loadURDF("plane.urdf", baseOrientation=GROUND_ORIENTATION, physicsClientId=client)
@@ -0,0 +1,25 @@
+import time
+
+from simulador.frame_pacer import FramePacer
+
+
+# tick() espera só o que falta para o próximo frame e, depois de um frame
+# atrasado, não tenta recuperar os frames perdidos
+def test_tick_keeps_the_target_rate():
+    pacer = FramePacer(target_fps=100)
+    start = time.perf_counter()
+    for _ in range(10):
+        time.sleep(0.002)
+        pacer.tick()
+    elapsed = time.perf_counter() - start
+    assert 0.095 <= elapsed < 0.2
+    assert pacer.frames == pacer.drawn == 10
+
+    time.sleep(0.05)
+    assert pacer.tick() >= 0.05
+    start = time.perf_counter()
+    pacer.tick()
+    assert 0.008 <= time.perf_counter() - start < 0.05
+
+    pacer.tick(drawn=False)
+    assert pacer.frames == 13 and pacer.drawn == 12
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pybullet as p
+import pytest
+
+from simulador.maze import MAX_COMPOUND_CHILDREN, compile_maze
+
+# Labirinto de exemplo do repositório
+MAZE_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "labirinto.jpg")
+
+
+@pytest.fixture
+def client():
+    client = p.connect(p.DIRECT)
+    yield client
+    p.disconnect(client)
+
+
+# Um raio vertical (de cima para baixo) pelo centro de cada parede tem de
+# acertar num corpo do labirinto, no topo da parede
+def test_every_wall_collides(client):
+    maze = compile_maze(MAZE_IMAGE, cache_dir=None)
+    assert len(maze) > MAX_COMPOUND_CHILDREN
+
+    body_ids = maze.create_bodies(client)
+    assert len(body_ids) == -(-len(maze) // MAX_COMPOUND_CHILDREN)
+
+    tops = maze.centers[:, 1] + maze.half_extents[:, 1]
+    starts = maze.centers.copy()
+    starts[:, 1] = tops + 1.0
+    ends = maze.centers.copy()
+    ends[:, 1] = -1.0
+    results = p.rayTestBatch(starts.tolist(), ends.tolist(), physicsClientId=client)
+
+    hit_ids = np.array([result[0] for result in results])
+    hit_heights = np.array([result[3][1] for result in results])
+    missed = np.flatnonzero(~np.isin(hit_ids, body_ids))
+    assert len(missed) == 0, "%d de %d paredes sem colisão" % (len(missed), len(maze))
+    np.testing.assert_allclose(hit_heights, tops, atol=1e-3)
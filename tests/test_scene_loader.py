@@ -0,0 +1,72 @@
+import threading
+import time
+
+import numpy as np
+
+from simulador.scene_loader import BackgroundStream, SceneStream, WRITERS
+
+
+# Espera pelo próximo lote (devolve None se a leitura acabou)
+def wait_for_batch(stream, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        batch = stream.get()
+        if batch is not None or stream.finished:
+            return batch
+        time.sleep(0.001)
+    raise AssertionError("nenhum lote chegou")
+
+
+# Os lotes são entregues enquanto o resto do cenário ainda está a ser lido
+def test_batches_arrive_before_the_file_ends():
+    more = threading.Event()
+
+    def batches():
+        yield np.zeros((2, 3))
+        more.wait(5.0)
+        yield np.ones((1, 3))
+
+    stream = BackgroundStream(batches())
+    assert len(wait_for_batch(stream)) == 2
+    assert stream.get() is None and not stream.finished
+
+    more.set()
+    assert len(wait_for_batch(stream)) == 1
+    assert wait_for_batch(stream) is None
+    assert stream.finished and stream.error is None
+
+
+# Os cubos de um XML chegam todos, e um erro de leitura fica em `error`
+def test_reads_every_dialect_and_reports_errors(tmp_path):
+    positions = np.arange(30.0).reshape(10, 3)
+    for dialect, writer in WRITERS.items():
+        path = str(tmp_path / "cenario.xml")
+        writer(path, positions)
+        stream = BackgroundStream(SceneStream(path, batch_size=3))
+        batches = []
+        while not stream.finished:
+            batch = wait_for_batch(stream)
+            if batch is not None:
+                batches.append(batch)
+        np.testing.assert_array_equal(np.concatenate(batches), positions)
+
+    broken = tmp_path / "partido.xml"
+    broken.write_text("<cenario><cubo x='1' y='2' z='3' />")
+    stream = BackgroundStream(SceneStream(str(broken)))
+    while not stream.finished:
+        wait_for_batch(stream)
+    assert stream.error is not None
+
+
+# close() desiste da leitura sem deixar a thread bloqueada na fila cheia
+def test_close_stops_the_reader():
+    def batches():
+        while True:
+            yield np.zeros((1, 3))
+
+    stream = BackgroundStream(batches(), ready=2)
+    assert wait_for_batch(stream) is not None
+    stream.close()
+    stream.thread.join(5.0)
+    assert not stream.thread.is_alive()
+    assert stream.finished and stream.get() is None
@@ -0,0 +1,24 @@
+import numpy as np
+
+from simulador.scene_store import SceneStore
+
+
+# Remover troca o último cubo para o lugar do removido; os handles dos outros
+# continuam a apontar para os mesmos cubos e nunca são reutilizados
+def test_remove_swaps_last_and_keeps_handles():
+    store = SceneStore(capacity=2)
+    positions = np.arange(12, dtype=float).reshape(4, 3)
+    handles = store.add_many(positions, sizes=0.25).tolist()
+    assert handles == [0, 1, 2, 3]
+    assert np.all(store.sizes == 0.25)
+
+    store.remove(1)
+    assert len(store) == 3
+    assert 1 not in store
+    assert store.slot(3) == 1
+    assert store.handles.tolist() == [0, 3, 2]
+    for handle in (0, 2, 3):
+        assert np.array_equal(store.positions[store.slot(handle)], positions[handle])
+
+    assert store.add((9, 9, 9)) == 4
+    assert store.slots([4, 0]).tolist() == [3, 0]
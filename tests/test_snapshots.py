@@ -0,0 +1,47 @@
+import numpy as np
+import pybullet as p
+import pytest
+
+from simulador.scene_store import SceneStore
+from simulador.snapshots import SnapshotRing
+from simulador.spawner import CubeSpawner
+from simulador.world import create_world
+
+
+@pytest.fixture
+def client():
+    client = p.connect(p.DIRECT)
+    create_world(client)
+    yield client
+    p.disconnect(client)
+
+
+def body_positions(client, body_ids):
+    return np.array([p.getBasePositionAndOrientation(int(body_id), physicsClientId=client)[0]
+                     for body_id in body_ids])
+
+
+# Com os mesmos corpos o restauro é direto (p.restoreState); com cubos a mais
+# o mundo é refeito a partir da cópia, e nos dois casos a física e o cenário
+# voltam às poses guardadas
+def test_restore_returns_to_saved_poses(client):
+    scene = SceneStore()
+    spawner = CubeSpawner(client=client)
+    positions = [(0, 3, 0), (2, 4, 0)]
+    scene.add_many(positions, physics_ids=spawner.spawn(positions))
+    ring = SnapshotRing(scene, spawner, client=client)
+    ring.save("início")
+
+    for _ in range(60):
+        p.stepSimulation(physicsClientId=client)
+    assert ring.restore("início")
+    assert np.allclose(body_positions(client, scene.physics_ids), positions)
+
+    scene.add((4, 5, 0), physics_ids=spawner.spawn([(4, 5, 0)])[0])
+    for _ in range(60):
+        p.stepSimulation(physicsClientId=client)
+    assert not ring.restore("início")
+    assert len(scene) == 2
+    assert np.allclose(scene.positions, positions)
+    assert np.allclose(body_positions(client, scene.physics_ids), positions)
+    assert ring.stats()["slow_restores"] == 1
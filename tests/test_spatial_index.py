@@ -0,0 +1,37 @@
+import numpy as np
+
+from simulador.spatial_index import SpatialHash
+
+
+# nearest dá sempre a mesma distância que comparar com todos os objetos, mesmo
+# para pontos longe de tudo (onde passa pelas grelhas grossas) e depois de
+# mexer e remover objetos
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(0)
+    index = SpatialHash(cell_size=2.0, axes=(0, 2))
+    positions = {}
+    for _ in range(10):
+        ids = rng.integers(0, 500, 50).tolist()
+        new = rng.normal(0.0, 10 ** rng.uniform(0, 3), (50, 3))
+        index.insert_many(ids, new)
+        positions.update(zip(ids, new))
+        for item_id in rng.choice(list(positions), 10, replace=False).tolist():
+            index.remove(item_id)
+            del positions[item_id]
+        moved = rng.choice(list(positions), 10, replace=False).tolist()
+        new = rng.normal(0.0, 300.0, (10, 3))
+        index.update_many(moved, new)
+        positions.update(zip(moved, new))
+
+        ids = list(positions)
+        floor = np.array([positions[item_id] for item_id in ids])[:, [0, 2]]
+        for point in rng.normal(0.0, 10 ** rng.uniform(0, 4), (20, 2)):
+            distances = np.linalg.norm(floor - point, axis=1)
+            item_id, distance = index.nearest(point)
+            assert distance == distances.min()
+            assert np.isclose(np.linalg.norm(floor[ids.index(item_id)] - point), distance)
+            limit = distances.min() / 2
+            assert index.nearest(point, max_distance=limit) is None
+
+    index.clear()
+    assert index.nearest((0.0, 0.0)) is None
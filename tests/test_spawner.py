@@ -0,0 +1,28 @@
+import numpy as np
+import pybullet as p
+import pytest
+
+from simulador.spawner import CubeSpawner
+
+
+@pytest.fixture
+def client():
+    client = p.connect(p.DIRECT)
+    yield client
+    p.disconnect(client)
+
+
+# Depois de apagar cubos, o PyBullet reutiliza os ids livres; os ids devolvidos
+# por spawn têm de ser os dos corpos que ficaram em cada posição
+def test_spawn_after_remove_returns_reused_ids(client):
+    spawner = CubeSpawner(client=client, batch_size=4)
+    first = spawner.spawn([(i, 0, 0) for i in range(6)])
+    spawner.remove(first[1:3])
+
+    positions = np.array([(0, 5, i) for i in range(7)], dtype=float)
+    body_ids = spawner.spawn(positions)
+    assert set(first[1:3]) <= set(body_ids)
+    assert len(set(body_ids) | set(first[:1] + first[3:])) == 11
+    for body_id, position in zip(body_ids, positions):
+        actual, _ = p.getBasePositionAndOrientation(body_id, physicsClientId=client)
+        assert np.allclose(actual, position)
@@ -0,0 +1,41 @@
+import pybullet as p
+import pytest
+
+from simulador.physics_scheduler import PhysicsScheduler
+from simulador.spawner import CubeSpawner
+from simulador.trajectory import Trajectory, start_recording
+from simulador.world import create_world
+
+
+@pytest.fixture
+def client():
+    client = p.connect(p.DIRECT)
+    create_world(client)
+    yield client
+    p.disconnect(client)
+
+
+# Quando o número de corpos muda, a gravação fecha-se sozinha e sai dos
+# listeners do PhysicsScheduler, que volta a ler as poses uma vez por iteração
+def test_recorder_leaves_listeners_when_it_closes(client, tmp_path):
+    spawner = CubeSpawner(client=client)
+    cubes = spawner.spawn([(0, 1, 0), (2, 1, 0)])
+    scheduler = PhysicsScheduler(lambda: cubes, client=client)
+    recorder = start_recording(scheduler, str(tmp_path / "gravacao.traj"))
+
+    scheduler.advance(4 * scheduler.timestep)
+    assert recorder.frames == 4
+    assert recorder.record_snapshot in scheduler.step_listeners
+
+    cubes.extend(spawner.spawn([(4, 1, 0)]))
+    scheduler.advance(scheduler.timestep)
+    assert recorder.closed
+    assert scheduler.step_listeners == []
+
+    reads = []
+    read_poses = scheduler._read_poses
+    scheduler._read_poses = lambda: reads.append(scheduler.step) or read_poses()
+    scheduler.advance(4 * scheduler.timestep)
+    assert len(reads) == 1
+
+    assert len(Trajectory(str(tmp_path / "gravacao.traj"))) == 4
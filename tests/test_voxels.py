@@ -0,0 +1,23 @@
+import numpy as np
+
+from simulador.voxels import VoxelGrid
+
+
+# Área de cada quadrilátero (Q x 4 x 3)
+def quad_areas(vertices):
+    return np.linalg.norm(np.cross(vertices[:, 1] - vertices[:, 0], vertices[:, 3] - vertices[:, 0]), axis=1)
+
+
+# As faces unidas em retângulos cobrem exatamente a superfície exterior de uma
+# caixa de cubos, mesmo quando a caixa passa de um bloco para o seguinte
+def test_greedy_meshing_covers_the_surface():
+    grid = VoxelGrid(cell=0.5, chunk_size=4)
+    cells = np.array([(i, j, k) for i in range(2, 7) for j in range(3) for k in range(2)])
+    grid.add(cells * 0.5)
+    assert len(grid) == 30
+
+    meshes = [grid.mesh_chunk(key) for key in list(grid.chunks)]
+    quads = sum(len(vertices) for vertices, _ in meshes)
+    area = sum(quad_areas(vertices).sum() for vertices, _ in meshes)
+    assert np.isclose(area, 2 * (5 * 3 + 5 * 2 + 3 * 2) * 0.5 ** 2)
+    assert quads < grid.naive_triangles() // 2
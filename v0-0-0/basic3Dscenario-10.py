@@ -3,57 +3,74 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import pybullet as p
-import pybullet_data
-import xml.etree.ElementTree as ET
-import tkinter as tk
-from tkinter import filedialog
 import os
+import sys
+import time
+import numpy as np
+
+# Permite importar o pacote simulador a partir da raiz do repositório
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from simulador.cube_renderer import CubeRenderer
+from simulador.static_mesh import CachedMesh, StaticMesh, build_checkerboard
+from simulador.spawner import CubeSpawner, CUBE_HALF_EXTENT
+from simulador.physics_scheduler import PhysicsScheduler
+from simulador.scene_loader import BackgroundStream, SceneStream, write_attributes_xml
+from simulador.binary_scene import BinaryScene, EXTENSION, save_binary_scene
+from simulador.scene_store import SceneStore
+from simulador.journal import SceneJournal
+from simulador.profiler import FrameProfiler, profile_csv_from_argv
+from simulador.picking import RayPicker, capture_camera
+from simulador.culling import FrustumCuller
+from simulador.frame_pacer import pacer_from_argv
+from simulador.menu import FilePicker, PopupMenu, TaskRunner
+from simulador.capture import EXTENSION as FRAMES_EXTENSION, FrameCapture
+from simulador.maze import compile_maze
+from simulador.snapshots import SnapshotRing
+from simulador.trajectory import start_recording, stop_recording
+from simulador.world import create_world
 
 # Inicializando variáveis globais para armazenar os cubos
-cubos = []
+scene = SceneStore()  # Posições, orientações e ids no PyBullet de todos os cubos
+loading = []  # Cenários a carregar aos poucos: (caminho, BackgroundStream), um lote de cubos por frame
+maze_meshes = []  # Paredes dos labirintos carregados (uma malha por labirinto)
+
+# Capturas de tela e gravação de vídeo (F7 em PNG, F8 em bruto) lidas da GPU
+# sem esperar por ela e gravadas em threads
+capture = FrameCapture()
+
+# Menu e seletor de ficheiros desenhados dentro da janela (não param a física nem o desenho)
+menu = PopupMenu()
+file_picker = FilePicker()
+
+# Ações lentas (guardar, ler XML, compilar labirintos) correm em
+# threads; os resultados voltam ao ciclo principal em tasks.poll()
+tasks = TaskRunner()
+
+# Extensões aceites como cenário e como imagem de labirinto
+SCENE_EXTENSIONS = (".xml", EXTENSION)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Malha do chão, construída uma vez e guardada na GPU em blocos de 8 x 8 quadrados
+floor = CachedMesh(build_checkerboard, chunk_size=8)
+
+# Só se desenha o que está dentro do campo de visão da câmera
+culler = FrustumCuller()
 
 # Função para desenhar o fundo quadriculado com cores branco e verde
-def draw_grid():
-    glBegin(GL_QUADS)
-    for x in range(-20, 20):
-        for z in range(-20, 20):
-            if (x + z) % 2 == 0:
-                glColor3f(1, 1, 1)  # Branco
-            else:
-                glColor3f(0, 1, 0)  # Verde
-            glVertex3f(x, 0, z)
-            glVertex3f(x + 1, 0, z)
-            glVertex3f(x + 1, 0, z + 1)
-            glVertex3f(x, 0, z + 1)
-    glEnd()
-
-# Função para desenhar um cubo azul em OpenGL
-def draw_cube(cube_pos):
-    vertices = [
-        (1, -1, -1), (1, 1, -1), (-1, 1, -1), (-1, -1, -1),
-        (1, -1, 1), (1, 1, 1), (-1, -1, 1), (-1, 1, 1),
-    ]
-    edges = [
-        (0, 1), (1, 2), (2, 3), (3, 0),
-        (4, 5), (5, 6), (6, 7), (7, 4),
-        (0, 4), (1, 5), (2, 6), (3, 7)
-    ]
-
-    glPushMatrix()
-    glTranslatef(cube_pos[0], cube_pos[1], cube_pos[2])  # Mover cubo para a posição correta
-    glBegin(GL_LINES)
-    glColor3f(0, 0, 1)  # Azul para o cubo
-    for edge in edges:
-        for vertex in edge:
-            glVertex3fv(vertices[vertex])
-    glEnd()
-    glPopMatrix()
+# (a malha só é reconstruída se o tamanho ou as cores mudarem)
+def draw_grid(size=20, color_a=(1, 1, 1), color_b=(0, 1, 0)):
+    mesh = floor.get(size, color_a, color_b)  # Branco e verde
+    centers, half_extents, _, _ = mesh.chunks
+    mesh.draw(culler.cull("chão", centers, half_extents))
+
+# Ritmo dos frames (--fps N, --vsync; --idle deixa de desenhar com a cena parada)
+pacer = pacer_from_argv()
 
 # Inicializar Pygame e criar a janela 3D maior
 def init_pygame_window():
     pygame.init()
     display = (1280, 720)  # Aumentar o tamanho da janela
-    pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
+    pacer.set_mode(display, DOUBLEBUF | OPENGL)
     gluPerspective(45, (display[0] / display[1]), 0.1, 50.0)
     glTranslatef(0.0, -5.0, -20)  # Posicionar a câmera mais longe para um campo de visão maior
 
@@ -63,139 +80,276 @@ def init_pybullet():
     if physicsClient < 0:
         raise Exception("Falha ao conectar ao servidor PyBullet")
 
-    p.setAdditionalSearchPath(pybullet_data.getDataPath())
-    p.setGravity(0, 0, -9.8)  # Configurar gravidade
-    p.loadURDF("plane.urdf")  # Carregar plano (chão)
-
-# Criar um novo cubo no PyBullet na posição do clique
-def criar_cubo(x, z):
-    cube_start_pos = [x, 1, z]  # Coloca o cubo 1 unidade acima do chão
-    cube_start_orientation = p.getQuaternionFromEuler([0, 0, 0])
-    box_id = p.loadURDF("cube.urdf", cube_start_pos, cube_start_orientation)
-    cubos.append(box_id)
-
-# Remover o cubo mais próximo ao ponto clicado
-def remover_cubo(x, z):
-    if cubos:
-        # Encontrar o cubo mais próximo da posição (x, z)
-        min_distance = float("inf")
-        closest_cubo = None
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            distance = (cube_pos[0] - x) ** 2 + (cube_pos[2] - z) ** 2
-            if distance < min_distance:
-                min_distance = distance
-                closest_cubo = cube_id
-        
-        if closest_cubo:
-            p.removeBody(closest_cubo)
-            cubos.remove(closest_cubo)
-
-# Converter a posição da tela do clique do mouse para coordenadas 3D
-def get_mouse_position_3d(mouse_x, mouse_y):
-    # Converte coordenadas da tela para coordenadas 3D aproximadas
-    normalized_x = (mouse_x / 1280) * 2 - 1
-    normalized_y = (mouse_y / 720) * 2 - 1
-
-    return normalized_x * 20, normalized_y * 20  # Retorna uma posição em 3D aproximada
+    # Gravidade em -y e chão em y = 0, o mesmo referencial do desenho
+    # (as posições e orientações passam do PyBullet para o OpenGL sem conversões)
+    create_world()
+
+# Cria os cubos com uma forma de colisão e uma forma visual partilhadas
+spawner = CubeSpawner()
+
+# Estados guardados do mundo (F5 guarda, F9 volta ao último guardado)
+snapshots = SnapshotRing(scene, spawner)
+
+# Gravação automática: cada cubo criado, apagado ou mexido vai para um registo
+# (autosave.journal) e, de vez em quando, o cenário inteiro para autosave.npz.
+# Se o programa não terminar bem, o cenário é recuperado ao abrir.
+journal = SceneJournal(scene, "autosave")
+
+# Recupera o cenário de uma sessão interrompida e cria de novo os corpos no PyBullet
+def recover_scene():
+    replayed = journal.recover()
+    scene.physics_ids[:] = spawner.spawn(scene.positions)
+    for body_id, position, orientation in zip(scene.physics_ids.tolist(), scene.positions.tolist(),
+                                              scene.orientations.tolist()):
+        p.resetBasePositionAndOrientation(body_id, position, orientation)
+    print("Cenário recuperado: %d cubos (%d alterações)" % (len(scene), replayed))
+
+# Seleção com raios: o clique é convertido num raio pela câmera e o PyBullet
+# devolve o primeiro corpo atingido (o chão ou um cubo)
+picker = RayPicker()
+
+# Criar um novo cubo no PyBullet pousado na superfície clicada
+def criar_cubo(hit):
+    if hit is not None:
+        criar_cubos([hit.position + hit.normal * CUBE_HALF_EXTENT])
+
+# Criar vários cubos de uma só vez (posições N x 3), com o tamanho dos corpos
+# do PyBullet. Os outros campos do cenário (orientations, sizes, colors,
+# textures) são opcionais, como em SceneStore.add_many.
+def criar_cubos(positions, orientations=None, sizes=CUBE_HALF_EXTENT, **fields):
+    physics_ids = spawner.spawn(positions)
+    if orientations is not None:
+        # Os cubos de um lote são criados todos com a mesma orientação; os
+        # rodados são acertados um a um
+        rotated = np.flatnonzero(np.any(orientations != (0, 0, 0, 1), axis=1))
+        for i in rotated.tolist():
+            p.resetBasePositionAndOrientation(physics_ids[i], positions[i].tolist(), orientations[i].tolist())
+    scene.add_many(positions, orientations=orientations, sizes=sizes, physics_ids=physics_ids, **fields)
+
+# Remover o cubo clicado
+def remover_cubo(hit):
+    handle = scene.handle_of_physics_id(hit.body_id) if hit is not None else None
+    if handle is not None:
+        spawner.remove([hit.body_id])
+        scene.remove(handle)
+
+# Converter a posição da tela do clique do mouse num ponto da cena 3D:
+# devolve o corpo e o ponto da superfície atingidos (ou None se não houver nada)
+def get_mouse_position_3d(camera, mouse_x, mouse_y):
+    return picker.pick(camera, mouse_x, mouse_y)
 
 # Menu do botão direito do rato
-def show_right_click_menu(x, z):
-    root = tk.Tk()
-    root.withdraw()  # Esconde a janela principal
-
-    menu = tk.Menu(root, tearoff=0)
-    menu.add_command(label="Criar cubo", command=lambda: criar_cubo(x, z))
-    menu.add_command(label="Apagar cubo", command=lambda: remover_cubo(x, z))
-    menu.add_separator()
-    menu.add_command(label="Guardar como XML", command=save_scene_as_xml)
-    menu.add_command(label="Carregar XML", command=load_scene_from_xml)
-    menu.add_separator()
-    menu.add_command(label="Guardar imagem", command=save_screenshot)
-
-    try:
-        menu.tk_popup(pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1])
-    finally:
-        menu.grab_release()
-
-# Salvar o cenário como XML
+def show_right_click_menu(hit):
+    menu.show(pygame.mouse.get_pos(), [
+        ("Criar cubo", lambda: criar_cubo(hit)),
+        ("Apagar cubo", lambda: remover_cubo(hit)),
+        None,
+        ("Guardar como XML", save_scene_as_xml),
+        ("Carregar XML", load_scene_from_xml),
+        ("Carregar labirinto", load_maze),
+        None,
+        ("Guardar imagem", save_screenshot),
+    ])
+
+# Salvar o cenário como XML (ou no formato binário, pela extensão)
 def save_scene_as_xml():
-    root = tk.Tk()
-    root.withdraw()  # Esconde a janela principal
-    file_path = filedialog.asksaveasfilename(defaultextension=".xml", filetypes=[("XML files", "*.xml")])
-    if file_path:
-        root.destroy()
-        tree = ET.Element("cena")
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            cube_elem = ET.SubElement(tree, "cubo", x=str(cube_pos[0]), y=str(cube_pos[1]), z=str(cube_pos[2]))
-        tree = ET.ElementTree(tree)
-        tree.write(file_path)
+    file_picker.ask_save(save_scene, SCENE_EXTENSIONS, "Guardar cenário (.xml ou %s)" % EXTENSION,
+                         default_name="cenario.xml")
+
+# Copia o cenário e grava a cópia numa thread
+def save_scene(file_path):
+    arrays = scene.get_state()["arrays"]
+    done = lambda _: print("Cenário guardado: %s" % file_path)
+    if file_path.endswith(EXTENSION):
+        # Formato binário compacto para cenários grandes
+        tasks.submit(save_binary_scene, file_path, arrays["positions"], arrays["orientations"],
+                     arrays["sizes"], arrays["colors"], arrays["textures"], on_done=done)
+    else:
+        tasks.submit(write_attributes_xml, file_path, arrays["positions"], on_done=done)
 
 # Carregar um cenário de um ficheiro XML
 def load_scene_from_xml():
-    root = tk.Tk()
-    root.withdraw()  # Esconde a janela principal
-    file_path = filedialog.askopenfilename(defaultextension=".xml", filetypes=[("XML files", "*.xml")])
-    if file_path:
-        root.destroy()
-        tree = ET.parse(file_path)
-        root_elem = tree.getroot()
-        for cube_elem in root_elem.findall("cubo"):
-            x = float(cube_elem.get("x"))
-            y = float(cube_elem.get("y"))
-            z = float(cube_elem.get("z"))
-            criar_cubo(x, z)
-
-# Salvar uma captura de tela
+    file_picker.ask_open(load_scene, SCENE_EXTENSIONS, "Carregar cenário")
+
+# O ficheiro é lido numa thread e os cubos são criados aos poucos (um lote por
+# frame) à medida que os lotes ficam prontos, sem esperar pelo fim do ficheiro
+def load_scene(file_path):
+    if file_path.endswith(EXTENSION):
+        loading.append((file_path, BackgroundStream(BinaryScene(file_path).field_batches())))
+    else:
+        loading.append((file_path, BackgroundStream(SceneStream(file_path))))
+
+# Carregar um labirinto a partir de uma imagem (paredes escuras em fundo claro).
+# A imagem é compilada numa thread; as paredes ficam em poucos corpos estáticos
+# (de até 16 caixas cada) e numa única malha.
+def load_maze():
+    file_picker.ask_open(lambda file_path: tasks.submit(compile_maze, file_path, on_done=add_maze),
+                         IMAGE_EXTENSIONS, "Carregar labirinto")
+
+def add_maze(maze):
+    maze.create_bodies()
+    maze_meshes.append(StaticMesh(*maze.mesh()))
+
+# Criar o próximo lote de cubos dos cenários em carregamento (se já foi lido)
+def load_next_batch():
+    if loading:
+        file_path, stream = loading[0]
+        batch = stream.get()
+        if isinstance(batch, dict):  # Cenário binário: todos os campos, como foram guardados
+            criar_cubos(**batch)
+        elif batch is not None:
+            batch[:, 1] = 1  # XML (só posições): coloca os cubos 1 unidade acima do chão
+            criar_cubos(batch)
+        elif stream.finished:
+            loading.pop(0)
+            if stream.error is not None:
+                print("Erro ao abrir %s: %s" % (file_path, stream.error))
+
+# Salvar uma captura de tela (tirada no fim do próximo frame, sem os menus)
 def save_screenshot():
-    root = tk.Tk()
-    root.withdraw()  # Esconde a janela principal
-    file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG files", "*.png")])
-    if file_path:
-        root.destroy()
-        pygame.image.save(pygame.display.get_surface(), file_path)
+    file_picker.ask_save(capture.request, (".png",), "Guardar imagem", default_name="captura.png")
+
+# Liga/desliga a gravação de todos os frames (PNG numa pasta ou, com raw, um
+# ficheiro .frames; ver python -m simulador.capture)
+def toggle_video(raw=False):
+    if capture.recording:
+        print("Gravação terminada: %s" % capture.stop_recording())
+    else:
+        path = time.strftime("video-%Y%m%d-%H%M%S") + (FRAMES_EXTENSION if raw else "")
+        capture.start_recording(path, raw=raw)
+        print("A gravar o vídeo: %s" % path)
 
 # Função principal
 def main():
     init_pygame_window()  # Inicializar janela
     init_pybullet()  # Inicializar PyBullet
+    if journal.exists():
+        recover_scene()
+    journal.start()
+    renderer = CubeRenderer(color=(0, 0, 1))  # Cubos azuis desenhados em lote
+    physics = PhysicsScheduler(lambda: scene.physics_ids.tolist())  # Física a passo fixo numa thread própria
+    physics.start()
+    last_step = -1  # Último passo da física copiado para o cenário
+    last_busy_time = 0.0
+    last_pose_time = 0.0
+    recorder = None  # Gravação das poses a cada passo da física (F6 liga/desliga)
+
+    # Tempo de cada fase do frame (F3 mostra o resumo; --profile ficheiro.csv grava cada frame)
+    # ("poses" é a parte da física gasta a ler as poses do PyBullet)
+    profiler = FrameProfiler(["events", "physics", "poses", "sync", "autosave", "grid", "cubes", "capture",
+                              "flip"],
+                             csv_path=profile_csv_from_argv(),
+                             counters=["cubos desenhados", "cubos descartados", "chão desenhados", "chão descartados",
+                                       "poses read", "poses asleep", "frames dropped"])
 
     # Inicializando variáveis de controle da câmera (posição e zoom)
-    camera_x, camera_y, camera_z = 0, 0, -20
+    camera_x, camera_y, camera_z = 0, -5, -20  # A vista de init_pygame_window (olhos 5 unidades acima do chão)
     camera_speed = 0.1
     zoom_speed = 0.5
+    camera = capture_camera()
 
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                p.disconnect()
-                quit()
-
-            # Controle de movimento da câmera
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT:
-                    camera_x -= camera_speed
-                if event.key == pygame.K_RIGHT:
-                    camera_x += camera_speed
-                if event.key == pygame.K_UP:
-                    camera_y += camera_speed
-                if event.key == pygame.K_DOWN:
-                    camera_y -= camera_speed
-                if event.key == pygame.K_PAGEUP:
-                    camera_z += zoom_speed
-                if event.key == pygame.K_PAGEDOWN:
-                    camera_z -= zoom_speed
-
-            # Controle de criação e remoção de cubos com clique do mouse
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                x, z = get_mouse_position_3d(mouse_x, mouse_y)
-                if event.button == 1:  # Botão esquerdo do mouse cria cubo
-                    criar_cubo(x, z)
-                elif event.button == 3:  # Botão direito do mouse abre o menu
-                    show_right_click_menu(x, z)
+        profiler.begin_frame()
+        with profiler.phase("events"):
+            for event in pacer.events():
+                if event.type == pygame.QUIT:
+                    if recorder is not None:
+                        stop_recording(physics, recorder)
+                    tasks.shutdown()  # Acaba de gravar o que estiver a meio
+                    capture.close()
+                    journal.close(discard=True)  # Saída normal: não há nada a recuperar
+                    profiler.close()
+                    physics.stop()
+                    pygame.quit()
+                    p.disconnect()
+                    quit()
+
+                # Os menus abertos ficam com os eventos que são seus
+                with physics.lock:
+                    if file_picker.handle_event(event) or menu.handle_event(event):
+                        continue
+
+                # Controle de movimento da câmera
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_LEFT:
+                        camera_x -= camera_speed
+                    if event.key == pygame.K_RIGHT:
+                        camera_x += camera_speed
+                    if event.key == pygame.K_UP:
+                        camera_y += camera_speed
+                    if event.key == pygame.K_DOWN:
+                        camera_y -= camera_speed
+                    if event.key == pygame.K_PAGEUP:
+                        camera_z += zoom_speed
+                    if event.key == pygame.K_PAGEDOWN:
+                        camera_z -= zoom_speed
+                    if event.key == pygame.K_F3:  # Mostrar/esconder o perfil dos frames
+                        profiler.toggle()
+                    if event.key == pygame.K_F4:  # Ligar/desligar o culling (para comparar)
+                        culler.toggle()
+                    if event.key == pygame.K_F5:  # Guardar o estado do mundo
+                        with physics.lock:
+                            saved = snapshots.save()
+                        print("Estado guardado: %s (%d estados, %.1f MB)" % (
+                            saved.name, len(snapshots), snapshots.used_bytes / 1e6))
+                    if event.key == pygame.K_F6:  # Gravar as poses a cada passo (ver simulador/trajectory.py)
+                        if recorder is None or recorder.closed:
+                            recorder = start_recording(physics)
+                            print("A gravar: %s" % recorder.path)
+                        else:
+                            stop_recording(physics, recorder)
+                    if event.key == pygame.K_F7:  # Gravar vídeo em PNG
+                        toggle_video()
+                    if event.key == pygame.K_F8:  # Gravar vídeo em bruto (mais rápido)
+                        toggle_video(raw=True)
+                    if event.key == pygame.K_F9 and len(snapshots):  # Voltar ao último estado guardado
+                        with physics.lock:
+                            snapshots.restore()
+                            physics.publish()  # O render não deve voltar a usar as poses antigas
+
+                # Controle de criação e remoção de cubos com clique do mouse
+                # (as alterações ao PyBullet são feitas com a física em pausa)
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    with physics.lock:
+                        hit = get_mouse_position_3d(camera, mouse_x, mouse_y)
+                        if event.button == 1:  # Botão esquerdo do mouse cria cubo
+                            criar_cubo(hit)
+                        elif event.button == 3:  # Botão direito do mouse abre o menu
+                            show_right_click_menu(hit)
+
+        # Resultados das tarefas que terminaram (labirintos compilados, XML lidos, ...)
+        with physics.lock:
+            if tasks.poll():
+                pacer.changed()
+
+        # Continuar a carregar os cenários XML abertos
+        if loading:
+            with physics.lock:
+                load_next_batch()
+            pacer.changed()
+
+        # Copiar as últimas poses publicadas pela física
+        # (o snapshot só é copiado se tiver os mesmos cubos que o cenário tem agora)
+        with profiler.phase("sync"):
+            snapshot = physics.latest()
+            if snapshot.step != last_step and np.array_equal(snapshot.body_ids, scene.physics_ids):
+                if scene.set_poses(snapshot.positions, snapshot.orientations):
+                    pacer.changed()  # A física ainda não parou
+                last_step = snapshot.step
+
+        # Entrega as alterações ao registo da gravação automática (numa thread)
+        with profiler.phase("autosave"):
+            journal.autosave()
+
+        # A gravar vídeo (ou com capturas a meio) todos os frames contam
+        if capture.busy():
+            pacer.changed()
+
+        # Com a cena parada (modo idle) não se redesenha nada
+        if not pacer.should_draw():
+            pacer.tick(drawn=False)
+            continue
 
         # Limpar a tela antes de desenhar
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -204,18 +358,46 @@ def main():
         glLoadIdentity()
         gluPerspective(45, (1280 / 720), 0.1, 50.0)
         glTranslatef(camera_x, camera_y, camera_z)
+        camera = capture_camera()  # Matrizes usadas para converter os cliques em raios
+        culler.begin_frame(camera)
 
         # Desenhar o fundo quadriculado
-        draw_grid()
+        with profiler.phase("grid"):
+            draw_grid()
+            for mesh in maze_meshes:
+                mesh.draw()
+
+        # Desenhar os cubos visíveis numa só chamada, já rodados (os quaterniões
+        # são convertidos de uma vez no renderer). Um cubo rodado cabe na
+        # esfera que passa pelos seus cantos.
+        with profiler.phase("cubes"):
+            visible = culler.cull("cubos", scene.positions, np.linalg.norm(scene.sizes, axis=1)[:, None])
+            renderer.update(scene.positions[visible], scene.sizes[visible],
+                            orientations=scene.orientations[visible])
+            renderer.draw()
+        with profiler.phase("capture"):
+            capture.capture()  # Antes dos menus, que não aparecem nas capturas
+        menu.draw()
+        file_picker.draw()
+        for name, (drawn, culled) in culler.counts.items():
+            profiler.count(name + " desenhados", drawn)
+            profiler.count(name + " descartados", culled)
+        profiler.count("poses read", physics.poses.read)
+        profiler.count("poses asleep", physics.poses.asleep())
+        profiler.count("frames dropped", capture.dropped)
+        profiler.draw_overlay()
 
-        # Atualizar a simulação e desenhar cubos
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            draw_cube(cube_pos)
+        # Tempo gasto pela thread da física desde o último frame
+        profiler.record("physics", physics.busy_time - last_busy_time)
+        last_busy_time = physics.busy_time
+        profiler.record("poses", physics.poses.total_time - last_pose_time)
+        last_pose_time = physics.poses.total_time
 
         # Atualizar a janela
-        pygame.display.flip()
-        pygame.time.wait(10)
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        profiler.end_frame()
+        pacer.tick()  # Espera só o que falta para o próximo frame
 
 # Iniciar o programa
 if __name__ == "__main__":
@@ -5,6 +5,13 @@ from OpenGL.GLU import *
 import pybullet as p
 import pybullet_data
 import xml.etree.ElementTree as ET
+import os
+import sys
+
+# Permite importar o pacote simulador a partir da raiz do repositório
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from simulador.cube_renderer import CubeRenderer
+from simulador.pose_sync import PoseSync
 
 # Inicializando variáveis globais para armazenar os cubos
 cubos = []
@@ -20,27 +27,9 @@ def draw_grid():
         glVertex3f(20, 0, i)
     glEnd()
 
-# Função para desenhar um cubo em OpenGL (Pygame 3D)
-def draw_cube(cube_pos):
-    vertices = [
-        (1, -1, -1), (1, 1, -1), (-1, 1, -1), (-1, -1, -1),
-        (1, -1, 1), (1, 1, 1), (-1, -1, 1), (-1, 1, 1),
-    ]
-    edges = [
-        (0, 1), (1, 2), (2, 3), (3, 0),
-        (4, 5), (5, 6), (6, 7), (7, 4),
-        (0, 4), (1, 5), (2, 6), (3, 7)
-    ]
-
-    glPushMatrix()
-    glTranslatef(cube_pos[0], cube_pos[1], cube_pos[2])  # Mover cubo para a posição correta
-    glBegin(GL_LINES)
-    glColor3f(1, 1, 1)  # Branco para o cubo
-    for edge in edges:
-        for vertex in edge:
-            glVertex3fv(vertices[vertex])
-    glEnd()
-    glPopMatrix()
+# Poses de todos os cubos lidas do PyBullet para arrays NumPy (os cubos
+# parados não são lidos em todos os frames)
+poses = PoseSync()
 
 # Inicializar Pygame e criar a janela 3D maior
 def init_pygame_window():
@@ -94,6 +83,8 @@ def main():
     camera_x, camera_y, camera_z = 0, 0, -20
     camera_speed = 0.1
     zoom_speed = 0.5
+    renderer = CubeRenderer(color=(1, 1, 1))  # Cubos brancos desenhados em lote, já rodados
+    caption = None  # Custo da leitura das poses mostrado no título da janela
 
     while True:
         for event in pygame.event.get():
@@ -136,10 +127,16 @@ def main():
         # Desenhar o fundo quadriculado
         draw_grid()
 
-        # Atualizar a simulação
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            draw_cube(cube_pos)
+        # Atualizar a simulação e desenhar os cubos numa só chamada
+        poses.sync(cubos)
+        renderer.update(poses.positions, orientations=poses.orientations)
+        renderer.draw()
+
+        # Custo da leitura das poses no título da janela (só muda quando muda)
+        summary = "poses: %d lidas de %d, %.1f ms" % (poses.read, len(cubos), poses.sync_time * 1000)
+        if summary != caption:
+            caption = summary
+            pygame.display.set_caption(caption)
 
         # Atualizar a janela
         pygame.display.flip()
@@ -3,48 +3,46 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import pybullet as p
-import pybullet_data
 import xml.etree.ElementTree as ET
+import os
+import sys
+import numpy as np
+
+# Permite importar o pacote simulador a partir da raiz do repositório
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from simulador.cube_renderer import CubeRenderer
+from simulador.static_mesh import CachedMesh, build_checkerboard
+from simulador.spawner import CubeSpawner
+from simulador.picking import capture_camera, intersect_plane
+from simulador.culling import FrustumCuller
+from simulador.frame_pacer import FramePacer
+from simulador.physics_scheduler import PhysicsScheduler, PoseSnapshot
+from simulador.spatial_index import SpatialHash
+from simulador.world import create_world
 
 # Inicializando variáveis globais para armazenar os cubos
 cubos = []
 
+# Malha do chão, construída uma vez e guardada na GPU em blocos de 8 x 8 quadrados
+floor = CachedMesh(build_checkerboard, chunk_size=8)
+
+# Só se desenha o que está dentro do campo de visão da câmera
+culler = FrustumCuller()
+
+# Poses dos cubos desenhadas: cópia do último snapshot publicado pela física
+# (que corre a passo fixo numa thread própria, ver PhysicsScheduler)
+poses = PoseSnapshot()
+
+# Índice espacial dos cubos no plano do chão (x, z), para encontrar o cubo
+# mais próximo de um clique sem percorrer todos
+index = SpatialHash(cell_size=2.0, axes=(0, 2))
+
 # Função para desenhar o fundo quadriculado com cores branco e verde
-def draw_grid():
-    glBegin(GL_QUADS)
-    for x in range(-20, 20):
-        for z in range(-20, 20):
-            if (x + z) % 2 == 0:
-                glColor3f(1, 1, 1)  # Branco
-            else:
-                glColor3f(0, 1, 0)  # Verde
-            glVertex3f(x, 0, z)
-            glVertex3f(x + 1, 0, z)
-            glVertex3f(x + 1, 0, z + 1)
-            glVertex3f(x, 0, z + 1)
-    glEnd()
-
-# Função para desenhar um cubo azul em OpenGL
-def draw_cube(cube_pos):
-    vertices = [
-        (1, -1, -1), (1, 1, -1), (-1, 1, -1), (-1, -1, -1),
-        (1, -1, 1), (1, 1, 1), (-1, -1, 1), (-1, 1, 1),
-    ]
-    edges = [
-        (0, 1), (1, 2), (2, 3), (3, 0),
-        (4, 5), (5, 6), (6, 7), (7, 4),
-        (0, 4), (1, 5), (2, 6), (3, 7)
-    ]
-
-    glPushMatrix()
-    glTranslatef(cube_pos[0], cube_pos[1], cube_pos[2])  # Mover cubo para a posição correta
-    glBegin(GL_LINES)
-    glColor3f(0, 0, 1)  # Azul para o cubo
-    for edge in edges:
-        for vertex in edge:
-            glVertex3fv(vertices[vertex])
-    glEnd()
-    glPopMatrix()
+# (a malha só é reconstruída se o tamanho ou as cores mudarem)
+def draw_grid(size=20, color_a=(1, 1, 1), color_b=(0, 1, 0)):
+    mesh = floor.get(size, color_a, color_b)  # Branco e verde
+    centers, half_extents, _, _ = mesh.chunks
+    mesh.draw(culler.cull("chão", centers, half_extents))
 
 # Inicializar Pygame e criar a janela 3D maior
 def init_pygame_window():
@@ -60,55 +58,77 @@ def init_pybullet():
     if physicsClient < 0:
         raise Exception("Falha ao conectar ao servidor PyBullet")
 
-    p.setAdditionalSearchPath(pybullet_data.getDataPath())
-    p.setGravity(0, 0, -9.8)  # Configurar gravidade
-    p.loadURDF("plane.urdf")  # Carregar plano (chão)
+    create_world()  # Gravidade em -y e chão em y = 0, como no desenho
+
+# Cria os cubos com uma forma de colisão e uma forma visual partilhadas
+spawner = CubeSpawner()
 
 # Criar um novo cubo no PyBullet na posição do clique
 def criar_cubo(x, z):
-    cube_start_pos = [x, 1, z]  # Coloca o cubo 1 unidade acima do chão
-    cube_start_orientation = p.getQuaternionFromEuler([0, 0, 0])
-    box_id = p.loadURDF("cube.urdf", cube_start_pos, cube_start_orientation)
-    cubos.append(box_id)
+    criar_cubos([(x, 1, z)])  # Coloca o cubo 1 unidade acima do chão
+
+# Criar vários cubos de uma só vez (posições N x 3)
+def criar_cubos(positions):
+    new_ids = spawner.spawn(positions)
+    cubos.extend(new_ids)
+    index.insert_many(new_ids, positions)
 
 # Remover o cubo mais próximo ao ponto clicado
 def remover_cubo(x, z):
-    if cubos:
-        # Encontrar o cubo mais próximo da posição (x, z)
-        min_distance = float("inf")
-        closest_cubo = None
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            distance = (cube_pos[0] - x) ** 2 + (cube_pos[2] - z) ** 2
-            if distance < min_distance:
-                min_distance = distance
-                closest_cubo = cube_id
-        
-        if closest_cubo:
-            p.removeBody(closest_cubo)
-            cubos.remove(closest_cubo)
-
-# Converter a posição da tela do clique do mouse para coordenadas 3D
-def get_mouse_position_3d(mouse_x, mouse_y):
-    # Converte coordenadas da tela para coordenadas 3D aproximadas
-    normalized_x = (mouse_x / 1280) * 2 - 1
-    normalized_y = (mouse_y / 720) * 2 - 1
-
-    return normalized_x * 20, normalized_y * 20  # Retorna uma posição em 3D aproximada
+    # Encontrar o cubo mais próximo da posição (x, z) no índice espacial
+    closest = index.nearest((x, z))
+    if closest:
+        closest_cubo, _ = closest
+        spawner.remove([closest_cubo])
+        cubos.remove(closest_cubo)
+        index.remove(closest_cubo)
+
+# Copia as poses do último snapshot da física, se já tiver os cubos que
+# existem agora, e move no índice espacial só os cubos que mexeram
+def sync_poses(physics):
+    snapshot = physics.latest()
+    if snapshot.step == poses.step or snapshot.body_ids != cubos:
+        return
+    if poses.body_ids == snapshot.body_ids:
+        moved = np.flatnonzero(np.abs(snapshot.positions - poses.positions).max(axis=1) > 1e-5)
+    else:
+        moved = np.arange(len(snapshot.body_ids))
+    index.update_many([snapshot.body_ids[i] for i in moved.tolist()], snapshot.positions[moved])
+    poses.resize(len(snapshot.body_ids))
+    poses.positions[:] = snapshot.positions
+    poses.orientations[:] = snapshot.orientations
+    poses.body_ids = list(snapshot.body_ids)
+    poses.step = snapshot.step
+
+# Converter a posição da tela do clique do mouse para coordenadas 3D: o raio
+# que passa pelo clique (dado pelas matrizes da câmera) é intersetado com o
+# chão em y = 0. Devolve (x, z), ou None se o clique não apontar para o chão.
+def get_mouse_position_3d(camera, mouse_x, mouse_y):
+    point = intersect_plane(*camera.ray(mouse_x, mouse_y), axis=1, height=0.0)[0]
+    if np.isnan(point[0]):
+        return None
+    return point[0], point[2]
 
 # Função principal
 def main():
     init_pygame_window()  # Inicializar janela
     init_pybullet()  # Inicializar PyBullet
+    physics = PhysicsScheduler(lambda: cubos)  # Física a passo fixo numa thread própria
+    physics.start()
 
     # Inicializando variáveis de controle da câmera (posição e zoom)
-    camera_x, camera_y, camera_z = 0, 0, -20
+    camera_x, camera_y, camera_z = 0, -5, -20  # A vista de init_pygame_window (olhos 5 unidades acima do chão)
     camera_speed = 0.1
     zoom_speed = 0.5
+    camera = capture_camera()
+    renderer = CubeRenderer(color=(0, 0, 1))  # Cubos azuis desenhados em lote, já rodados
+    caption = None  # Contagens do culling mostradas no título da janela
+    pacer = FramePacer()  # 60 frames por segundo, descontando o tempo de cada frame
 
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                physics.stop()
                 pygame.quit()
                 p.disconnect()
                 quit()
@@ -131,11 +151,15 @@ def main():
             # Controle de criação e remoção de cubos com clique do mouse
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
-                x, z = get_mouse_position_3d(mouse_x, mouse_y)
-                if event.button == 1:  # Botão esquerdo do mouse cria cubo
-                    criar_cubo(x, z)
-                elif event.button == 3:  # Botão direito do mouse remove cubo
-                    remover_cubo(x, z)
+                point = get_mouse_position_3d(camera, mouse_x, mouse_y)
+                if point is None:
+                    continue
+                x, z = point
+                with physics.lock:  # As alterações ao PyBullet são feitas com a física em pausa
+                    if event.button == 1:  # Botão esquerdo do mouse cria cubo
+                        criar_cubo(x, z)
+                    elif event.button == 3:  # Botão direito do mouse remove cubo
+                        remover_cubo(x, z)
 
         # Limpar a tela antes de desenhar
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -144,18 +168,28 @@ def main():
         glLoadIdentity()
         gluPerspective(45, (1280 / 720), 0.1, 50.0)
         glTranslatef(camera_x, camera_y, camera_z)
+        camera = capture_camera()  # Matrizes usadas para converter os cliques em raios
+        culler.begin_frame(camera)
 
         # Desenhar o fundo quadriculado
         draw_grid()
 
-        # Atualizar a simulação e desenhar cubos
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            draw_cube(cube_pos)
+        # Atualizar a simulação e desenhar os cubos dentro do campo de visão
+        # (um cubo rodado cabe na esfera que passa pelos seus cantos)
+        sync_poses(physics)
+        visible = culler.cull("cubos", poses.positions, np.sqrt(3))
+        renderer.update(poses.positions[visible], orientations=poses.orientations[visible])
+        renderer.draw()
+
+        # Contagens e custo da leitura das poses no título da janela (só muda quando mudam)
+        summary = "%s, poses: %d lidas, %.1f ms" % (culler.summary(), physics.poses.read, physics.poses.sync_time * 1000)
+        if summary != caption:
+            caption = summary
+            pygame.display.set_caption(caption)
 
         # Atualizar a janela
         pygame.display.flip()
-        pygame.time.wait(10)
+        pacer.tick()
 
 # Iniciar o programa
 if __name__ == "__main__":
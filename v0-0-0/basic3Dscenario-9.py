@@ -3,32 +3,54 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import pybullet as p
-import pybullet_data
-import xml.etree.ElementTree as ET
-from tkinter import filedialog, Tk
+import os
+import sys
+import numpy as np
+
+# Permite importar o pacote simulador a partir da raiz do repositório
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from simulador.cube_renderer import CubeRenderer, quaternions_to_matrices
+from simulador.static_mesh import CachedMesh, build_checkerboard
+from simulador.spawner import CubeSpawner
+from simulador.picking import capture_camera, intersect_plane
+from simulador.culling import FrustumCuller
+from simulador.frame_pacer import FramePacer
+from simulador.physics_scheduler import PhysicsScheduler, PoseSnapshot
+from simulador.spatial_index import SpatialHash
+from simulador.world import create_world
+from simulador.menu import FilePicker, PopupMenu, TaskRunner
+from simulador.texture_cache import TextureCache
+from simulador.scene_loader import write_children_xml
 
 # Inicializando variáveis globais para armazenar os cubos e texturas
 cubos = []
 selected_cube = None
-textures = {}
+textures = {}  # cube_id -> caminho da imagem
+texture_cache = TextureCache()  # Imagens descodificadas e enviadas para a GPU uma só vez
+
+# Malha do chão, construída uma vez e guardada na GPU em blocos de 8 x 8 quadrados
+floor = CachedMesh(build_checkerboard, chunk_size=8)
+
+# Só se desenha o que está dentro do campo de visão da câmera
+culler = FrustumCuller()
+
+# Poses dos cubos desenhadas: cópia do último snapshot publicado pela física
+# (que corre a passo fixo numa thread própria, ver PhysicsScheduler)
+poses = PoseSnapshot()
+
+# Índice espacial dos cubos no plano do chão (x, z), para encontrar o cubo
+# mais próximo de um clique sem percorrer todos
+index = SpatialHash(cell_size=2.0, axes=(0, 2))
 
 # Função para desenhar o fundo quadriculado com cores branco e verde
-def draw_grid():
-    glBegin(GL_QUADS)
-    for x in range(-20, 20):
-        for z in range(-20, 20):
-            if (x + z) % 2 == 0:
-                glColor3f(1, 1, 1)  # Branco
-            else:
-                glColor3f(0, 1, 0)  # Verde
-            glVertex3f(x, 0, z)
-            glVertex3f(x + 1, 0, z)
-            glVertex3f(x + 1, 0, z + 1)
-            glVertex3f(x, 0, z + 1)
-    glEnd()
+# (a malha só é reconstruída se o tamanho ou as cores mudarem)
+def draw_grid(size=20, color_a=(1, 1, 1), color_b=(0, 1, 0)):
+    mesh = floor.get(size, color_a, color_b)  # Branco e verde
+    centers, half_extents, _, _ = mesh.chunks
+    mesh.draw(culler.cull("chão", centers, half_extents))
 
-# Função para desenhar um cubo azul ou aplicar textura
-def draw_cube(cube_pos, cube_id=None):
+# Função para desenhar um cubo azul ou aplicar textura (rotation: matriz 3 x 3 da orientação)
+def draw_cube(cube_pos, cube_id=None, rotation=None):
     if cube_id and cube_id in textures:
         # Se o cubo tiver uma textura carregada
         apply_texture(textures[cube_id])
@@ -47,12 +69,18 @@ def draw_cube(cube_pos, cube_id=None):
 
     glPushMatrix()
     glTranslatef(cube_pos[0], cube_pos[1], cube_pos[2])  # Mover cubo para a posição correta
+    if rotation is not None:
+        # Rodar o cubo (a matriz 4 x 4 do OpenGL é lida por colunas)
+        matrix = np.identity(4, dtype=np.float32)
+        matrix[:3, :3] = np.transpose(rotation)
+        glMultMatrixf(matrix)
     glBegin(GL_LINES)
     for edge in edges:
         for vertex in edge:
             glVertex3fv(vertices[vertex])
     glEnd()
     glPopMatrix()
+    glDisable(GL_TEXTURE_2D)
 
 # Inicializar Pygame e criar a janela 3D maior
 def init_pygame_window():
@@ -68,122 +96,125 @@ def init_pybullet():
     if physicsClient < 0:
         raise Exception("Falha ao conectar ao servidor PyBullet")
 
-    p.setAdditionalSearchPath(pybullet_data.getDataPath())
-    p.setGravity(0, 0, -9.8)  # Configurar gravidade
-    p.loadURDF("plane.urdf")  # Carregar plano (chão)
+    create_world()  # Gravidade em -y e chão em y = 0, como no desenho
+
+# Cria os cubos com uma forma de colisão e uma forma visual partilhadas
+spawner = CubeSpawner()
 
 # Criar um novo cubo no PyBullet na posição do clique
 def criar_cubo(x, z):
-    cube_start_pos = [x, 1, z]  # Coloca o cubo 1 unidade acima do chão
-    cube_start_orientation = p.getQuaternionFromEuler([0, 0, 0])
-    box_id = p.loadURDF("cube.urdf", cube_start_pos, cube_start_orientation)
-    cubos.append(box_id)
+    criar_cubos([(x, 1, z)])  # Coloca o cubo 1 unidade acima do chão
+
+# Criar vários cubos de uma só vez (posições N x 3)
+def criar_cubos(positions):
+    new_ids = spawner.spawn(positions)
+    cubos.extend(new_ids)
+    index.insert_many(new_ids, positions)
 
 # Remover o cubo mais próximo ao ponto clicado
 def remover_cubo(x, z):
-    if cubos:
-        # Encontrar o cubo mais próximo da posição (x, z)
-        min_distance = float("inf")
-        closest_cubo = None
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            distance = (cube_pos[0] - x) ** 2 + (cube_pos[2] - z) ** 2
-            if distance < min_distance:
-                min_distance = distance
-                closest_cubo = cube_id
-        
-        if closest_cubo:
-            p.removeBody(closest_cubo)
-            cubos.remove(closest_cubo)
-
-# Converter a posição da tela do clique do mouse para coordenadas 3D
-def get_mouse_position_3d(mouse_x, mouse_y):
-    normalized_x = (mouse_x / 1280) * 2 - 1
-    normalized_y = (mouse_y / 720) * 2 - 1
-    return normalized_x * 20, normalized_y * 20  # Retorna uma posição em 3D aproximada
-
-# Função para salvar o cenário em XML
+    # Encontrar o cubo mais próximo da posição (x, z) no índice espacial
+    closest = index.nearest((x, z))
+    if closest:
+        closest_cubo, _ = closest
+        spawner.remove([closest_cubo])
+        cubos.remove(closest_cubo)
+        index.remove(closest_cubo)
+
+# Copia as poses do último snapshot da física, se já tiver os cubos que
+# existem agora, e move no índice espacial só os cubos que mexeram
+def sync_poses(physics):
+    snapshot = physics.latest()
+    if snapshot.step == poses.step or snapshot.body_ids != cubos:
+        return
+    if poses.body_ids == snapshot.body_ids:
+        moved = np.flatnonzero(np.abs(snapshot.positions - poses.positions).max(axis=1) > 1e-5)
+    else:
+        moved = np.arange(len(snapshot.body_ids))
+    index.update_many([snapshot.body_ids[i] for i in moved.tolist()], snapshot.positions[moved])
+    poses.resize(len(snapshot.body_ids))
+    poses.positions[:] = snapshot.positions
+    poses.orientations[:] = snapshot.orientations
+    poses.body_ids = list(snapshot.body_ids)
+    poses.step = snapshot.step
+
+# Converter a posição da tela do clique do mouse para coordenadas 3D: o raio
+# que passa pelo clique (dado pelas matrizes da câmera) é intersetado com o
+# chão em y = 0. Devolve (x, z), ou None se o clique não apontar para o chão.
+def get_mouse_position_3d(camera, mouse_x, mouse_y):
+    point = intersect_plane(*camera.ray(mouse_x, mouse_y), axis=1, height=0.0)[0]
+    if np.isnan(point[0]):
+        return None
+    return point[0], point[2]
+
+# Menu e seletor de imagens desenhados dentro da janela (não param a física nem o desenho)
+menu = PopupMenu()
+file_picker = FilePicker()
+
+# O XML é escrito numa thread; o resultado volta ao ciclo principal em tasks.poll()
+tasks = TaskRunner()
+
+# Função para salvar o cenário em XML: usa uma cópia das posições desenhadas no último
+# frame (sem voltar a perguntar ao PyBullet por cada cubo) e escreve o ficheiro
+# numa thread
 def salvar_scenario(caminho="cenario.xml"):
-    root = ET.Element("cenario")
-    for cube_id in cubos:
-        cube_pos, cube_orientation = p.getBasePositionAndOrientation(cube_id)
-        cube_element = ET.SubElement(root, "cubo")
-        ET.SubElement(cube_element, "pos_x").text = str(cube_pos[0])
-        ET.SubElement(cube_element, "pos_y").text = str(cube_pos[1])
-        ET.SubElement(cube_element, "pos_z").text = str(cube_pos[2])
-    
-    tree = ET.ElementTree(root)
-    tree.write(caminho)
+    tasks.submit(write_children_xml, caminho, poses.positions.copy(),
+                 on_done=lambda _: print("Cenário guardado: %s" % caminho))
 
 # Função para carregar texturas
 def carregar_imagem(cube_id):
-    Tk().withdraw()  # Ocultar a janela principal do Tkinter
-    caminho_imagem = filedialog.askopenfilename(title="Selecione uma imagem")
-    if caminho_imagem:
+    def escolher(caminho_imagem):
         textures[cube_id] = caminho_imagem
+    file_picker.ask_open(escolher, (".jpg", ".jpeg", ".png", ".bmp"), "Selecione uma imagem")
 
-# Aplicar textura ao cubo
+# Aplicar textura ao cubo (a imagem vem da cache de texturas)
 def apply_texture(image_path):
-    texture = pygame.image.load(image_path)
-    texture_data = pygame.image.tostring(texture, "RGB", 1)
-    width, height = texture.get_size()
-    
     glEnable(GL_TEXTURE_2D)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, texture_data)
-    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameterf(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glBegin(GL_QUADS)
-    # Aplicar textura em um quad (para simplificação)
-    glEnd()
-    glDisable(GL_TEXTURE_2D)
+    texture_cache.bind(image_path)
 
-# Função para mostrar menu de opções com o botão direito
-def show_menu(screen, pos):
-    font = pygame.font.Font(None, 30)
-    menu_options = ["Salvar cenário", "Carregar Imagem", "Apagar cubo"]
-    menu_width = 200
-    menu_height = len(menu_options) * 30
-    menu_surface = pygame.Surface((menu_width, menu_height))
-    menu_surface.fill((200, 200, 200))
-
-    for i, option in enumerate(menu_options):
-        option_surface = font.render(option, True, (0, 0, 0))
-        menu_surface.blit(option_surface, (10, i * 30))
-    
-    screen.blit(menu_surface, pos)
-    pygame.display.update()
-
-    # Aguardar o clique no menu
-    while True:
-        event = pygame.event.wait()
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            if pos[0] <= mouse_x <= pos[0] + menu_width and pos[1] <= mouse_y <= pos[1] + menu_height:
-                option_index = (mouse_y - pos[1]) // 30
-                return menu_options[option_index]
-            else:
-                return None
+# Função para mostrar menu de opções com o botão direito (point: ponto do
+# chão clicado, ou None se o clique não apontar para o chão)
+def show_menu(pos, point):
+    items = [
+        ("Salvar cenário", lambda: salvar_scenario("cenario.xml")),
+        ("Carregar Imagem", lambda: carregar_imagem(selected_cube)),
+    ]
+    if point is not None:
+        items.append(("Apagar cubo", lambda: remover_cubo(*point)))
+    menu.show(pos, items)
 
 # Função principal
 def main():
     init_pygame_window()  # Inicializar janela
     init_pybullet()  # Inicializar PyBullet
+    physics = PhysicsScheduler(lambda: cubos)  # Física a passo fixo numa thread própria
+    physics.start()
+    renderer = CubeRenderer(color=(0, 0, 1))  # Cubos azuis desenhados em lote
 
     # Inicializando variáveis de controle da câmera (posição e zoom)
-    camera_x, camera_y, camera_z = 0, 0, -20
+    camera_x, camera_y, camera_z = 0, -5, -20  # A vista de init_pygame_window (olhos 5 unidades acima do chão)
     camera_speed = 0.1
     zoom_speed = 0.5
+    camera = capture_camera()
+    caption = None  # Contagens do culling mostradas no título da janela
+    pacer = FramePacer()  # 60 frames por segundo, descontando o tempo de cada frame
     global selected_cube
 
-    screen = pygame.display.get_surface()  # Obter a superfície da janela
-
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                tasks.shutdown()
+                texture_cache.clear()
+                physics.stop()
                 pygame.quit()
                 p.disconnect()
                 quit()
 
+            # Os menus abertos ficam com os eventos que são seus
+            with physics.lock:  # As opções dos menus podem mexer no PyBullet
+                if file_picker.handle_event(event) or menu.handle_event(event):
+                    continue
+
             # Controle de movimento da câmera
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_LEFT:
@@ -202,17 +233,14 @@ def main():
             # Controle de criação e remoção de cubos com clique do mouse
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_x, mouse_y = pygame.mouse.get_pos()
-                x, z = get_mouse_position_3d(mouse_x, mouse_y)
-                if event.button == 1:  # Botão esquerdo do mouse cria cubo ou seleciona para aplicar textura
-                    criar_cubo(x, z)
+                point = get_mouse_position_3d(camera, mouse_x, mouse_y)
+                if event.button == 1 and point is not None:  # Botão esquerdo do mouse cria cubo ou seleciona para aplicar textura
+                    with physics.lock:  # As alterações ao PyBullet são feitas com a física em pausa
+                        criar_cubo(*point)
                 elif event.button == 3:  # Botão direito do mouse abre o menu
-                    option = show_menu(screen, (mouse_x, mouse_y))
-                    if option == "Salvar cenário":
-                        salvar_scenario("cenario.xml")
-                    elif option == "Carregar Imagem":
-                        carregar_imagem(selected_cube)
-                    elif option == "Apagar cubo":
-                        remover_cubo(x, z)
+                    show_menu((mouse_x, mouse_y), point)
+
+        tasks.poll()
 
         # Limpar a tela antes de desenhar
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -221,18 +249,41 @@ def main():
         glLoadIdentity()
         gluPerspective(45, (1280 / 720), 0.1, 50.0)
         glTranslatef(camera_x, camera_y, camera_z)
+        camera = capture_camera()  # Matrizes usadas para converter os cliques em raios
+        culler.begin_frame(camera)
 
         # Desenhar o fundo quadriculado
         draw_grid()
 
-        # Atualizar a simulação e desenhar cubos
-        for cube_id in cubos:
-            cube_pos, _ = p.getBasePositionAndOrientation(cube_id)
-            draw_cube(cube_pos, cube_id)
+        # Atualizar a simulação e desenhar os cubos dentro do campo de visão: os
+        # sem textura numa só chamada, já rodados (um cubo rodado cabe na esfera
+        # que passa pelos seus cantos)
+        sync_poses(physics)
+        visible = culler.cull("cubos", poses.positions, np.sqrt(3))
+        ids = np.asarray(poses.body_ids, dtype=np.int64)
+        textured = visible & np.isin(ids, list(textures))
+        rotations = quaternions_to_matrices(poses.orientations[textured])
+        for cube_id, cube_pos, rotation in zip(ids[textured].tolist(), poses.positions[textured].tolist(), rotations):
+            draw_cube(cube_pos, cube_id, rotation)
+        untextured = visible & ~textured
+        renderer.update(poses.positions[untextured], orientations=poses.orientations[untextured])
+        renderer.draw()
+        menu.draw()
+        file_picker.draw()
+
+        # Contagens, custo da leitura das poses e estado da cache de texturas
+        # (acertos/falhas) no título da janela (só muda quando mudam)
+        cache = texture_cache.stats()
+        summary = "%s, poses: %d lidas, %.1f ms, texturas: %d (%.1f MB, %d acertos, %d falhas)" % (
+            culler.summary(), physics.poses.read, physics.poses.sync_time * 1000,
+            cache["textures"], cache["used_bytes"] / 1e6, cache["hits"], cache["misses"])
+        if summary != caption:
+            caption = summary
+            pygame.display.set_caption(caption)
 
         # Atualizar a janela
         pygame.display.flip()
-        pygame.time.wait(10)
+        pacer.tick()
 
 # Iniciar o programa
 if __name__ == "__main__":